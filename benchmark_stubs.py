@@ -0,0 +1,203 @@
+"""Benchmark how long it takes to type-check MNE user code against the stubs.
+
+A corpus of typical MNE user scripts is checked with mypy against the generated
+stubs (see ``mne_stubgen/benchmark.py``), and the wall time, CPU time, and peak
+memory usage of cold and warm checks are compared to a stored baseline. This way,
+the cost of a change to the generator for our users' editors and CI can be
+quantified: e.g., of additional docstring markup, or of extra re-exports.
+
+The script exits with a non-zero status if any check got slower or used more
+memory than the given thresholds allow, or if mypy reports more errors in the
+corpus than in the baseline.
+"""
+
+import argparse
+import importlib.metadata
+import sys
+from pathlib import Path
+
+import mne
+
+from mne_stubgen.benchmark import compare_memory, run_benchmark
+from mne_stubgen.timing import (
+    Timer,
+    build_report,
+    compare_reports,
+    read_report,
+    write_report,
+)
+
+REPO_DIR = Path(__file__).parent
+BENCHMARKS_DIR = REPO_DIR / "benchmarks"
+
+
+def _parse_repeat(value: str) -> int:
+    try:
+        repeat = int(value)
+    except ValueError:
+        repeat = 0
+    if repeat < 1:
+        raise argparse.ArgumentTypeError(f"expected a positive integer, got: {value}")
+    return repeat
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Benchmark type-checking MNE user code against the stubs."
+    )
+    parser.add_argument(
+        "--stubs",
+        type=Path,
+        default=REPO_DIR / "typings",
+        metavar="DIR",
+        help="The directory containing the mne stub package. Default: %(default)s",
+    )
+    parser.add_argument(
+        "--corpus",
+        type=Path,
+        default=BENCHMARKS_DIR / "corpus",
+        metavar="DIR",
+        help="The directory of user scripts to check. Default: %(default)s",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=_parse_repeat,
+        default=3,
+        metavar="N",
+        help=(
+            "How often to run each check; the fastest run counts. "
+            "Default: %(default)s"
+        ),
+    )
+    parser.add_argument(
+        "--per-script",
+        action="store_true",
+        help="Additionally check each script on its own (cold).",
+    )
+    parser.add_argument(
+        "--report",
+        type=Path,
+        metavar="PATH",
+        help="Write the results to this JSON file.",
+    )
+    parser.add_argument(
+        "--baseline",
+        type=Path,
+        default=BENCHMARKS_DIR / "baseline.json",
+        metavar="PATH",
+        help=(
+            "The results to compare to, if the file exists. Baselines are only "
+            "meaningful on the machine they were recorded on. Default: %(default)s"
+        ),
+    )
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="Store the results as the new baseline instead of comparing to it.",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=10,
+        metavar="PERCENT",
+        help=(
+            "How much slower a check may get, or how much more memory it may use, "
+            "before it counts as a regression. Default: %(default)s"
+        ),
+    )
+    parser.add_argument(
+        "--min-seconds",
+        type=float,
+        default=0.5,
+        help=(
+            "Ignore checks that got slower by less than this many seconds. "
+            "Default: %(default)s"
+        ),
+    )
+    parser.add_argument(
+        "--min-mb",
+        type=float,
+        default=20,
+        help=(
+            "Ignore checks whose peak memory usage grew by less than this many "
+            "megabytes. Default: %(default)s"
+        ),
+    )
+    args = parser.parse_args(argv)
+
+    if not (args.stubs / "mne" / "__init__.pyi").exists():
+        sys.exit(
+            f"❌ No stubs found in {args.stubs}, run gen_type_stubs.py first or "
+            f"pass --stubs"
+        )
+    paths = sorted(args.corpus.glob("*.py"))
+    print(f"🔍 Checking {len(paths)} scripts from {args.corpus} against {args.stubs}")
+
+    phases, scripts, errors = run_benchmark(
+        paths, stubs_dir=args.stubs, repeat=args.repeat, per_script=args.per_script
+    )
+    for name, timer in [("all scripts", phases), *scripts.items()]:
+        for phase, timing in timer.phases.items():
+            peak_rss = (
+                ""
+                if timing.peak_rss is None
+                else f", {timing.peak_rss / 1024**2:.0f} MB"
+            )
+            print(
+                f"⏱️  {name + ' (' + phase + '):':<35} {timing.wall:8.2f} s wall, "
+                f"{timing.cpu:8.2f} s CPU{peak_rss}"
+            )
+    print(f"🔎 mypy reported {len(errors)} errors in the corpus")
+    for error in errors:
+        print(f"   {error}")
+
+    metadata = {
+        "mne_version": mne.__version__,
+        "mypy_version": importlib.metadata.version("mypy"),
+        "stubs": str(args.stubs),
+        "corpus": [path.name for path in paths],
+        "repeat": args.repeat,
+        "errors": len(errors),
+    }
+    current = build_report(
+        phases=phases, module_phases=Timer(), modules=scripts, metadata=metadata
+    )
+    for path in filter(
+        None, [args.report, args.baseline if args.update_baseline else None]
+    ):
+        print(f"💾 Writing results to: {path}")
+        write_report(path, current)
+    if args.update_baseline or not args.baseline.exists():
+        return
+
+    baseline = read_report(args.baseline)
+    print(f"\n🔍 Comparing to the baseline ({args.baseline})")
+    regressions = [
+        f"{r.name}: {r.baseline:.2f} s -> {r.current:.2f} s ({r.ratio:.1f}x)"
+        for r in compare_reports(
+            baseline,
+            current,
+            threshold=args.threshold / 100,
+            min_seconds=args.min_seconds,
+        )
+    ]
+    regressions += [
+        f"{name}: {before:.0f} MB -> {after:.0f} MB"
+        for name, before, after in compare_memory(
+            baseline, current, threshold=args.threshold / 100, min_mb=args.min_mb
+        )
+    ]
+    if len(errors) > baseline["errors"]:
+        regressions.append(f"errors: {baseline['errors']} -> {len(errors)}")
+    if not regressions:
+        print("\n💚 No regressions found!")
+        return
+
+    print(f"\n🐌 Found {len(regressions)} regressions:")
+    for regression in regressions:
+        print(f"   {regression}")
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+"""Find events, epoch the data, and average the epochs."""
+
+import mne
+
+sample_dir = mne.datasets.sample.data_path()
+raw = mne.io.read_raw_fif(sample_dir / "MEG" / "sample" / "sample_audvis_raw.fif")
+events = mne.find_events(raw, stim_channel="STI 014")
+event_id = {"auditory/left": 1, "auditory/right": 2, "visual/left": 3}
+
+epochs = mne.Epochs(
+    raw,
+    events,
+    event_id=event_id,
+    tmin=-0.2,
+    tmax=0.5,
+    baseline=(None, 0),
+    reject=dict(grad=4000e-13, mag=4e-12, eog=150e-6),
+    preload=True,
+)
+epochs.drop_bad()
+epochs.equalize_event_counts()
+
+evokeds: dict[str, mne.Evoked] = {
+    condition: epochs[condition].average() for condition in event_id
+}
+difference = mne.combine_evoked(
+    [evokeds["auditory/left"], evokeds["auditory/right"]], weights=[1, -1]
+)
+difference.plot_joint(show=False)
+mne.viz.plot_compare_evokeds(evokeds, picks="eeg", show=False)
+mne.write_evokeds("sample-ave.fif", list(evokeds.values()), overwrite=True)
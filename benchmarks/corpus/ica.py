@@ -0,0 +1,25 @@
+"""Remove ocular and cardiac artifacts via ICA."""
+
+import mne
+from mne.preprocessing import ICA, create_ecg_epochs, create_eog_epochs
+
+sample_dir = mne.datasets.sample.data_path()
+raw = mne.io.read_raw_fif(
+    sample_dir / "MEG" / "sample" / "sample_audvis_raw.fif", preload=True
+)
+filtered = raw.copy().filter(l_freq=1.0, h_freq=None)
+
+ica = ICA(n_components=20, max_iter="auto", random_state=97)
+ica.fit(filtered)
+
+eog_indices, eog_scores = ica.find_bads_eog(raw)
+ecg_epochs = create_ecg_epochs(raw)
+ecg_indices, ecg_scores = ica.find_bads_ecg(ecg_epochs, method="ctps")
+ica.exclude = eog_indices + ecg_indices
+
+ica.plot_scores(eog_scores, show=False)
+ica.plot_components(show=False)
+ica.plot_overlay(create_eog_epochs(raw).average(), show=False)
+
+cleaned = ica.apply(raw.copy())
+ica.save("sample-ica.fif", overwrite=True)
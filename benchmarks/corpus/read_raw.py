@@ -0,0 +1,24 @@
+"""Read, filter, and inspect continuous data."""
+
+import mne
+from mne.io import BaseRaw
+
+sample_dir = mne.datasets.sample.data_path()
+raw: BaseRaw = mne.io.read_raw_fif(
+    sample_dir / "MEG" / "sample" / "sample_audvis_raw.fif"
+)
+raw.crop(tmax=60.0).load_data()
+raw.pick(["meg", "eeg", "eog", "stim"])
+raw.filter(l_freq=0.1, h_freq=40.0)
+raw.notch_filter(freqs=[60.0, 120.0])
+raw.set_eeg_reference("average", projection=True)
+raw.resample(sfreq=200.0)
+
+info: mne.Info = raw.info
+print(info["sfreq"], len(info["ch_names"]), raw.times[-1])
+data = raw.get_data(picks="eeg", tmin=10.0, tmax=20.0)
+print(data.shape)
+
+spectrum = raw.compute_psd(fmax=50.0)
+spectrum.plot(average=True, show=False)
+raw.plot(duration=5.0, n_channels=30, show=False)
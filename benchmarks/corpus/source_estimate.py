@@ -0,0 +1,25 @@
+"""Estimate and visualize the sources of evoked responses."""
+
+import mne
+from mne.minimum_norm import apply_inverse, make_inverse_operator
+
+sample_dir = mne.datasets.sample.data_path()
+meg_dir = sample_dir / "MEG" / "sample"
+subjects_dir = sample_dir / "subjects"
+
+evoked = mne.read_evokeds(meg_dir / "sample_audvis-ave.fif", condition=0)
+assert isinstance(evoked, mne.Evoked)
+noise_cov = mne.read_cov(meg_dir / "sample_audvis-cov.fif")
+forward = mne.read_forward_solution(meg_dir / "sample_audvis-meg-oct-6-fwd.fif")
+
+inverse_operator = make_inverse_operator(evoked.info, forward, noise_cov, depth=0.8)
+stc = apply_inverse(evoked, inverse_operator, lambda2=1.0 / 9.0, method="dSPM")
+assert isinstance(stc, mne.SourceEstimate)
+
+peak_vertex, peak_time = stc.get_peak(hemi="lh")
+print(peak_vertex, peak_time)
+morphed = mne.compute_source_morph(
+    stc, subject_from="sample", subject_to="fsaverage", subjects_dir=subjects_dir
+).apply(stc)
+morphed.save("sample-dspm", overwrite=True)
+stc.plot(subjects_dir=subjects_dir, initial_time=0.1, hemi="split")
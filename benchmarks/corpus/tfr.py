@@ -0,0 +1,22 @@
+"""Compute and plot time-frequency representations."""
+
+import numpy as np
+
+import mne
+from mne.time_frequency import AverageTFR, tfr_morlet
+
+sample_dir = mne.datasets.sample.data_path()
+raw = mne.io.read_raw_fif(sample_dir / "MEG" / "sample" / "sample_audvis_raw.fif")
+events = mne.find_events(raw)
+epochs = mne.Epochs(raw, events, event_id=1, tmin=-0.5, tmax=1.0, preload=True)
+
+freqs = np.logspace(np.log10(4), np.log10(40), num=20)
+power = tfr_morlet(epochs, freqs=freqs, n_cycles=freqs / 2.0, return_itc=False, decim=3)
+assert isinstance(power, AverageTFR)
+power.apply_baseline(baseline=(-0.5, 0), mode="logratio")
+power.plot_topo(show=False)
+power.plot(picks="MEG 1332", show=False)
+
+spectrum = epochs.compute_psd(method="multitaper", fmin=2, fmax=40.0)
+psds, spectrum_freqs = spectrum.get_data(return_freqs=True)
+print(psds.mean(axis=0).shape, spectrum_freqs[:5])
@@ -0,0 +1,128 @@
+"""Check the size report of a stub generator run.
+
+Reports are written via ``python gen_type_stubs.py --size-report PATH``. Compared
+to the report of a baseline run – e.g. of the previous release – all stubs whose
+size, number of objects, imports, or import fan-out changed are listed. The
+script exits with a non-zero status if any stub grew by more than the given
+threshold, if any stub's import fan-out grew, or if any stub is larger than the
+given budget.
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+from mne_stubgen.sizes import (
+    compare_size_reports,
+    find_over_budget,
+    find_size_regressions,
+    read_size_report,
+)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Check the sizes of the generated stubs."
+    )
+    parser.add_argument("current", type=Path, help="The report of the current run.")
+    parser.add_argument(
+        "--baseline",
+        type=Path,
+        metavar="PATH",
+        help="The report of a baseline run to compare to, e.g. of the last release.",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=10,
+        metavar="PERCENT",
+        help=(
+            "How much a stub may grow before it counts as a regression. "
+            "Default: %(default)s"
+        ),
+    )
+    parser.add_argument(
+        "--min-kb",
+        type=float,
+        default=5,
+        help=(
+            "Ignore stubs that grew by less than this many kilobytes. "
+            "Default: %(default)s"
+        ),
+    )
+    parser.add_argument(
+        "--budget",
+        type=float,
+        metavar="KB",
+        help="Fail if any stub is larger than this many kilobytes.",
+    )
+    parser.add_argument(
+        "--top",
+        type=int,
+        default=20,
+        metavar="N",
+        help="Only list the N largest changes and docstrings. Default: %(default)s",
+    )
+    args = parser.parse_args(argv)
+
+    current = read_size_report(args.current)
+    print(f"🔍 Checking the stubs of MNE-Python {current['mne_version']}")
+    for flavor_name, flavor in current["flavors"].items():
+        print(
+            f"📏 {flavor_name}: {len(flavor['modules'])} stubs, "
+            f"{flavor['bytes'] / 1024:.0f} kB "
+            f"({flavor['docstring_bytes'] / 1024:.0f} kB docstrings)"
+        )
+        for docstring in flavor["largest_docstrings"][: args.top]:
+            print(f"   {docstring['bytes'] / 1024:6.1f} kB  {docstring['qualname']}")
+
+    failures = []
+    if args.baseline is not None:
+        baseline = read_size_report(args.baseline)
+        print(
+            f"\n🔍 Comparing to MNE-Python {baseline['mne_version']} "
+            f"({args.baseline})"
+        )
+        for flavor_name, flavor in current["flavors"].items():
+            before = baseline["flavors"].get(flavor_name)
+            if before is not None:
+                print(
+                    f"📏 {flavor_name}: {before['bytes'] / 1024:.0f} kB -> "
+                    f"{flavor['bytes'] / 1024:.0f} kB"
+                )
+        changes = compare_size_reports(baseline, current)
+        for change in changes[: args.top]:
+            print(
+                f"   {change.name}: {change.metric} "
+                f"{'-' if change.baseline is None else change.baseline} -> "
+                f"{'-' if change.current is None else change.current}"
+            )
+        failures += [
+            f"{change.name}: {change.metric} {change.baseline} -> {change.current}"
+            for change in find_size_regressions(
+                changes,
+                threshold=args.threshold / 100,
+                min_bytes=int(args.min_kb * 1024),
+            )
+        ]
+
+    if args.budget is not None:
+        failures += [
+            f"{name}: {n_bytes / 1024:.0f} kB, budget {args.budget:.0f} kB"
+            for name, n_bytes in find_over_budget(
+                current, budget=int(args.budget * 1024)
+            )
+        ]
+
+    if not failures:
+        print("\n💚 All stubs are within budget!")
+        return
+
+    print(f"\n🐘 Found {len(failures)} stubs that grew too much:")
+    for failure in failures:
+        print(f"   {failure}")
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
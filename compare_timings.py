@@ -0,0 +1,81 @@
+"""Compare the timing reports of two runs of the stub generator.
+
+Reports are written via ``python gen_type_stubs.py --timings PATH``. The script
+exits with a non-zero status if any phase – of the entire run or of a single
+module – got slower by more than the given threshold, e.g. after upgrading MNE or
+changing the generator.
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+from mne_stubgen.timing import compare_reports, read_report
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Compare the timing reports of two stub generator runs."
+    )
+    parser.add_argument("baseline", type=Path, help="The report of the baseline run.")
+    parser.add_argument("current", type=Path, help="The report of the current run.")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=10,
+        metavar="PERCENT",
+        help=(
+            "How much slower a phase may get before it counts as a regression. "
+            "Default: %(default)s"
+        ),
+    )
+    parser.add_argument(
+        "--min-seconds",
+        type=float,
+        default=0.1,
+        help=(
+            "Ignore phases that got slower by less than this many seconds, to "
+            "filter out noise. Default: %(default)s"
+        ),
+    )
+    parser.add_argument(
+        "--top",
+        type=int,
+        default=20,
+        metavar="N",
+        help="Only list the N largest regressions. Default: %(default)s",
+    )
+    args = parser.parse_args(argv)
+
+    baseline = read_report(args.baseline)
+    current = read_report(args.current)
+    print(
+        f"🔍 Comparing MNE-Python {current['mne_version']} run ({args.current}) "
+        f"to MNE-Python {baseline['mne_version']} baseline ({args.baseline})"
+    )
+    for name, timing in current["phases"].items():
+        before = baseline["phases"].get(name)
+        change = "" if before is None else f" (was {before['wall']:.2f} s)"
+        print(f"⏱️  {name + ':':<20} {timing['wall']:8.2f} s{change}")
+
+    regressions = compare_reports(
+        baseline,
+        current,
+        threshold=args.threshold / 100,
+        min_seconds=args.min_seconds,
+    )
+    if not regressions:
+        print("\n💚 No regressions found!")
+        return
+
+    print(f"\n🐌 Found {len(regressions)} regressions:")
+    for regression in regressions[: args.top]:
+        print(
+            f"   {regression.name}: {regression.baseline:.2f} s -> "
+            f"{regression.current:.2f} s ({regression.ratio:.1f}x)"
+        )
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
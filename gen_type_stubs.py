@@ -0,0 +1,918 @@
+"""Generate type stubs for MNE-Python.
+
+All requested flavors of stubs (see ``mne_stubgen/flavors.py``) are generated in
+a single pass: running stubgen, importing MNE, expanding the docstrings, and
+adding parameter default values happens only once, and only the final rendering
+step is done separately for each flavor.
+"""
+
+import argparse
+import subprocess
+import sys
+import traceback
+from functools import partial
+from pathlib import Path
+
+import mne
+
+import mne_stubgen
+from mne_stubgen.artifact_cache import compute_fingerprint, restore_stubs, store_stubs
+from mne_stubgen.dedupe import dedupe_inherited_methods
+from mne_stubgen.defaults import stub_path_to_module_name
+from mne_stubgen.docstring_cache import DocstringCache
+from mne_stubgen.expand import process_stub
+from mne_stubgen.flavors import FLAVORS
+from mne_stubgen.import_graph import find_imports
+from mne_stubgen.manifest import (
+    MANIFEST_FILENAME,
+    STUB_RECORDS,
+    build_manifest,
+    get_stale_sources,
+    hash_sources,
+    hash_stub_trees,
+    read_manifest,
+    source_to_stub_path,
+    write_manifest,
+)
+from mne_stubgen.output import can_prune, prepare_staging_dir, sync_output
+from mne_stubgen.parallel import resolve_jobs
+from mne_stubgen.prune import prune_reexports
+from mne_stubgen.public_api import find_public_modules
+from mne_stubgen.sizes import build_size_report, write_size_report
+from mne_stubgen.stubgen_shards import generate_and_process_stubs, generate_stubs
+from mne_stubgen.symbols import is_up_to_date, write_symbols
+from mne_stubgen.timing import Timer, build_report, get_peak_rss, write_report
+from mne_stubgen.verify import verify_stubs
+from mne_stubgen.watch import forget_modules, take_snapshot, wait_for_changes
+
+# Module exclusion patterns
+# Note that __init__.py files are handled specially below, do not
+# include them here.
+MODULE_PY_EXCLUDE_PATTERNS = [
+    "mne/report/js_and_css/bootstrap-icons/gen_css_for_mne.py",  # cannot be imported
+    "**/tests/**",  # don't include any tests
+]
+
+MNE_INSTALL_DIR = Path(mne.__path__[0])
+SITE_PACKAGES_DIR = MNE_INSTALL_DIR.parent
+
+REPO_DIR = Path(__file__).parent
+
+
+def discover_sources() -> tuple[list[Path], list[Path]]:
+    """Find the MNE modules to generate stubs for.
+
+    Returns
+    -------
+    module_py_paths
+        The ``.py`` files of the modules.
+    init_pyi_paths
+        The ``__init__.pyi`` files of the lazily loaded packages.
+    """
+    # Generate list of module paths we want to process
+    # We first glob all modules, then drop all that were selected for exclusion
+
+    module_py_paths = list(MNE_INSTALL_DIR.rglob("*.py"))
+    module_py_paths_excludes = []
+    for module_py_path in module_py_paths:
+        for exclude_pattern in MODULE_PY_EXCLUDE_PATTERNS:
+            if module_py_path.match(exclude_pattern):
+                module_py_paths_excludes.append(module_py_path)
+
+    # Additionally to the exclusion patterns specified above, we also
+    # exclude all __init__.py files for which a .pyi type stub already exists
+    # for lazy loading. But we keep the remaining __init__.py files
+    init_pyi_paths = list(MNE_INSTALL_DIR.rglob("__init__.pyi"))
+    for init_pyi_path in init_pyi_paths:
+        if init_pyi_path.with_suffix(".py") in module_py_paths:
+            module_py_paths_excludes.append(init_pyi_path.with_suffix(".py"))
+
+    module_py_paths = sorted(set(module_py_paths) - set(module_py_paths_excludes))
+    return module_py_paths, init_pyi_paths
+
+
+def _parse_out_dir(value: str) -> tuple[str, Path]:
+    flavor_name, sep, out_dir = value.partition("=")
+    if not sep or flavor_name not in FLAVORS:
+        raise argparse.ArgumentTypeError(
+            f"expected FLAVOR=DIR with FLAVOR one of {', '.join(FLAVORS)}, "
+            f"got: {value}"
+        )
+    return flavor_name, Path(out_dir)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Generate type stubs for MNE-Python.")
+    parser.add_argument(
+        "--flavor",
+        action="append",
+        choices=list(FLAVORS),
+        dest="flavors",
+        help=(
+            "The flavor of stubs to generate. Can be passed multiple times. "
+            "By default, all flavors are generated."
+        ),
+    )
+    parser.add_argument(
+        "--out-dir",
+        action="append",
+        type=_parse_out_dir,
+        default=[],
+        metavar="FLAVOR=DIR",
+        help=(
+            "The output directory for a flavor, relative to the repository root. "
+            "Can be passed multiple times. Defaults: "
+            + ", ".join(f"{f.name}={f.default_out_dir}" for f in FLAVORS.values())
+        ),
+    )
+    parser.add_argument(
+        "--import-docstrings",
+        action="store_true",
+        help=(
+            "Expand all docstrings by importing the MNE modules. By default, "
+            "docstrings are expanded from the source code where possible, and "
+            "modules are only imported for those that cannot be expanded this way."
+        ),
+    )
+    parser.add_argument(
+        "--docstring-cache",
+        type=Path,
+        default=REPO_DIR / ".stubgen-cache" / "docstrings.sqlite",
+        metavar="PATH",
+        help=(
+            "The cache of expanded docstrings, shared by all runs. "
+            "Default: %(default)s"
+        ),
+    )
+    parser.add_argument(
+        "--no-docstring-cache",
+        action="store_true",
+        help="Do not use the cache of expanded docstrings.",
+    )
+    parser.add_argument(
+        "--docstring-cache-size",
+        type=int,
+        default=256,
+        metavar="MB",
+        help=(
+            "The maximum size of the docstring cache in megabytes. The least "
+            "recently used docstrings are evicted first. Default: %(default)s"
+        ),
+    )
+    parser.add_argument(
+        "--artifact-cache",
+        type=Path,
+        metavar="DIR",
+        help=(
+            "A cache of complete stub trees, e.g. shared between CI runs. If the "
+            "inputs of a flavor – MNE's sources, the generator, and the tool "
+            "versions – match a previous run, its stubs are restored from there "
+            "instead of being generated."
+        ),
+    )
+    parser.add_argument(
+        "--artifact-cache-entries",
+        type=int,
+        default=10,
+        metavar="N",
+        help=(
+            "The maximum number of stub trees in the artifact cache. The least "
+            "recently used ones are evicted first. Default: %(default)s"
+        ),
+    )
+    parser.add_argument(
+        "--symbols-db",
+        type=Path,
+        metavar="PATH",
+        help=(
+            "Additionally write an SQLite database of all classes, functions, and "
+            "methods – their signatures, docstrings in each flavor, and source "
+            "locations – to this file, for tools that look up single objects."
+        ),
+    )
+    parser.add_argument(
+        "--verify",
+        action="store_true",
+        help=(
+            "Check that the classes, functions, and methods in the stubs match "
+            "the runtime objects – their existence and their parameters – and "
+            "fail if they don't. Only modules that changed since the last check "
+            "are verified again."
+        ),
+    )
+    parser.add_argument(
+        "--verification-cache",
+        type=Path,
+        default=REPO_DIR / ".stubgen-cache" / "verification.json",
+        metavar="PATH",
+        help="The cache of verification results. Default: %(default)s",
+    )
+    parser.add_argument(
+        "--no-verification-cache",
+        action="store_true",
+        help="Verify all stubs, ignoring the cache of verification results.",
+    )
+    parser.add_argument(
+        "--public-api",
+        action="store_true",
+        help=(
+            "Only generate stubs for the modules reachable from the public API, "
+            "i.e. through the imports in the packages' __init__ files, starting "
+            "from mne/__init__.pyi. Type checkers use MNE's own sources for all "
+            "other modules."
+        ),
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only regenerate the stubs of MNE modules that changed since the last run.",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help=(
+            "Keep running, and regenerate the stubs of MNE modules whenever their "
+            "sources change. Stop with Ctrl+C."
+        ),
+    )
+    parser.add_argument(
+        "--watch-interval",
+        type=float,
+        default=0.5,
+        metavar="SECONDS",
+        help="How often to check for changes in watch mode. Default: %(default)s",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help=(
+            "Number of worker processes to use for stub generation, docstring "
+            "expansion, and cleaning. Use 0 to start one worker per CPU."
+        ),
+    )
+    parser.add_argument(
+        "--timings",
+        type=Path,
+        metavar="PATH",
+        help=(
+            "Write a JSON report of the wall time, CPU time, and peak memory usage "
+            "of each phase and module to this file. Use compare_timings.py to "
+            "compare two reports."
+        ),
+    )
+    parser.add_argument(
+        "--size-report",
+        type=Path,
+        metavar="PATH",
+        help=(
+            "Write a JSON report of the size, docstring size, number of objects, "
+            "imports, and import fan-out of each stub to this file. Use "
+            "check_sizes.py to compare two reports or to enforce a size budget."
+        ),
+    )
+    parser.add_argument(
+        "--cprofile",
+        type=Path,
+        metavar="DIR",
+        help=(
+            "Run each phase under cProfile and write the profiles to this "
+            "directory. Work done in worker processes is only included with "
+            "--jobs 1."
+        ),
+    )
+    args = parser.parse_args(argv)
+    if args.watch:
+        watch(args)
+    else:
+        generate(args)
+
+
+def watch(args: argparse.Namespace) -> None:
+    """Regenerate the stubs whenever MNE's sources change, until interrupted."""
+    snapshot = take_snapshot(MNE_INSTALL_DIR)
+    try:
+        while True:
+            try:
+                generate(args)
+            except SystemExit as e:
+                if e.code:
+                    print("❌ Generating the stubs failed, waiting for the next change")
+            except Exception:
+                traceback.print_exc()
+                print("❌ Generating the stubs failed, waiting for the next change")
+            # All runs but the first only regenerate what changed
+            args.incremental = True
+            print(f"\n👀 Watching {MNE_INSTALL_DIR} for changes, stop with Ctrl+C")
+            snapshot, changed_paths = wait_for_changes(
+                MNE_INSTALL_DIR, snapshot, interval=args.watch_interval
+            )
+            for path in changed_paths:
+                print(f"✏️  Changed: {path.relative_to(SITE_PACKAGES_DIR)}")
+            manifest = read_manifest(next(iter(_get_flavor_out_dirs(args).values())))
+            forget_modules(
+                {
+                    source_to_stub_path(str(path.relative_to(SITE_PACKAGES_DIR)))
+                    for path in changed_paths
+                },
+                imports=None if manifest is None else manifest["imports"],
+            )
+    except KeyboardInterrupt:
+        print("\n👋 Stopped watching")
+
+
+def verify(stubs_dir: Path, args: argparse.Namespace) -> int:
+    """Compare the stubs listed in a directory's manifest to MNE's runtime objects.
+
+    Returns
+    -------
+    n_errors
+        The number of mismatches found.
+    """
+    manifest = read_manifest(stubs_dir)
+    result = verify_stubs(
+        stubs_dir,
+        sources={} if manifest is None else manifest["sources"],
+        mne_version=mne.__version__,
+        cache_path=None if args.no_verification_cache else args.verification_cache,
+        jobs=args.jobs,
+    )
+    print(
+        f"🔬 Verified {result.n_verified} stubs against MNE's runtime objects, "
+        f"{result.n_cached} unchanged ones were skipped"
+    )
+    n_errors = sum(len(errors) for errors in result.errors.values())
+    if n_errors:
+        print(
+            f"❌ Found {n_errors} mismatches in {len(result.errors)} stubs "
+            f"in {stubs_dir}:"
+        )
+        for errors in result.errors.values():
+            for error in errors:
+                print(f"   {error}")
+    return n_errors
+
+
+def report_sizes(
+    path: Path, flavor_out_dirs: dict[str, Path], *, fan_out: dict[str, dict]
+) -> None:
+    """Write the size report of the stubs, and print the largest ones."""
+    print(f"📏 Writing size report to: {path}")
+    size_report = build_size_report(
+        flavor_out_dirs,
+        fan_out=fan_out,
+        metadata={"mne_version": mne.__version__},
+    )
+    write_size_report(path, size_report)
+    for flavor_name, flavor_sizes in size_report["flavors"].items():
+        largest = sorted(
+            flavor_sizes["modules"].items(),
+            key=lambda item: item[1]["bytes"],
+            reverse=True,
+        )[:3]
+        print(
+            f"📏 {flavor_name} stubs: {flavor_sizes['bytes'] / 1024:.0f} kB, "
+            f"{flavor_sizes['docstring_bytes'] / 1024:.0f} kB of which are "
+            f"docstrings; largest: "
+            + ", ".join(
+                f"{rel_path} ({module['bytes'] / 1024:.0f} kB)"
+                for rel_path, module in largest
+            )
+        )
+
+
+def report_timings(
+    timer: Timer,
+    module_timers: dict[str, Timer],
+    args: argparse.Namespace,
+    *,
+    flavors: list[str],
+    incremental: bool,
+) -> None:
+    """Print the timings of the run, and write them to ``--timings`` if given."""
+    # Per-module phases, summed over all modules
+    module_phases = Timer()
+    for module_timer in module_timers.values():
+        module_phases.add(module_timer)
+    timer.print_summary()
+    if module_timers:
+        print("⏱️  Of which spent processing the individual modules:")
+        module_phases.print_summary()
+    peak_rss = get_peak_rss()
+    if peak_rss is not None:
+        print(f"⏱️  Peak memory usage of a single process: {peak_rss / 1024**2:.0f} MB")
+    if args.timings is not None:
+        print(f"⏱️  Writing timing report to: {args.timings}")
+        report = build_report(
+            phases=timer,
+            module_phases=module_phases,
+            modules=module_timers,
+            metadata={
+                "mne_version": mne.__version__,
+                "flavors": flavors,
+                "jobs": args.jobs,
+                "incremental": incremental,
+                "peak_rss": peak_rss,
+            },
+        )
+        write_report(args.timings, report)
+
+
+def _get_flavor_out_dirs(args: argparse.Namespace) -> dict[str, Path]:
+    flavor_out_dirs = {
+        flavor_name: REPO_DIR / FLAVORS[flavor_name].default_out_dir
+        for flavor_name in (args.flavors or FLAVORS)
+    }
+    for flavor_name, out_dir in args.out_dir:
+        if flavor_name in flavor_out_dirs:
+            flavor_out_dirs[flavor_name] = REPO_DIR / out_dir
+    return flavor_out_dirs
+
+
+def _can_prune(out_dir: Path) -> bool:
+    # The default output directories belong to the generator, even without a
+    # manifest: that of the committed stubs isn't committed along with them
+    default_out_dirs = {
+        (REPO_DIR / flavor.default_out_dir).resolve() for flavor in FLAVORS.values()
+    }
+    if out_dir.resolve() in default_out_dirs or can_prune(
+        out_dir, marker=MANIFEST_FILENAME
+    ):
+        return True
+    print(
+        f"⚠️  {out_dir} was not written by a previous run, not removing any stubs "
+        f"from it"
+    )
+    return False
+
+
+def generate(args: argparse.Namespace) -> None:
+    """Generate the stubs of all requested flavors."""
+    timer = Timer(profile_dir=args.cprofile)
+
+    flavor_out_dirs = _get_flavor_out_dirs(args)
+
+    print(f"🔍 Found MNE-Python {mne.__version__} installation in {MNE_INSTALL_DIR}")
+    for flavor_name, out_dir in flavor_out_dirs.items():
+        print(f"💡 Will store the {flavor_name} type stubs in: {out_dir}")
+    # The flavors only differ in their docstrings, so verifying one is enough
+    verify_out_dir = next(iter(flavor_out_dirs.values()))
+
+    with timer.phase("discovery"):
+        module_py_paths, init_pyi_paths = discover_sources()
+        if args.public_api:
+            public_paths = find_public_modules(
+                module_py_paths + init_pyi_paths, source_root=SITE_PACKAGES_DIR
+            )
+            print(
+                f"🔍 {len(public_paths)} of {len(module_py_paths + init_pyi_paths)} "
+                f"modules are part of the public API"
+            )
+            module_py_paths = [p for p in module_py_paths if p in public_paths]
+            init_pyi_paths = [p for p in init_pyi_paths if p in public_paths]
+
+    # Determine which stubs need to be (re-)generated. Unless we're running in
+    # incremental mode, we always start from scratch. Each output directory keeps
+    # its own manifest; we regenerate everything that's stale in any of them.
+    with timer.phase("manifest"):
+        manifest = build_manifest(
+            source_paths=module_py_paths + init_pyi_paths,
+            source_root=SITE_PACKAGES_DIR,
+            generator_paths=[
+                Path(__file__),
+                *Path(mne_stubgen.__file__).parent.glob("*.py"),
+            ],
+            options={
+                "import_docstrings": args.import_docstrings,
+                "public_api": args.public_api,
+            },
+        )
+        flavor_manifests = {
+            flavor_name: {**manifest, "flavor": flavor_name}
+            for flavor_name in flavor_out_dirs
+        }
+
+    # Restore the stubs of the flavors whose inputs are the same as in a previous
+    # run
+    fingerprints = {}
+    if args.artifact_cache is not None:
+        fingerprints = {
+            flavor_name: compute_fingerprint(manifest, flavor_name=flavor_name)
+            for flavor_name in flavor_out_dirs
+        }
+    if fingerprints and (args.symbols_db is not None or args.size_report is not None):
+        print(
+            "🗃️  Not restoring any stubs from the artifact cache, --symbols-db and "
+            "--size-report require generating them"
+        )
+    elif fingerprints:
+        with timer.phase("artifact cache"):
+            for flavor_name, fingerprint in fingerprints.items():
+                out_dir = flavor_out_dirs[flavor_name]
+                if not (args.artifact_cache / fingerprint).is_dir():
+                    continue
+                stats = restore_stubs(
+                    args.artifact_cache,
+                    fingerprint,
+                    out_dir,
+                    prune=_can_prune(out_dir),
+                )
+                if stats is None:
+                    continue
+                print(
+                    f"🗃️  Restored the {flavor_name} stubs from the artifact cache, "
+                    f"updated {out_dir}: {stats.n_changed} new or changed, "
+                    f"{stats.n_unchanged} unchanged, {stats.n_removed} removed files"
+                )
+                del flavor_out_dirs[flavor_name]
+                del flavor_manifests[flavor_name]
+        if not flavor_out_dirs:
+            if args.verify and verify(verify_out_dir, args):
+                sys.exit(1)
+            report_timings(
+                timer, {}, args, flavors=list(fingerprints), incremental=False
+            )
+            print("\n💚 Done! Happy typing!")
+            return
+
+    stale_sources = None
+    if args.incremental:
+        with timer.phase("manifest"):
+            old_manifests = {
+                name: read_manifest(out_dir)
+                for name, out_dir in flavor_out_dirs.items()
+            }
+            stale_sources_per_flavor = [
+                get_stale_sources(old_manifests[name], flavor_manifests[name], out_dir)
+                for name, out_dir in flavor_out_dirs.items()
+            ]
+        if None in stale_sources_per_flavor:
+            print("🧮 Existing stubs cannot be reused, doing a full rebuild")
+        elif args.symbols_db is not None and not is_up_to_date(
+            args.symbols_db, hash_stub_trees(old_manifests)
+        ):
+            print(
+                "🧮 The symbol database doesn't match the existing stubs, doing a "
+                "full rebuild"
+            )
+        else:
+            # What we know about the stubs that won't be regenerated stays the same
+            for flavor_name, old_manifest in old_manifests.items():
+                for key in STUB_RECORDS:
+                    flavor_manifests[flavor_name][key] = old_manifest.get(key, {})
+            stale_sources = (
+                set().union(*(changed for changed, _ in stale_sources_per_flavor)),
+                set().union(*(removed for _, removed in stale_sources_per_flavor)),
+            )
+
+    removed_stubs = []
+    if stale_sources is not None:
+        changed_sources, removed_sources = stale_sources
+        print(
+            f"🧮 Incremental run: {len(changed_sources)} new or changed and "
+            f"{len(removed_sources)} removed modules"
+        )
+        removed_stubs = [source_to_stub_path(source) for source in removed_sources]
+        for flavor_manifest in flavor_manifests.values():
+            for stub in [
+                *removed_stubs,
+                *(source_to_stub_path(source) for source in changed_sources),
+            ]:
+                for key in STUB_RECORDS:
+                    flavor_manifest[key].pop(stub, None)
+
+        module_py_paths = [
+            p
+            for p in module_py_paths
+            if str(p.relative_to(SITE_PACKAGES_DIR)) in changed_sources
+        ]
+        init_pyi_paths = [
+            p
+            for p in init_pyi_paths
+            if str(p.relative_to(SITE_PACKAGES_DIR)) in changed_sources
+        ]
+        if not module_py_paths and not init_pyi_paths and not removed_stubs:
+            for flavor_name, out_dir in flavor_out_dirs.items():
+                write_manifest(out_dir, flavor_manifests[flavor_name])
+            # Nothing was regenerated, but the existing stubs still need to pass
+            if args.verify:
+                with timer.phase("verification"):
+                    if verify(verify_out_dir, args):
+                        sys.exit(1)
+            # It was checked above that the database matches the existing stubs
+            if args.symbols_db is not None:
+                print(f"💾 The symbol database is up to date: {args.symbols_db}")
+            if args.size_report is not None:
+                with timer.phase("size report"):
+                    report_sizes(
+                        args.size_report,
+                        flavor_out_dirs,
+                        fan_out={
+                            flavor_name: prune_reexports(
+                                {}, fallback_dir=out_dir
+                            ).fan_out_after
+                            for flavor_name, out_dir in flavor_out_dirs.items()
+                        },
+                    )
+            report_timings(
+                timer, {}, args, flavors=list(flavor_out_dirs), incremental=True
+            )
+            print("\n💚 Stubs are up to date, nothing to do!")
+            return
+
+    # All output is written to a staging directory first; only the files that
+    # actually changed end up in the output directory at the very end, so the
+    # others keep their modification times
+    staging_dirs = {
+        flavor_name: prepare_staging_dir(out_dir)
+        for flavor_name, out_dir in flavor_out_dirs.items()
+    }
+
+    docstring_cache = None
+    needs_docstrings = any(
+        FLAVORS[flavor_name].render_docstring is not None
+        for flavor_name in flavor_out_dirs
+    )
+    if needs_docstrings and not args.no_docstring_cache:
+        print(f"🗃️  Using docstring cache: {args.docstring_cache}")
+        docstring_cache = DocstringCache(
+            args.docstring_cache,
+            mne_version=mne.__version__,
+            global_sources_hash=hash_sources(manifest["global_sources"]),
+            sources_hash=hash_sources(
+                {**manifest["global_sources"], **manifest["sources"]}
+            ),
+        )
+        docstring_cache.prepare()
+
+    stub_rel_paths = [
+        Path(source_to_stub_path(str(p.relative_to(SITE_PACKAGES_DIR))))
+        for p in module_py_paths + init_pyi_paths
+    ]
+
+    # Create stubs; stubgen output is an intermediate result shared by all flavors,
+    # and all further processing happens in memory. For each stub, we iterate over
+    # all top-level objects and replace the docstrings with the expanded docstrings
+    # (filled from MNE's docdict, or generated through importing the respective .py
+    # modules), add the parameter default values, then render the stub in every
+    # flavor.
+    process = partial(
+        process_stub,
+        flavors=list(flavor_out_dirs),
+        source_dir=None if args.import_docstrings else SITE_PACKAGES_DIR,
+        docstring_cache=docstring_cache,
+        with_symbols=args.symbols_db is not None,
+    )
+    if resolve_jobs(args.jobs) == 1:
+        with timer.phase("stubgen"):
+            print("⏳ Generating type stubs …")
+            generated_stubs = generate_stubs(
+                module_py_paths + init_pyi_paths,
+                site_packages_dir=SITE_PACKAGES_DIR,
+                jobs=args.jobs,
+            )
+        with timer.phase("processing"):
+            results = [process((p, generated_stubs[p])) for p in stub_rel_paths]
+    else:
+        # The stubs of each stubgen shard are processed while stubgen is still
+        # running on the other shards, so both phases are measured together
+        with timer.phase("stubgen + processing"):
+            print("⏳ Generating type stubs …")
+            results = generate_and_process_stubs(
+                module_py_paths + init_pyi_paths,
+                process,
+                site_packages_dir=SITE_PACKAGES_DIR,
+                jobs=args.jobs,
+                order=stub_rel_paths,
+            )
+    module_timers = {result.module_name: result.timer for result in results}
+
+    # Stubs that failed to process keep their previous version in the output
+    # directories. Their sources are left out of the manifest, so the next
+    # incremental run tries again.
+    failed = [
+        result
+        for result in results
+        if result.error is not None or result.defaults_errors
+    ]
+    results = [
+        result
+        for result in results
+        if result.error is None and not result.defaults_errors
+    ]
+    stub_sources = {
+        Path(source_to_stub_path(source)): source for source in manifest["sources"]
+    }
+    for result in failed:
+        for flavor_manifest in flavor_manifests.values():
+            flavor_manifest["sources"].pop(stub_sources[result.stub_rel_path], None)
+    # Stubs that may contain docstrings or default values copied from other
+    # modules at runtime are regenerated whenever a module they import changes
+    with timer.phase("manifest"):
+        imports = find_imports(
+            module_py_paths + init_pyi_paths, source_root=SITE_PACKAGES_DIR
+        )
+    for flavor_manifest in flavor_manifests.values():
+        flavor_manifest.setdefault("uses_runtime", {}).update(
+            {
+                str(result.stub_rel_path): True
+                for result in results
+                if result.uses_runtime
+            }
+        )
+        flavor_manifest.setdefault("imports", {}).update(imports)
+
+    flavor_stubs = {
+        flavor_name: {
+            result.stub_rel_path: result.outputs[flavor_name] for result in results
+        }
+        for flavor_name in flavor_out_dirs
+    }
+
+    if docstring_cache is not None:
+        n_evicted = docstring_cache.prune(args.docstring_cache_size * 1024**2)
+        if n_evicted:
+            print(f"🗃️  Evicted {n_evicted} docstrings from the cache")
+
+    # Drop methods identical to the ones they override; this needs the final stubs
+    # of all base classes, so it can only be done once all modules are processed
+    with timer.phase("dedupe"):
+        for flavor_name, stubs in flavor_stubs.items():
+            dedupe_result = dedupe_inherited_methods(
+                stubs,
+                fallback_dir=(
+                    None if stale_sources is None else flavor_out_dirs[flavor_name]
+                ),
+            )
+            flavor_manifests[flavor_name].setdefault("dependencies", {}).update(
+                {
+                    stub: dependencies
+                    for stub, dependencies in dedupe_result.dependencies.items()
+                    if dependencies
+                }
+            )
+            print(
+                f"🧹 Removed {dedupe_result.n_removed} inherited methods "
+                f"({dedupe_result.n_bytes / 1024:.1f} kB) from the {flavor_name} "
+                f"stubs"
+            )
+
+    # Drop the imports that are neither used nor part of the public API, so type
+    # checkers don't need to load all the modules they refer to
+    fan_out = {}
+    with timer.phase("pruning"):
+        for flavor_name, stubs in flavor_stubs.items():
+            flavor_manifest = flavor_manifests[flavor_name]
+            prune_result = prune_reexports(
+                stubs,
+                fallback_dir=(
+                    None if stale_sources is None else flavor_out_dirs[flavor_name]
+                ),
+                removed=removed_stubs,
+                pruned=flavor_manifest.get("pruned_imports"),
+            )
+            flavor_manifest.setdefault("pruned_imports", {}).update(prune_result.pruned)
+            fan_out[flavor_name] = prune_result.fan_out_after
+            fan_out_before = sum(prune_result.fan_out_before.values())
+            fan_out_after = sum(prune_result.fan_out_after.values())
+            n_stubs = len(prune_result.fan_out_after)
+            print(
+                f"🌳 Removed {prune_result.n_removed} unused imports from the "
+                f"{flavor_name} stubs, restored {prune_result.n_restored}"
+            )
+            print(
+                f"🌳 Stubs transitively import {fan_out_before / n_stubs:.1f} → "
+                f"{fan_out_after / n_stubs:.1f} other stubs on average "
+                f"(max. {max(prune_result.fan_out_before.values())} → "
+                f"{max(prune_result.fan_out_after.values())})"
+            )
+
+    # Write each stub exactly once
+    with timer.phase("writing"):
+        for flavor_name, stubs in flavor_stubs.items():
+            for stub_rel_path, stub_source in stubs.items():
+                out_path = staging_dirs[flavor_name] / stub_rel_path
+                print(f"💾 Writing {flavor_name} stub file to disk: {out_path}")
+                out_path.parent.mkdir(parents=True, exist_ok=True)
+                out_path.write_text(stub_source, encoding="utf-8")
+
+    with timer.phase("py.typed"):
+        print("💾 Writing py.typed files")
+        for staging_dir in staging_dirs.values():
+            (staging_dir / "mne").mkdir(parents=True, exist_ok=True)
+            (staging_dir / "mne" / "py.typed").write_text("partial\n", encoding="utf-8")
+
+    ruff_targets = [str(staging_dir / "mne") for staging_dir in staging_dirs.values()]
+
+    print("😵 Running Ruff linter on stub files")
+    with timer.phase("ruff lint"):
+        ruff_lint = subprocess.run(
+            ["ruff", "--ignore=F811,F821", "--fix", *ruff_targets]
+        )
+    if ruff_lint.returncode != 0:
+        sys.exit(1)
+
+    print("⚫️ Running Ruff formatter on stub files")
+    with timer.phase("ruff format"):
+        ruff_format = subprocess.run(["ruff", "format", *ruff_targets])
+    if ruff_format.returncode != 0:
+        sys.exit(1)
+
+    with timer.phase("manifest"):
+        for flavor_name, staging_dir in staging_dirs.items():
+            write_manifest(staging_dir, flavor_manifests[flavor_name])
+
+    with timer.phase("sync"):
+        for flavor_name, out_dir in flavor_out_dirs.items():
+            stats = sync_output(
+                staging_dirs[flavor_name],
+                out_dir,
+                prune=stale_sources is None and _can_prune(out_dir),
+                removed=removed_stubs,
+                keep=[str(result.stub_rel_path) for result in failed],
+                last=MANIFEST_FILENAME,
+            )
+            print(
+                f"🔄 Updated {out_dir}: {stats.n_changed} new or changed, "
+                f"{stats.n_unchanged} unchanged, {stats.n_removed} removed files"
+            )
+
+    n_verification_errors = 0
+    if args.verify:
+        with timer.phase("verification"):
+            n_verification_errors = verify(verify_out_dir, args)
+
+    # Incremental output depends on the previous state of the output directories,
+    # so only the output of full runs is stored
+    if (
+        args.artifact_cache is not None
+        and stale_sources is None
+        and not failed
+        and not n_verification_errors
+    ):
+        with timer.phase("artifact cache"):
+            print(f"🗃️  Storing the stubs in the artifact cache: {args.artifact_cache}")
+            for flavor_name, out_dir in flavor_out_dirs.items():
+                store_stubs(
+                    args.artifact_cache,
+                    fingerprints[flavor_name],
+                    out_dir,
+                    max_entries=args.artifact_cache_entries,
+                )
+
+    if args.symbols_db is not None:
+        with timer.phase("symbols"):
+            symbols = [symbol for result in results for symbol in result.symbols]
+            print(f"💾 Writing {len(symbols)} objects to: {args.symbols_db}")
+            write_symbols(
+                args.symbols_db,
+                symbols,
+                {
+                    alias: target
+                    for result in results
+                    for alias, target in result.aliases.items()
+                },
+                flavors=list(flavor_out_dirs),
+                stubs_hash=hash_stub_trees(flavor_manifests),
+                update=(
+                    None
+                    if stale_sources is None
+                    else [
+                        stub_path_to_module_name(Path(stub), Path())
+                        for stub in [
+                            *removed_stubs,
+                            *(result.stub_rel_path for result in results),
+                        ]
+                    ]
+                ),
+            )
+
+    if args.size_report is not None:
+        with timer.phase("size report"):
+            report_sizes(args.size_report, flavor_out_dirs, fan_out=fan_out)
+
+    report_timings(
+        timer,
+        module_timers,
+        args,
+        flavors=list(flavor_out_dirs),
+        incremental=stale_sources is not None,
+    )
+
+    for flavor_name, out_dir in flavor_out_dirs.items():
+        print(
+            f"✨ Created {flavor_name} stubs for MNE-Python {mne.__version__} "
+            f"(from {MNE_INSTALL_DIR}) in {out_dir.resolve()}"
+        )
+    if failed:
+        print(f"\n❌ Failed to process {len(failed)} stubs, kept their old versions:")
+        for result in failed:
+            print(f"   {result.stub_rel_path}")
+    if failed or n_verification_errors:
+        sys.exit(1)
+    print("\n💚 Done! Happy typing!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""Look up a class, function, or method in the symbol database.
+
+The database is written via ``python gen_type_stubs.py --symbols-db PATH`` (see
+``mne_stubgen/symbols.py``). Objects can be looked up by any name they are
+available under, e.g. ``mne.Epochs.plot_image``.
+"""
+
+import argparse
+import sqlite3
+import sys
+from pathlib import Path
+
+from mne_stubgen.flavors import FLAVORS
+from mne_stubgen.symbols import lookup_symbol
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Look up an MNE object in the symbol database."
+    )
+    parser.add_argument("db", type=Path, help="The symbol database.")
+    parser.add_argument("name", help="The qualified name, e.g. mne.Epochs.plot_image")
+    parser.add_argument(
+        "--flavor",
+        choices=list(FLAVORS),
+        default="mne",
+        help="The flavor of the docstring to show. Default: %(default)s",
+    )
+    args = parser.parse_args(argv)
+
+    connection = sqlite3.connect(f"{args.db.resolve().as_uri()}?mode=ro", uri=True)
+    symbol = lookup_symbol(connection, args.name)
+    connection.close()
+    if symbol is None:
+        sys.exit(f"❌ {args.name} not found in {args.db}")
+
+    location = symbol.source_path
+    if symbol.lineno is not None:
+        location += f":{symbol.lineno}"
+    print(f"{symbol.qualname} ({symbol.kind}, {location})\n")
+    print(symbol.signature)
+    docstring = symbol.docstrings.get(args.flavor)
+    if docstring is not None:
+        print(f"\n{docstring.strip()}")
+
+
+if __name__ == "__main__":
+    main()
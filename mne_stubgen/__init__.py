@@ -0,0 +1 @@
+"""Helpers shared by the type stub generator scripts."""
@@ -0,0 +1,139 @@
+"""A cache of complete stub trees, keyed by a fingerprint of all inputs.
+
+Most CI runs generate stubs identical to those of a previous run. The manifest
+(see ``manifest``) already records everything the stubs depend on – the hashes of
+MNE's sources, of the generator code, the versions of the tools involved, and
+the options that change the output. Together with the flavor, it makes up a
+fingerprint of a run. After a successful run, the stubs of each flavor are
+stored in a cache directory under their fingerprint; a later run with the same
+fingerprint restores them from there, without running stubgen, importing MNE
+modules, or expanding any docstrings. Incremental runs are never stored, as
+their output depends on the previous state of the output directory.
+
+Restored stubs go through the same staging directory as generated stubs, so
+unchanged files in the output directory keep their modification times. The
+least recently used entries are evicted once the cache holds too many.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+
+from .manifest import MANIFEST_FILENAME, read_manifest, source_to_stub_path
+from .output import SyncStats, prepare_staging_dir, sync_output
+
+# The parts of a manifest that describe the inputs of a run
+FINGERPRINT_KEYS = (
+    "manifest_version",
+    "generator",
+    "tools",
+    "options",
+    "global_sources",
+    "sources",
+)
+
+
+def compute_fingerprint(manifest: dict, *, flavor_name: str) -> str:
+    """Compute the fingerprint of the stubs of a flavor.
+
+    Parameters
+    ----------
+    manifest
+        The manifest of the current inputs, as returned by ``build_manifest``.
+    flavor_name
+        The name of the flavor.
+    """
+    inputs = {
+        **{key: manifest[key] for key in FINGERPRINT_KEYS},
+        "flavor": flavor_name,
+    }
+    return hashlib.sha256(
+        json.dumps(inputs, sort_keys=True).encode("utf-8")
+    ).hexdigest()
+
+
+def restore_stubs(
+    cache_dir: Path, fingerprint: str, out_dir: Path, *, prune: bool
+) -> SyncStats | None:
+    """Restore the stubs of a flavor from the cache, if present.
+
+    Parameters
+    ----------
+    cache_dir
+        The cache directory.
+    fingerprint
+        The fingerprint of the stubs.
+    out_dir
+        The output directory.
+    prune
+        Whether to delete the stubs in the output directory that are not in the
+        cache entry (see ``sync_output``).
+
+    Returns
+    -------
+    stats
+        What happened when updating the output directory, or None if the cache
+        has no stubs for the fingerprint.
+    """
+    entry = cache_dir / fingerprint
+    if not entry.is_dir():
+        return None
+    staging_dir = prepare_staging_dir(out_dir)
+    shutil.copytree(entry, staging_dir, dirs_exist_ok=True)
+    # Mark the entry as recently used
+    os.utime(entry)
+    return sync_output(staging_dir, out_dir, prune=prune, last=MANIFEST_FILENAME)
+
+
+def store_stubs(
+    cache_dir: Path, fingerprint: str, out_dir: Path, *, max_entries: int
+) -> None:
+    """Store the stubs of a flavor in the cache.
+
+    Parameters
+    ----------
+    cache_dir
+        The cache directory.
+    fingerprint
+        The fingerprint of the stubs.
+    out_dir
+        The output directory a full run wrote the stubs to. Only the stubs listed
+        in its manifest are stored, not any other files that happen to be there.
+    max_entries
+        How many entries to keep at most; the least recently used ones are
+        evicted.
+    """
+    manifest = read_manifest(out_dir)
+    if manifest is None:
+        return
+    entry = cache_dir / fingerprint
+    if entry.is_dir():
+        os.utime(entry)
+    else:
+        # Other runs must never see a partial entry
+        tmp_entry = cache_dir / f".{fingerprint}.tmp"
+        if tmp_entry.exists():
+            shutil.rmtree(tmp_entry)
+        tmp_entry.mkdir(parents=True)
+        rel_paths = [
+            *(Path(source_to_stub_path(source)) for source in manifest["sources"]),
+            Path("mne", "py.typed"),
+            Path(MANIFEST_FILENAME),
+        ]
+        for rel_path in rel_paths:
+            (tmp_entry / rel_path).parent.mkdir(parents=True, exist_ok=True)
+            shutil.copy2(out_dir / rel_path, tmp_entry / rel_path)
+        try:
+            os.replace(tmp_entry, entry)
+        except OSError:  # stored by a concurrent run in the meantime
+            shutil.rmtree(tmp_entry)
+
+    entries = sorted(
+        (path for path in cache_dir.iterdir() if not path.name.startswith(".")),
+        key=lambda path: path.stat().st_mtime,
+        reverse=True,
+    )
+    for path in entries[max_entries:]:
+        shutil.rmtree(path)
@@ -0,0 +1,200 @@
+"""Measure how long it takes to type-check user code against the stubs.
+
+A corpus of typical MNE user scripts (see ``benchmarks/corpus/``) is checked with
+mypy, using the generated stubs instead of MNE's own (incomplete) annotations.
+Each check runs in a separate mypy process, whose wall time, CPU time, and peak
+resident set size (RSS) are recorded.
+
+- A *cold* check starts with an empty mypy cache, like the first check in CI or
+  after opening a project in an editor.
+- A *warm* check reuses the cache of a previous check, like subsequent checks
+  after editing the user code, but not the stubs.
+
+Each check is repeated several times, and the fastest run is kept, as the
+slower ones only add noise from other processes. The results are written to a
+report in the same format as the timings of the stub generator, so they can be
+compared via ``compare_timings.py`` as well.
+"""
+
+import dataclasses
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from .timing import PhaseTiming, Timer
+
+
+@dataclasses.dataclass
+class CheckResult:
+    """The outcome of a single mypy run.
+
+    Attributes
+    ----------
+    timing
+        The resources used by the mypy process.
+    errors
+        The errors mypy reported for the checked files (but not for the stubs).
+    """
+
+    timing: PhaseTiming
+    errors: list[str]
+
+
+def run_mypy(paths: list[Path], *, stubs_dir: Path, cache_dir: Path) -> CheckResult:
+    """Type-check some files in a separate mypy process.
+
+    Parameters
+    ----------
+    paths
+        The files to check.
+    stubs_dir
+        The directory containing the ``mne`` stub package.
+    cache_dir
+        The mypy cache directory. Pass an empty directory for a cold check.
+    """
+    env = {**os.environ, "MYPYPATH": str(stubs_dir.resolve())}
+    command = [
+        sys.executable,
+        "-m",
+        "mypy",
+        "--cache-dir",
+        str(cache_dir),
+        # Don't report errors in the libraries, but still analyze them
+        "--follow-imports=silent",
+        "--no-error-summary",
+        "--show-absolute-path",
+        *(str(path.resolve()) for path in paths),
+    ]
+    with tempfile.TemporaryFile("w+", encoding="utf-8") as output:
+        start = time.perf_counter()
+        process = subprocess.Popen(command, env=env, stdout=output, stderr=output)
+        if hasattr(os, "wait4"):
+            _, status, usage = os.wait4(process.pid, 0)
+            wall = time.perf_counter() - start
+            returncode = os.waitstatus_to_exitcode(status)
+            # macOS reports bytes, Linux kilobytes
+            peak_rss = usage.ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+            timing = PhaseTiming(
+                wall=wall, cpu=usage.ru_utime + usage.ru_stime, peak_rss=peak_rss
+            )
+        else:  # Windows
+            returncode = process.wait()
+            timing = PhaseTiming(wall=time.perf_counter() - start)
+        output.seek(0)
+        lines = output.read().splitlines()
+
+    # Exit code 1 means type errors were found
+    if returncode not in (0, 1):
+        raise RuntimeError("mypy failed:\n" + "\n".join(lines))
+    checked = tuple(str(path.resolve()) for path in paths)
+    errors = [line for line in lines if line.startswith(checked) and ": error:" in line]
+    return CheckResult(timing=timing, errors=errors)
+
+
+def _fastest(results: list[CheckResult]) -> CheckResult:
+    return min(results, key=lambda result: result.timing.wall)
+
+
+def run_benchmark(
+    paths: list[Path],
+    *,
+    stubs_dir: Path,
+    repeat: int,
+    per_script: bool,
+) -> tuple[Timer, dict[str, Timer], list[str]]:
+    """Run the cold and warm checks of a corpus.
+
+    Parameters
+    ----------
+    paths
+        The scripts of the corpus.
+    stubs_dir
+        The directory containing the ``mne`` stub package.
+    repeat
+        How often to run each check; the fastest run is kept.
+    per_script
+        Whether to additionally check each script on its own (cold), to see which
+        parts of the stubs are expensive.
+
+    Returns
+    -------
+    phases
+        The timings of the cold and warm checks of the entire corpus.
+    scripts
+        The timings of the cold checks of the individual scripts, by file name.
+    errors
+        The errors mypy reported for the corpus.
+    """
+    phases = Timer()
+    with tempfile.TemporaryDirectory(prefix="mne-stubs-benchmark-") as tmp_dir:
+        cold_results = []
+        for idx in range(repeat):
+            cache_dir = Path(tmp_dir) / f"cold-{idx}"
+            print(f"🥶 Cold check of {len(paths)} scripts ({idx + 1}/{repeat}) …")
+            cold_results.append(
+                run_mypy(paths, stubs_dir=stubs_dir, cache_dir=cache_dir)
+            )
+        cold = _fastest(cold_results)
+        phases.phases["cold"] = cold.timing
+
+        warm_results = []
+        for idx in range(repeat):
+            print(f"🔥 Warm check of {len(paths)} scripts ({idx + 1}/{repeat}) …")
+            # Re-use the cache of the first cold check
+            warm_results.append(
+                run_mypy(paths, stubs_dir=stubs_dir, cache_dir=Path(tmp_dir) / "cold-0")
+            )
+        phases.phases["warm"] = _fastest(warm_results).timing
+
+        scripts = {}
+        if per_script:
+            for path in paths:
+                results = []
+                for idx in range(repeat):
+                    print(f"🥶 Cold check of {path.name} ({idx + 1}/{repeat}) …")
+                    cache_dir = Path(tmp_dir) / f"{path.stem}-{idx}"
+                    results.append(
+                        run_mypy([path], stubs_dir=stubs_dir, cache_dir=cache_dir)
+                    )
+                script_timer = Timer()
+                script_timer.phases["cold"] = _fastest(results).timing
+                scripts[path.name] = script_timer
+
+    return phases, scripts, cold.errors
+
+
+def compare_memory(
+    baseline: dict, current: dict, *, threshold: float, min_mb: float
+) -> list[tuple[str, float, float]]:
+    """Find the checks whose peak memory usage grew.
+
+    A check regressed if its peak RSS grew by more than ``threshold`` (e.g. 0.1
+    for 10 %) and by more than ``min_mb`` megabytes.
+
+    Returns
+    -------
+    regressions
+        The name, baseline, and current peak RSS in megabytes of the regressed
+        checks.
+    """
+    pairs = [
+        (name, baseline["phases"].get(name), timing)
+        for name, timing in current["phases"].items()
+    ]
+    for script, phases in current["modules"].items():
+        for name, timing in phases.items():
+            before = baseline["modules"].get(script, {}).get(name)
+            pairs.append((f"{script}: {name}", before, timing))
+
+    regressions = []
+    for name, before, after in pairs:
+        if before is None or before["peak_rss"] is None or after["peak_rss"] is None:
+            continue
+        before_mb = before["peak_rss"] / 1024**2
+        after_mb = after["peak_rss"] / 1024**2
+        if after_mb - before_mb > min_mb and after_mb > before_mb * (1 + threshold):
+            regressions.append((name, before_mb, after_mb))
+    return regressions
@@ -0,0 +1,89 @@
+"""Clean unparsed stub modules in a single pass.
+
+The cleaning rules are declared as a table of patterns and replacements. Instead
+of applying them one after another – which creates a full copy of the module
+text for every single rule – all rules of a table are compiled into one regular
+expression alternation, and the module text is rewritten with a single call to
+``re.sub()``.
+
+Because of this, the output of a rule is never matched again by another rule, and
+where several rules match at the same position, the one listed first wins. Rules
+whose match contains text that the other rules need to process can pass it to the
+``clean`` callable they receive.
+"""
+
+import dataclasses
+import re
+from collections.abc import Callable, Sequence
+
+Replacement = str | Callable[[Sequence[str | None], Callable[[str], str]], str]
+
+
+@dataclasses.dataclass(frozen=True)
+class Rule:
+    """A cleaning rule.
+
+    Attributes
+    ----------
+    pattern
+        The regular expression to match. Backreferences (``\\1`` etc.) refer to
+        the groups of this pattern only.
+    replacement
+        Either a replacement template as accepted by ``re.sub()``, again referring
+        to the groups of ``pattern`` only; or a callable receiving the match
+        (``groups[0]``) and its groups (``groups[1:]``), as well as a ``clean``
+        callable to clean any part of the match.
+    """
+
+    pattern: str
+    replacement: Replacement
+
+
+def literal(text: str, replacement: str) -> Rule:
+    """Create a rule replacing a literal string."""
+    return Rule(pattern=re.escape(text), replacement=replacement.replace("\\", r"\\"))
+
+
+def _shift_group_references(pattern: str, offset: int) -> str:
+    return re.sub(r"\\(\d+)", lambda m: f"\\{int(m[1]) + offset}", pattern)
+
+
+class Cleaner:
+    """Apply a table of cleaning rules in a single pass."""
+
+    def __init__(self, rules: Sequence[Rule]) -> None:
+        alternatives = []
+        # Maps the index of the group enclosing each rule to the rule, the number
+        # of groups in its pattern, and its replacement template (if any)
+        self._rules: dict[int, tuple[Rule, int, str | None]] = {}
+        n_groups = 0
+        for rule in rules:
+            rule_group = n_groups + 1
+            rule_n_groups = re.compile(rule.pattern).groups
+            alternatives.append(
+                f"({_shift_group_references(rule.pattern, rule_group)})"
+            )
+            template = (
+                _shift_group_references(rule.replacement, rule_group)
+                if isinstance(rule.replacement, str)
+                else None
+            )
+            self._rules[rule_group] = (rule, rule_n_groups, template)
+            n_groups += 1 + rule_n_groups
+
+        self._pattern = re.compile("|".join(alternatives))
+
+    def _replace(self, match: re.Match) -> str:
+        # The group enclosing the rule is always the last one to be closed
+        rule_group = match.lastindex
+        rule, rule_n_groups, template = self._rules[rule_group]
+        if template is not None:
+            return match.expand(template)
+        groups = match.group(*range(rule_group, rule_group + rule_n_groups + 1))
+        if rule_n_groups == 0:
+            groups = (groups,)
+        return rule.replacement(groups, self.clean)
+
+    def clean(self, text: str) -> str:
+        """Apply all rules to ``text``."""
+        return self._pattern.sub(self._replace, text)
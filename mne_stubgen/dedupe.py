@@ -0,0 +1,389 @@
+"""Drop methods that are identical to the ones they override.
+
+stubgen emits every method a class defines, even if a subclass merely overrides
+a base class method without changing its signature or docstring. As the type
+checker resolves such methods through inheritance anyway, the duplicates can be
+dropped from the subclass stub, leaving less code to parse.
+
+A method is dropped if the method it overrides – i.e., the next definition of
+the same name in the method resolution order – is identical, including the
+decorators, annotations, and the (rendered) docstring. If any of the classes
+before that definition in the MRO cannot be resolved to a generated stub (e.g.
+classes from other packages), the method is kept.
+
+This needs to look at the stubs of all base classes, which may live in other
+modules. So this runs on the final stubs of each flavor, after all modules have
+been processed. Each module's stub then depends on the stubs of its base
+classes: if one of them changes, the module needs to be processed again in
+incremental mode.
+"""
+
+import ast
+import dataclasses
+from collections.abc import Callable
+from pathlib import Path
+
+from .defaults import stub_path_to_module_name
+
+# A class is identified by its module and name. Classes that cannot be resolved to
+# a stub have no module, and are identified by their base class expression.
+ClassKey = tuple[str | None, str]
+
+
+def get_import_target(stub_rel_path: Path, node: ast.ImportFrom) -> str:
+    """Get the absolute name of the module a stub imports from."""
+    if not node.level:
+        return node.module or ""
+    package = stub_path_to_module_name(stub_rel_path, Path()).split(".")
+    if stub_rel_path.name != "__init__.pyi":
+        package = package[:-1]
+    package = package[: len(package) - node.level + 1]
+    return ".".join([*package, *filter(None, [node.module])])
+
+
+@dataclasses.dataclass
+class _Stub:
+    rel_path: Path
+    tree: ast.Module
+
+
+class _StubIndex:
+    """Look up classes across the stubs of a flavor.
+
+    All stubs that were looked at since the last call to ``reset_accessed()`` are
+    recorded in ``accessed``, including MNE stubs that were looked for but don't
+    exist.
+    """
+
+    def __init__(self, find_stub: Callable[[str], tuple[Path, str] | None]) -> None:
+        self._find_stub = find_stub
+        self._stubs: dict[str, _Stub | None] = {}
+        self.accessed: set[Path] = set()
+
+    def reset_accessed(self) -> None:
+        self.accessed = set()
+
+    def get_stub(self, module_name: str) -> _Stub | None:
+        if module_name not in self._stubs:
+            found = self._find_stub(module_name)
+            stub = None
+            if found is not None:
+                rel_path, text = found
+                stub = _Stub(rel_path=rel_path, tree=ast.parse(text))
+            self._stubs[module_name] = stub
+        stub = self._stubs[module_name]
+        if stub is not None:
+            self.accessed.add(stub.rel_path)
+        elif module_name.split(".")[0] == "mne":
+            # Record where the stub would be, e.g. if it failed to generate, so its
+            # dependents are regenerated along with it once it exists
+            rel_path = Path(*module_name.split("."))
+            self.accessed |= {rel_path.with_suffix(".pyi"), rel_path / "__init__.pyi"}
+        return stub
+
+    def get_class(self, key: ClassKey) -> ast.ClassDef | None:
+        module_name, name = key
+        stub = None if module_name is None else self.get_stub(module_name)
+        if stub is None:
+            return None
+        for node in stub.tree.body:
+            if isinstance(node, ast.ClassDef) and node.name == name:
+                return node
+        return None
+
+    def resolve(
+        self, module_name: str, name: str, *, _seen: frozenset = frozenset()
+    ) -> ClassKey | None:
+        """Find the class a name refers to in a module, following re-exports."""
+        stub = self.get_stub(module_name)
+        if stub is None or (module_name, name) in _seen:
+            return None
+        if self.get_class((module_name, name)) is not None:
+            return module_name, name
+
+        for node in stub.tree.body:
+            if not isinstance(node, ast.ImportFrom):
+                continue
+            for alias in node.names:
+                if (alias.asname or alias.name) == name:
+                    return self.resolve(
+                        get_import_target(stub.rel_path, node),
+                        alias.name,
+                        _seen=_seen | {(module_name, name)},
+                    )
+        return None
+
+    def get_binding(self, module_name: str, name: str) -> tuple[str, str]:
+        """Determine what a global name in a module refers to.
+
+        Returns the module and name of the object, following re-exports of
+        classes; names that are not bound in the module are builtins.
+        """
+        stub = self.get_stub(module_name)
+        for node in [] if stub is None else stub.tree.body:
+            if isinstance(node, ast.ImportFrom):
+                for alias in node.names:
+                    if (alias.asname or alias.name) == name:
+                        target = get_import_target(stub.rel_path, node)
+                        return self.resolve(target, alias.name) or (
+                            target,
+                            alias.name,
+                        )
+            elif isinstance(node, ast.Import):
+                for alias in node.names:
+                    if alias.asname == name:
+                        return alias.name, ""
+                    if alias.asname is None and alias.name.split(".")[0] == name:
+                        return name, ""
+            elif name in _get_bound_names(node):
+                return module_name, name
+        return "builtins", name
+
+    def _resolve_base(self, module_name: str, base: ast.expr) -> ClassKey | None:
+        # E.g., Generic[T]
+        if isinstance(base, ast.Subscript):
+            base = base.value
+        if isinstance(base, ast.Name):
+            if base.id == "object":
+                return None
+            resolved = self.resolve(module_name, base.id)
+            if resolved is not None:
+                return resolved
+        return None, ast.unparse(base)
+
+    def get_mro(
+        self, key: ClassKey, *, _seen: frozenset = frozenset()
+    ) -> list[ClassKey]:
+        """Compute the method resolution order of a class via C3 linearization.
+
+        Classes that cannot be resolved appear in the MRO without their bases, and
+        an inconsistent MRO ends in an unresolvable class.
+        """
+        node = self.get_class(key)
+        if node is None or key in _seen:
+            return [key]
+        bases = [
+            base
+            for base in (self._resolve_base(key[0], b) for b in node.bases)
+            if base is not None
+        ]
+        sequences = [self.get_mro(base, _seen=_seen | {key}) for base in bases]
+        sequences = [list(sequence) for sequence in [*sequences, bases]]
+        mro = [key]
+        while any(sequences):
+            for sequence in sequences:
+                if sequence and not any(
+                    sequence[0] in other[1:] for other in sequences
+                ):
+                    head = sequence[0]
+                    break
+            else:
+                mro.append((None, "<inconsistent MRO>"))
+                break
+            mro.append(head)
+            for sequence in sequences:
+                if sequence and sequence[0] == head:
+                    del sequence[0]
+        return mro
+
+
+def _get_bound_names(stmt: ast.stmt) -> list[str]:
+    """Get the names a statement in a module or class body binds."""
+    if isinstance(stmt, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+        return [stmt.name]
+    elif isinstance(stmt, (ast.Assign, ast.AnnAssign, ast.AugAssign)):
+        targets = stmt.targets if isinstance(stmt, ast.Assign) else [stmt.target]
+        return [n.id for t in targets for n in ast.walk(t) if isinstance(n, ast.Name)]
+    return []
+
+
+def _get_definitions(node: ast.ClassDef) -> dict[str, list[ast.stmt]]:
+    """Map all names bound in a class body to the statements binding them."""
+    definitions: dict[str, list[ast.stmt]] = {}
+    for stmt in node.body:
+        for name in _get_bound_names(stmt):
+            definitions.setdefault(name, []).append(stmt)
+    return definitions
+
+
+def _get_global_names(node: ast.FunctionDef) -> set[str]:
+    """Get the global names a method signature refers to, e.g. in annotations."""
+    args = node.args
+    params = [
+        *args.posonlyargs,
+        *args.args,
+        *args.kwonlyargs,
+        *filter(None, [args.vararg, args.kwarg]),
+    ]
+    exprs = [
+        *node.decorator_list,
+        *filter(None, [node.returns, *(param.annotation for param in params)]),
+        *args.defaults,
+        *filter(None, args.kw_defaults),
+    ]
+    names = set()
+    for expr in exprs:
+        for child in ast.walk(expr):
+            if isinstance(child, ast.Name):
+                names.add(child.id)
+            # Forward references
+            elif isinstance(child, ast.Constant) and isinstance(child.value, str):
+                try:
+                    parsed = ast.parse(child.value, mode="eval")
+                except SyntaxError:
+                    continue
+                names |= {n.id for n in ast.walk(parsed) if isinstance(n, ast.Name)}
+    return names
+
+
+def _is_same_method(
+    index: _StubIndex,
+    method: ast.FunctionDef,
+    module_name: str,
+    base_definitions: list[ast.stmt],
+    base_module_name: str,
+) -> bool:
+    """Check whether a method is identical to the definition it overrides.
+
+    Not only must they be written the same, but all names they refer to must also
+    refer to the same objects in both modules.
+    """
+    if len(base_definitions) != 1 or ast.dump(method) != ast.dump(base_definitions[0]):
+        return False
+    if module_name == base_module_name:
+        return True
+    return all(
+        index.get_binding(module_name, name)
+        == index.get_binding(base_module_name, name)
+        for name in _get_global_names(method)
+    )
+
+
+def _remove_methods(
+    text: str, methods: dict[ast.ClassDef, list[ast.FunctionDef]]
+) -> str:
+    """Remove methods from the source code of a stub."""
+    lines = text.splitlines(keepends=True)
+    ranges = []
+    for class_node, class_methods in methods.items():
+        for method in class_methods:
+            start = min([method.lineno, *(d.lineno for d in method.decorator_list)])
+            ranges.append((start - 1, method.end_lineno, None))
+        # Class bodies must not be empty
+        if len(class_methods) == len(class_node.body):
+            start, end, _ = ranges.pop()
+            indent = " " * (class_node.col_offset + 4)
+            ranges.append((start, end, f"{indent}...\n"))
+    for start, end, replacement in sorted(ranges, reverse=True):
+        lines[start:end] = [] if replacement is None else [replacement]
+    return "".join(lines)
+
+
+@dataclasses.dataclass
+class DedupeResult:
+    """The outcome of deduplicating the methods of some stubs.
+
+    Attributes
+    ----------
+    n_removed
+        The number of methods that were removed.
+    n_bytes
+        The number of bytes that were removed.
+    dependencies
+        For each stub, the other stubs that were consulted to deduplicate it
+        (i.e., those containing its classes' bases, or re-exporting them), all
+        relative to the stubs directory.
+    """
+
+    n_removed: int = 0
+    n_bytes: int = 0
+    dependencies: dict[str, list[str]] = dataclasses.field(default_factory=dict)
+
+
+def dedupe_inherited_methods(
+    stubs: dict[Path, str], *, fallback_dir: Path | None = None
+) -> DedupeResult:
+    """Remove methods that are identical to the base class methods they override.
+
+    Parameters
+    ----------
+    stubs
+        The contents of the stubs, keyed by their path relative to the stubs
+        directory. They are modified in place.
+    fallback_dir
+        Where to look for the stubs of base classes that are not in ``stubs``,
+        i.e. the existing output in incremental mode.
+    """
+
+    def find_stub(module_name: str) -> tuple[Path, str] | None:
+        module_path = Path(*module_name.split("."))
+        for rel_path in (
+            module_path.with_suffix(".pyi"),
+            module_path / "__init__.pyi",
+        ):
+            if rel_path in stubs:
+                return rel_path, stubs[rel_path]
+            if fallback_dir is not None and (fallback_dir / rel_path).exists():
+                return rel_path, (fallback_dir / rel_path).read_text(encoding="utf-8")
+        return None
+
+    index = _StubIndex(find_stub)
+    result = DedupeResult()
+    for stub_rel_path in sorted(stubs):
+        module_name = stub_path_to_module_name(stub_rel_path, Path())
+        index.reset_accessed()
+        stub = index.get_stub(module_name)
+        if stub is None:
+            continue
+
+        duplicates: dict[ast.ClassDef, list[ast.FunctionDef]] = {}
+        for class_node in stub.tree.body:
+            if not isinstance(class_node, ast.ClassDef):
+                continue
+            mro = index.get_mro((module_name, class_node.name))
+            for name, definitions in _get_definitions(class_node).items():
+                # Overloads and properties with setters are defined more than once
+                if len(definitions) != 1 or not isinstance(
+                    definitions[0], ast.FunctionDef
+                ):
+                    continue
+                for base_key in mro[1:]:
+                    base_node = index.get_class(base_key)
+                    if base_node is None:
+                        # We don't know what an unresolved class defines
+                        break
+                    base_definitions = _get_definitions(base_node).get(name)
+                    if base_definitions is None:
+                        continue
+                    if _is_same_method(
+                        index,
+                        definitions[0],
+                        module_name,
+                        base_definitions,
+                        base_key[0],
+                    ):
+                        duplicates.setdefault(class_node, []).append(definitions[0])
+                    break
+
+        result.dependencies[str(stub_rel_path)] = sorted(
+            str(path) for path in index.accessed if path != stub.rel_path
+        )
+        if not duplicates:
+            continue
+
+        for class_node, methods in duplicates.items():
+            for method in methods:
+                print(
+                    f"✂️  Removing {module_name}.{class_node.name}.{method.name}, "
+                    f"it is identical to the inherited method"
+                )
+                result.n_removed += 1
+        # Other stubs compare against the original definitions, which resolve to
+        # the same ones as the deduplicated stub through inheritance
+        text = stubs[stub_rel_path]
+        stubs[stub_rel_path] = _remove_methods(text, duplicates)
+        result.n_bytes += len(text.encode("utf-8")) - len(
+            stubs[stub_rel_path].encode("utf-8")
+        )
+
+    return result
@@ -0,0 +1,350 @@
+"""Add parameter default values to the generated stubs.
+
+stubgen replaces all default values with ``...``. We fill in the actual values
+on the stub's AST while it's being processed anyway, following the rules of
+stubdefaulter (which we used to run as a separate pass over all stubs, importing
+all of MNE once more):
+
+- a parameter annotated as ``None`` defaults to ``None``, and one annotated as a
+  ``Literal`` with a single value defaults to that value;
+- otherwise, the default value is added if it's a bool, ``None``, a string,
+  bytes, an int, a finite float, or a tuple, list, non-empty set, or dict
+  thereof – and its representation isn't excessively long.
+
+Like the docstrings, the default values are read from the module's source code
+where possible, and only obtained via ``inspect.signature()`` of the runtime
+objects for functions whose signature may be altered by a decorator, or whose
+defaults aren't literals (e.g., module-level constants).
+"""
+
+import ast
+import importlib
+import inspect
+import math
+import sys
+from pathlib import Path
+from typing import Any
+
+from .static_docs import get_static_docstrings
+from .timing import Timer
+
+# Defaults with a longer representation are not added
+DEFAULT_LENGTH_LIMIT = 500
+
+# Returned by the conversion functions if a value cannot be expressed as a literal
+_NOT_A_LITERAL = object()
+
+
+def stub_path_to_module_name(stub_path: Path, stubs_out_dir: Path) -> str:
+    """Derive the dotted module name from a stub file path.
+
+    E.g., ``typings/mne/io/base.pyi`` -> ``mne.io.base``, and
+    ``typings/mne/io/__init__.pyi`` -> ``mne.io``.
+    """
+    parts = stub_path.relative_to(stubs_out_dir).with_suffix("").parts
+    if parts[-1] == "__init__":
+        parts = parts[:-1]
+    return ".".join(parts)
+
+
+def _value_to_node(value: Any, *, annotation: ast.expr | None = None) -> ast.expr:
+    """Convert a default value to an AST node, following stubdefaulter's rules."""
+    # Subclasses (e.g. NumPy scalars or enums) are not allowed, hence no isinstance()
+    value_type = type(value)
+    if value_type in (bool, type(None), str, bytes):
+        return ast.Constant(value)
+    elif value_type in (int, float):
+        # Skip ints annotated as bool, and inf and nan
+        if value_type is int and (
+            isinstance(annotation, ast.Name) and annotation.id == "bool"
+        ):
+            return _NOT_A_LITERAL
+        if value_type is float and not math.isfinite(value):
+            return _NOT_A_LITERAL
+        # Keep the sign of -0.0
+        if value < 0 or (value_type is float and math.copysign(1, value) < 0):
+            return ast.UnaryOp(op=ast.USub(), operand=ast.Constant(-value))
+        return ast.Constant(value)
+    elif value_type in (tuple, list, set):
+        # The empty set is not a literal
+        if value_type is set and not value:
+            return _NOT_A_LITERAL
+        # Sort sets, so the output is deterministic
+        members = sorted(value, key=repr) if value_type is set else value
+        elts = [_value_to_node(member) for member in members]
+        if _NOT_A_LITERAL in elts:
+            return _NOT_A_LITERAL
+        if value_type is tuple:
+            return ast.Tuple(elts=elts, ctx=ast.Load())
+        elif value_type is list:
+            return ast.List(elts=elts, ctx=ast.Load())
+        return ast.Set(elts=elts)
+    elif value_type is dict:
+        keys = [_value_to_node(key) for key in value]
+        values = [_value_to_node(v) for v in value.values()]
+        if _NOT_A_LITERAL in keys or _NOT_A_LITERAL in values:
+            return _NOT_A_LITERAL
+        return ast.Dict(keys=keys, values=values)
+    return _NOT_A_LITERAL
+
+
+def _literal_value(node: ast.expr) -> Any:
+    try:
+        return ast.literal_eval(node)
+    except (ValueError, TypeError, SyntaxError, MemoryError, RecursionError):
+        return _NOT_A_LITERAL
+
+
+def _is_literal_annotation(annotation: ast.expr) -> bool:
+    if isinstance(annotation, ast.Name):
+        return annotation.id == "Literal"
+    return (
+        isinstance(annotation, ast.Attribute)
+        and annotation.attr == "Literal"
+        and isinstance(annotation.value, ast.Name)
+        and annotation.value.id in ("typing", "typing_extensions")
+    )
+
+
+def _iter_params_with_defaults(
+    func: ast.FunctionDef,
+) -> list[tuple[ast.arg, ast.expr, list[ast.expr | None], int]]:
+    """Get all parameters with a default, the list holding it, and its index."""
+    args = func.args
+    positional = args.posonlyargs + args.args
+    params = []
+    offset = len(positional) - len(args.defaults)
+    for idx, default in enumerate(args.defaults):
+        params.append((positional[offset + idx], default, args.defaults, idx))
+    for idx, (param, default) in enumerate(zip(args.kwonlyargs, args.kw_defaults)):
+        if default is not None:
+            params.append((param, default, args.kw_defaults, idx))
+    return params
+
+
+def _add_defaults_from_annotations(func: ast.FunctionDef) -> int:
+    n_added = 0
+    for param, default, defaults, idx in _iter_params_with_defaults(func):
+        if not (isinstance(default, ast.Constant) and default.value is ...):
+            continue
+        annotation = param.annotation
+        if isinstance(annotation, ast.Constant) and annotation.value is None:
+            defaults[idx] = ast.Constant(None)
+            n_added += 1
+        elif (
+            isinstance(annotation, ast.Subscript)
+            and _is_literal_annotation(annotation.value)
+            and not isinstance(annotation.slice, ast.Tuple)
+            and _literal_value(annotation.slice) is not _NOT_A_LITERAL
+            and len(ast.unparse(annotation.slice)) <= DEFAULT_LENGTH_LIMIT
+        ):
+            defaults[idx] = annotation.slice
+            n_added += 1
+    return n_added
+
+
+def _get_static_defaults(func: ast.FunctionDef) -> dict[str, Any] | None:
+    """Get the default values of a function's parameters from the source.
+
+    Returns ``None`` if any of the defaults is not a literal.
+    """
+    static_defaults = {}
+    for param, default, _, _ in _iter_params_with_defaults(func):
+        value = _literal_value(default)
+        if value is _NOT_A_LITERAL:
+            return None
+        static_defaults[param.arg] = value
+    return static_defaults
+
+
+def _get_runtime_defaults(
+    func: ast.FunctionDef, signature: inspect.Signature
+) -> dict[str, Any]:
+    """Match the stub's parameters to the runtime signature, like stubdefaulter."""
+    args = func.args
+    stub_params = args.posonlyargs + args.args + args.kwonlyargs
+    runtime_params = list(signature.parameters.values())
+    runtime_defaults = {}
+    for stub_idx, stub_param in enumerate(stub_params):
+        name = stub_param.arg
+        runtime_param = signature.parameters.get(name)
+        # Positional-only parameters may be prefixed with "__" in stubs
+        if (
+            runtime_param is None
+            and stub_param in args.args
+            and name.startswith("__")
+            and not name.endswith("__")
+        ):
+            runtime_param = signature.parameters.get(name[2:])
+        # As a last resort, match positional-only parameters by position
+        if (
+            runtime_param is None
+            and (stub_param in args.posonlyargs or name.startswith("__"))
+            and args.vararg is None
+            and args.kwarg is None
+            and len(stub_params) == len(runtime_params)
+            and not any(
+                p.kind in (p.VAR_POSITIONAL, p.VAR_KEYWORD) for p in runtime_params
+            )
+            and runtime_params[stub_idx].kind is inspect.Parameter.POSITIONAL_ONLY
+        ):
+            runtime_param = runtime_params[stub_idx]
+        if (
+            runtime_param is not None
+            and runtime_param.default is not runtime_param.empty
+        ):
+            runtime_defaults[name] = runtime_param.default
+    return runtime_defaults
+
+
+def _fill_defaults(
+    func: ast.FunctionDef, defaults: dict[str, Any], *, qualname: str
+) -> tuple[int, list[str]]:
+    n_added = 0
+    errors = []
+    for param, default, stub_defaults, idx in _iter_params_with_defaults(func):
+        if param.arg not in defaults:
+            continue
+        node = _value_to_node(defaults[param.arg], annotation=param.annotation)
+        if node is _NOT_A_LITERAL or len(ast.unparse(node)) > DEFAULT_LENGTH_LIMIT:
+            continue
+        if isinstance(default, ast.Constant) and default.value is ...:
+            stub_defaults[idx] = node
+            n_added += 1
+            continue
+
+        # Defaults that are already present must match
+        existing_value = _literal_value(default)
+        if existing_value is _NOT_A_LITERAL:
+            continue
+        value = ast.literal_eval(node)
+        if existing_value != value or type(existing_value) is not type(value):
+            errors.append(
+                f"{qualname}: parameter {param.arg}: stub default "
+                f"{existing_value!r} != runtime default {value!r}"
+            )
+    return n_added, errors
+
+
+def _gather_funcs(
+    body: list[ast.stmt], *, prefix: str
+) -> list[tuple[str, ast.FunctionDef]]:
+    funcs = []
+    for node in body:
+        if isinstance(node, ast.FunctionDef):
+            funcs.append((f"{prefix}{node.name}", node))
+        elif isinstance(node, ast.ClassDef):
+            funcs += _gather_funcs(node.body, prefix=f"{prefix}{node.name}.")
+    return funcs
+
+
+def _get_runtime_object(module: Any, qualname: str) -> Any:
+    obj = module
+    parent_name = None
+    for name in qualname.split("."):
+        # Private names of class members are mangled
+        if (
+            parent_name is not None
+            and name.startswith("__")
+            and not name.endswith("__")
+        ):
+            name = f"_{parent_name.lstrip('_')}{name}"
+        try:
+            obj = getattr(obj, name)
+        except AttributeError:
+            obj = inspect.getattr_static(obj, name)
+        parent_name = name
+    return obj
+
+
+def add_defaults(
+    module_ast: ast.Module,
+    module_name: str,
+    *,
+    source_path: Path | None = None,
+    timer: Timer | None = None,
+) -> tuple[list[str], bool]:
+    """Add parameter default values to a stub.
+
+    Parameters
+    ----------
+    module_ast
+        The AST of the stub; it is modified in place.
+    module_name
+        The name of the module.
+    source_path
+        The source file of the module. If given, the default values are read from
+        the source code where possible, instead of by importing the module.
+    timer
+        Records imports as a separate phase.
+
+    Returns
+    -------
+    errors
+        The parameters whose default values in the stub don't match the runtime
+        default values.
+    uses_runtime
+        Whether any default values were looked up on the imported module.
+    """
+    timer = Timer() if timer is None else timer
+    if source_path is not None and source_path.suffix != ".py":
+        source_path = None
+    static_docstrings = None
+    module_imported = None
+
+    n_added = 0
+    errors = []
+    uses_runtime = False
+    for qualname, func in _gather_funcs(module_ast.body, prefix=""):
+        n_added += _add_defaults_from_annotations(func)
+        stub_param_names = {
+            param.arg for param, _, _, _ in _iter_params_with_defaults(func)
+        }
+        if not stub_param_names:
+            continue
+
+        defaults = None
+        if static_docstrings is None:
+            static_docstrings = (
+                {} if source_path is None else get_static_docstrings(source_path)
+            )
+        static_docstring = static_docstrings.get(qualname)
+        if (
+            static_docstring is not None
+            and not static_docstring.dynamic
+            and isinstance(static_docstring.node, ast.FunctionDef)
+        ):
+            defaults = _get_static_defaults(static_docstring.node)
+            if defaults is not None and not stub_param_names <= defaults.keys():
+                defaults = None
+
+        if defaults is None:
+            uses_runtime = True
+            if module_imported is None:
+                if module_name not in sys.modules:
+                    print(
+                        f"📥 Importing {module_name} to read the default values of "
+                        f"{qualname}"
+                    )
+                with timer.phase("import"):
+                    module_imported = importlib.import_module(module_name)
+            try:
+                signature = inspect.signature(
+                    _get_runtime_object(module_imported, qualname)
+                )
+            except Exception:
+                print(f"⏭️  No signature found for {module_name}.{qualname}, skipping")
+                continue
+            defaults = _get_runtime_defaults(func, signature)
+
+        these_added, these_errors = _fill_defaults(
+            func, defaults, qualname=f"{module_name}.{qualname}"
+        )
+        n_added += these_added
+        errors += these_errors
+
+    if n_added:
+        print(f"📊 Added {n_added} parameter default values to {module_name}")
+    for error in errors:
+        print(f"❌ {error}")
+    return errors, uses_runtime
@@ -0,0 +1,214 @@
+"""A persistent cache of expanded docstrings.
+
+Expanding the docstrings is the part of the pipeline that requires importing
+MNE. The expanded docstrings – before any flavor-specific rendering – are stored
+in an SQLite database, so subsequent runs only need to expand the docstrings of
+modules that changed, even if the rendering rules did.
+
+Every docstring is keyed by the MNE version, its qualified name, and a hash of
+the sources it was derived from:
+
+- for docstrings expanded statically, the module's source code and MNE's
+  docstring templates;
+- for docstrings obtained by importing the module, all MNE sources, since the
+  runtime docstring may have been copied from anywhere (e.g., via
+  ``@copy_doc``).
+
+Entries of other MNE versions are dropped, and the least recently used entries
+are evicted once the cache grows beyond its size limit.
+"""
+
+import hashlib
+import sqlite3
+import time
+from pathlib import Path
+
+# Bump this whenever the way docstrings are expanded changes
+CACHE_VERSION = 1
+
+
+class DocstringCache:
+    """A persistent cache of expanded docstrings.
+
+    Parameters
+    ----------
+    path
+        The SQLite database file.
+    mne_version
+        The installed MNE version.
+    global_sources_hash
+        A hash of the sources all docstrings depend on, i.e. MNE's docstring
+        templates.
+    sources_hash
+        A hash of all MNE sources.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        *,
+        mne_version: str,
+        global_sources_hash: str,
+        sources_hash: str,
+    ) -> None:
+        self.path = path
+        self.mne_version = mne_version
+        self.global_sources_hash = global_sources_hash
+        self.sources_hash = sources_hash
+        self._connection: sqlite3.Connection | None = None
+
+    def __getstate__(self) -> dict:
+        # Worker processes open their own connection
+        state = self.__dict__.copy()
+        state["_connection"] = None
+        return state
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        if self._connection is None:
+            # Several worker processes may write to the cache concurrently
+            self._connection = sqlite3.connect(self.path, timeout=60)
+        return self._connection
+
+    def prepare(self) -> None:
+        """Create the cache, and drop all entries for other MNE versions."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.connection as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            (user_version,) = connection.execute("PRAGMA user_version").fetchone()
+            if user_version != CACHE_VERSION:
+                connection.execute("DROP TABLE IF EXISTS docstrings")
+                connection.execute(f"PRAGMA user_version = {CACHE_VERSION}")
+            connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS docstrings (
+                    mne_version TEXT NOT NULL,
+                    module TEXT NOT NULL,
+                    qualname TEXT NOT NULL,
+                    source_hash TEXT NOT NULL,
+                    docstring TEXT,
+                    is_dataclass INTEGER NOT NULL,
+                    last_used REAL NOT NULL,
+                    PRIMARY KEY (mne_version, qualname, source_hash)
+                )
+                """
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS docstrings_module "
+                "ON docstrings (mne_version, module)"
+            )
+            connection.execute(
+                "DELETE FROM docstrings WHERE mne_version != ?", (self.mne_version,)
+            )
+
+    def hash_source(self, source_path: Path) -> str:
+        """Hash a module's source code, together with the docstring templates."""
+        hasher = hashlib.sha256(self.global_sources_hash.encode("utf-8"))
+        hasher.update(source_path.read_bytes())
+        return hasher.hexdigest()
+
+    def load(
+        self, module_name: str, *, source_hash: str | None
+    ) -> dict[str, tuple[str | None, bool]]:
+        """Load the cached docstrings of a module.
+
+        Parameters
+        ----------
+        module_name
+            The name of the module.
+        source_hash
+            The hash of the module's source code, as returned by ``hash_source``.
+
+        Returns
+        -------
+        docstrings
+            The docstrings and whether the object is a dataclass, keyed by
+            qualified name.
+        """
+        source_hashes = [self.sources_hash]
+        if source_hash is not None:
+            source_hashes.append(source_hash)
+        placeholders = ", ".join("?" * len(source_hashes))
+        query_params = (self.mne_version, module_name, *source_hashes)
+        with self.connection as connection:
+            rows = connection.execute(
+                f"""
+                SELECT qualname, docstring, is_dataclass FROM docstrings
+                WHERE mne_version = ? AND module = ?
+                AND source_hash IN ({placeholders})
+                """,
+                query_params,
+            ).fetchall()
+            connection.execute(
+                f"""
+                UPDATE docstrings SET last_used = ?
+                WHERE mne_version = ? AND module = ?
+                AND source_hash IN ({placeholders})
+                """,
+                (time.time(), *query_params),
+            )
+        return {
+            qualname: (docstring, bool(is_dataclass))
+            for qualname, docstring, is_dataclass in rows
+        }
+
+    def store(
+        self,
+        module_name: str,
+        entries: list[tuple[str, str | None, bool, str]],
+    ) -> None:
+        """Store expanded docstrings.
+
+        Parameters
+        ----------
+        module_name
+            The name of the module.
+        entries
+            The qualified name, docstring, whether the object is a dataclass, and
+            the hash of the sources the docstring was derived from.
+        """
+        if not entries:
+            return
+        now = time.time()
+        with self.connection as connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO docstrings VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        self.mne_version,
+                        module_name,
+                        qualname,
+                        source_hash,
+                        docstring,
+                        int(is_dataclass),
+                        now,
+                    )
+                    for qualname, docstring, is_dataclass, source_hash in entries
+                ],
+            )
+
+    def prune(self, max_size: int) -> int:
+        """Evict the least recently used entries beyond ``max_size`` bytes.
+
+        Returns
+        -------
+        n_evicted
+            The number of evicted entries.
+        """
+        with self.connection as connection:
+            rows = connection.execute(
+                """
+                SELECT rowid, length(CAST(docstring AS BLOB)) FROM docstrings
+                ORDER BY last_used DESC
+                """
+            ).fetchall()
+            size = 0
+            evict = []
+            for rowid, docstring_size in rows:
+                size += docstring_size or 0
+                if size > max_size:
+                    evict.append((rowid,))
+            connection.executemany("DELETE FROM docstrings WHERE rowid = ?", evict)
+        if evict:
+            self.connection.execute("VACUUM")
+        return len(evict)
@@ -0,0 +1,483 @@
+"""Expand the docstrings in a generated stub and render it in every flavor."""
+
+import ast
+import dataclasses
+import importlib
+import re
+import traceback
+from pathlib import Path
+
+from .defaults import add_defaults, stub_path_to_module_name
+from .docstring_cache import DocstringCache
+from .flavors import FLAVORS, clean_module, strip_docstrings
+from .numpydoc import Docstring, parse_docstring
+from .static_docs import get_static_docstrings
+from .symbols import Symbol, collect_symbols
+from .timing import Timer
+
+
+@dataclasses.dataclass
+class StubResult:
+    """The outcome of processing a stub.
+
+    Attributes
+    ----------
+    module_name
+        The name of the module.
+    stub_rel_path
+        The path of the stub relative to the stubs directory.
+    outputs
+        The rendered stub in every flavor, keyed by flavor name.
+    defaults_errors
+        The parameters whose default values in the stub don't match the runtime
+        default values.
+    uses_runtime
+        Whether any docstrings or default values were taken from the imported
+        module – now or, via the docstring cache, in a previous run. These may
+        have been copied from other modules at runtime.
+    timer
+        The timings of the phases of processing the stub.
+    symbols
+        The classes, functions, and methods in the stub, if requested.
+    aliases
+        The targets of the names the stub imports from other MNE modules, if
+        requested.
+    error
+        The traceback, if processing the stub failed.
+    """
+
+    module_name: str
+    stub_rel_path: Path
+    outputs: dict[str, str]
+    defaults_errors: list[str]
+    timer: Timer
+    uses_runtime: bool = False
+    symbols: list[Symbol] = dataclasses.field(default_factory=list)
+    aliases: dict[str, str] = dataclasses.field(default_factory=dict)
+    error: str | None = None
+
+
+@dataclasses.dataclass
+class ExpandedDocstring:
+    """An expanded docstring, and where in the stub's AST it belongs.
+
+    Docstrings that could not be expanded are represented the same way, with the
+    docstring generated by stubgen.
+    """
+
+    node: ast.ClassDef | ast.FunctionDef
+    docstring_node: ast.Constant
+    docstring: Docstring
+    qualname: str
+    obj_type: str
+
+
+def _set_docstring(
+    expanded_docstrings: list[ExpandedDocstring],
+    *,
+    node: ast.ClassDef | ast.FunctionDef,
+    docstring: str,
+    qualname: str,
+    obj_type: str,
+) -> None:
+    # Some of MNE's docstring templates contain whitespace-only lines; turn them
+    # into proper blank lines
+    docstring = re.sub(r"^[ \t]+\n", "\n", docstring, flags=re.MULTILINE)
+    expanded_docstrings.append(
+        ExpandedDocstring(
+            node=node,
+            docstring_node=node.body[0].value,
+            docstring=parse_docstring(docstring),
+            qualname=qualname,
+            obj_type=obj_type,
+        )
+    )
+
+    # FIXME We do have a docstring, but sometimes the AST doesn't
+    # contain the body?! So we add an ellipsis here manually
+    if len(node.body) == 1:
+        print(f"⛑️  Fixing empty body for {obj_type} {qualname}")
+        node.body.append(ast.Expr(ast.Ellipsis()))
+
+
+def expand_docstrings(
+    module_ast: ast.Module,
+    module_name: str,
+    *,
+    source_path: Path | None = None,
+    docstring_cache: DocstringCache | None = None,
+    timer: Timer | None = None,
+) -> tuple[list[ExpandedDocstring], bool]:
+    """Retrieve the expanded docstrings for all classes, methods, and functions.
+
+    If the module's ``source_path`` is given, the docstrings are expanded
+    statically from the source code where possible (see ``static_docs``).
+    Otherwise, or for docstrings that cannot be expanded statically, the
+    respective module is imported and the ``__doc__`` attributes of the runtime
+    objects are retrieved. If a ``docstring_cache`` is given, docstrings expanded
+    in previous runs are taken from there. Imports are recorded as a separate
+    phase of the ``timer``.
+
+    Returns
+    -------
+    expanded_docstrings
+        The docstrings.
+    uses_runtime
+        Whether any docstring was retrieved from the runtime objects, either now
+        or in the previous run the cached docstring stems from.
+    """
+    timer = Timer() if timer is None else timer
+    if source_path is not None and source_path.suffix != ".py":
+        source_path = None
+
+    source_hash = None
+    cached_docstrings = {}
+    new_cache_entries = []
+    if docstring_cache is not None:
+        if source_path is not None:
+            source_hash = docstring_cache.hash_source(source_path)
+        cached_docstrings = docstring_cache.load(module_name, source_hash=source_hash)
+
+    static_docstrings = None
+    module_imported = None
+    uses_runtime = False
+
+    def get_docstring(qualname: str) -> tuple[str | None, bool]:
+        """Get the docstring of an object, and whether it's a dataclass."""
+        nonlocal static_docstrings, module_imported, uses_runtime
+
+        if static_docstrings is None:
+            static_docstrings = (
+                {} if source_path is None else get_static_docstrings(source_path)
+            )
+        static_docstring = static_docstrings.get(qualname)
+        is_static = static_docstring is not None and not static_docstring.dynamic
+        uses_runtime = uses_runtime or not is_static
+
+        full_qualname = f"{module_name}.{qualname}"
+        if full_qualname in cached_docstrings:
+            return cached_docstrings[full_qualname]
+
+        if static_docstring is not None and is_static:
+            docstring = static_docstring.docstring
+            is_dataclass = static_docstring.is_dataclass
+            dependencies_hash = source_hash
+        else:
+            if module_imported is None:
+                print(f"📥 Importing {module_name} to expand docstring of {qualname}")
+                with timer.phase("import"):
+                    module_imported = importlib.import_module(module_name)
+            obj = module_imported
+            for name in qualname.split("."):
+                obj = getattr(obj, name)
+            docstring = obj.__doc__
+            is_dataclass = dataclasses.is_dataclass(obj)
+            dependencies_hash = (
+                None if docstring_cache is None else docstring_cache.sources_hash
+            )
+
+        new_cache_entries.append(
+            (full_qualname, docstring, is_dataclass, dependencies_hash)
+        )
+        return docstring, is_dataclass
+
+    expanded_docstrings: list[ExpandedDocstring] = []
+
+    top_level_objs = [
+        o for o in module_ast.body if isinstance(o, (ast.ClassDef, ast.FunctionDef))
+    ]
+    for obj in top_level_objs:
+        if isinstance(obj, ast.ClassDef):
+            obj_type = "class"
+        else:
+            assert isinstance(obj, ast.FunctionDef)
+            obj_type = "function"
+
+        # Omit NamedTuples
+        if (
+            obj_type == "class"
+            and obj.bases
+            and hasattr(obj.bases[0], "id")
+            and obj.bases[0].id == "NamedTuple"
+        ):
+            print(
+                f"⏭️  {module_name}.{obj.name} is a NamedTuple, skipping "
+                f"docstring expansion"
+            )
+            continue
+
+        expanded_docstring, is_dataclass = get_docstring(obj.name)
+        if is_dataclass:
+            print(f"⏭️  {module_name}.{obj.name} is a dataclass, skipping ")
+            continue
+        elif expanded_docstring:
+            print(f"📝 Expanding docstring for {module_name}.{obj.name}")
+            _set_docstring(
+                expanded_docstrings,
+                node=obj,
+                docstring=expanded_docstring,
+                qualname=f"{module_name}.{obj.name}",
+                obj_type=obj_type,
+            )
+        else:
+            print(
+                f"⏭️  No docstring found for {obj_type} {module_name}.{obj.name}, skipping"
+            )
+            # Still continue below if object is a class
+            if not isinstance(obj, ast.ClassDef):
+                continue
+
+        # If it's a class, iterate over its methods
+        if obj_type == "class":
+            methods = [m for m in obj.body if isinstance(m, ast.FunctionDef)]
+            for method in methods:
+                expanded_docstring, _ = get_docstring(f"{obj.name}.{method.name}")
+                if expanded_docstring:
+                    print(
+                        f"📝 Expanding docstring for method "
+                        f"{module_name}.{obj.name}.{method.name}"
+                    )
+                    _set_docstring(
+                        expanded_docstrings,
+                        node=method,
+                        docstring=expanded_docstring,
+                        qualname=f"{module_name}.{obj.name}.{method.name}",
+                        obj_type="method",
+                    )
+                else:
+                    print(
+                        f"⏭️  No docstring found for method "
+                        f"{module_name}.{obj.name}.{method.name}, skipping"
+                    )
+
+    if docstring_cache is not None:
+        docstring_cache.store(module_name, new_cache_entries)
+
+    _add_unexpanded_docstrings(expanded_docstrings, module_ast, module_name)
+    return expanded_docstrings, uses_runtime
+
+
+def _add_unexpanded_docstrings(
+    expanded_docstrings: list[ExpandedDocstring],
+    module_ast: ast.Module,
+    module_name: str,
+) -> None:
+    # Docstrings we skipped above (e.g., of dataclasses) are kept as generated by
+    # stubgen, but still need to be rendered for each flavor
+    expanded_nodes = {id(expanded.node) for expanded in expanded_docstrings}
+    nodes = []
+    for obj in module_ast.body:
+        if isinstance(obj, ast.ClassDef):
+            nodes.append((obj, f"{module_name}.{obj.name}", "class"))
+            nodes += [
+                (method, f"{module_name}.{obj.name}.{method.name}", "method")
+                for method in obj.body
+                if isinstance(method, ast.FunctionDef)
+            ]
+        elif isinstance(obj, ast.FunctionDef):
+            nodes.append((obj, f"{module_name}.{obj.name}", "function"))
+
+    for node, qualname, obj_type in nodes:
+        docstring = ast.get_docstring(node, clean=False)
+        if id(node) in expanded_nodes or docstring is None:
+            continue
+        expanded_docstrings.append(
+            ExpandedDocstring(
+                node=node,
+                docstring_node=node.body[0].value,
+                docstring=parse_docstring(docstring),
+                qualname=qualname,
+                obj_type=obj_type,
+            )
+        )
+
+
+def _is_dataclass_decorator(decorator: ast.expr) -> bool:
+    keywords = []
+    if isinstance(decorator, ast.Call):
+        keywords = decorator.keywords
+        decorator = decorator.func
+    if isinstance(decorator, ast.Attribute):
+        name = decorator.attr
+    elif isinstance(decorator, ast.Name):
+        name = decorator.id
+    else:
+        return False
+    init_disabled = any(
+        keyword.arg == "init"
+        and isinstance(keyword.value, ast.Constant)
+        and keyword.value.value is False
+        for keyword in keywords
+    )
+    return name == "dataclass" and not init_disabled
+
+
+def _remove_dataclass_inits(module_ast: ast.Module, module_name: str) -> None:
+    # Stubgen writes out the __init__ that @dataclass generates, but without any
+    # annotations or default values. Type checkers derive a better one from the
+    # fields, as they do for the runtime dataclass.
+    for node in ast.walk(module_ast):
+        if not isinstance(node, ast.ClassDef) or not any(
+            _is_dataclass_decorator(decorator) for decorator in node.decorator_list
+        ):
+            continue
+        for method in node.body:
+            if (
+                len(node.body) > 1
+                and isinstance(method, ast.FunctionDef)
+                and method.name == "__init__"
+                and not any(
+                    arg.annotation is not None
+                    for arg in [*method.args.args[1:], *method.args.kwonlyargs]
+                )
+            ):
+                print(f"✂️  Removing generated __init__ of {module_name}.{node.name}")
+                node.body.remove(method)
+                break
+
+
+def _process_stub(
+    stub: tuple[Path, str],
+    *,
+    flavors: list[str],
+    source_dir: Path | None,
+    docstring_cache: DocstringCache | None,
+    with_symbols: bool,
+    timer: Timer,
+) -> StubResult:
+    stub_rel_path, stub_source = stub
+    with timer.phase("parsing"):
+        module_ast = ast.parse(stub_source)
+    module_name = str(stub_rel_path.with_suffix("")).replace("/", ".")
+    _remove_dataclass_inits(module_ast, module_name)
+    source_path = None
+    if source_dir is not None:
+        source_path = source_dir / stub_rel_path.with_suffix(".py")
+        if not source_path.exists():
+            source_path = None
+    # Docstrings don't need to be expanded if only docstring-free flavors are
+    # requested
+    expanded_docstrings = []
+    docstrings_use_runtime = False
+    if any(FLAVORS[name].render_docstring is not None for name in flavors):
+        with timer.phase("expansion"):
+            expanded_docstrings, docstrings_use_runtime = expand_docstrings(
+                module_ast,
+                module_name,
+                source_path=source_path,
+                docstring_cache=docstring_cache,
+                timer=timer,
+            )
+    with timer.phase("defaults"):
+        defaults_errors, defaults_use_runtime = add_defaults(
+            module_ast,
+            stub_path_to_module_name(stub_rel_path, Path()),
+            source_path=source_path,
+            timer=timer,
+        )
+
+    symbols = {}
+    aliases = {}
+    if with_symbols:
+        with timer.phase("symbols"):
+            symbols, aliases = collect_symbols(
+                module_ast,
+                stub_path_to_module_name(stub_rel_path, Path()),
+                stub_rel_path=stub_rel_path,
+                source_path=source_path,
+            )
+
+    outputs = {}
+    for flavor_name in flavors:
+        flavor = FLAVORS[flavor_name]
+        with timer.phase("cleaning"):
+            if flavor.render_docstring is None:
+                flavor_ast = strip_docstrings(module_ast)
+            else:
+                flavor_ast = module_ast
+                for expanded in expanded_docstrings:
+                    expanded.docstring_node.value = flavor.render_docstring(
+                        expanded.docstring,
+                        node=expanded.node,
+                        qualname=expanded.qualname,
+                        obj_type=expanded.obj_type,
+                    )
+                    if id(expanded.node) in symbols:
+                        symbols[id(expanded.node)].docstrings[
+                            flavor_name
+                        ] = expanded.docstring_node.value
+
+            print(f"🧽 Cleaning {flavor.name} stub: {stub_rel_path}")
+            outputs[flavor_name] = clean_module(ast.unparse(flavor_ast))
+
+    return StubResult(
+        module_name=module_name,
+        stub_rel_path=stub_rel_path,
+        outputs=outputs,
+        defaults_errors=defaults_errors,
+        timer=timer,
+        uses_runtime=docstrings_use_runtime or defaults_use_runtime,
+        # Overloads share a single object
+        symbols=list({id(symbol): symbol for symbol in symbols.values()}.values()),
+        aliases=aliases,
+    )
+
+
+def process_stub(
+    stub: tuple[Path, str],
+    *,
+    flavors: list[str],
+    source_dir: Path | None = None,
+    docstring_cache: DocstringCache | None = None,
+    with_symbols: bool = False,
+) -> StubResult:
+    """Expand the docstrings in a stub and render it in every flavor.
+
+    Parameter default values are added along the way, once for all flavors.
+
+    Parameters
+    ----------
+    stub
+        The path of the stub relative to the stubs directory, and its contents as
+        generated by stubgen.
+    flavors
+        The names of the flavors to render the stub in.
+    source_dir
+        The directory containing the MNE sources, i.e. site-packages. If given,
+        docstrings and default values are taken from the source code instead of
+        by importing the module, where possible.
+    docstring_cache
+        The cache of docstrings expanded in previous runs.
+    with_symbols
+        Whether to also collect the objects in the stub for the symbol database.
+
+    Returns
+    -------
+    result
+        The rendered stubs, the errors encountered while adding default values,
+        the timings, and the objects in the stub. If processing the stub failed,
+        the traceback is returned instead, so the other stubs can still be
+        processed.
+    """
+    timer = Timer()
+    try:
+        return _process_stub(
+            stub,
+            flavors=flavors,
+            source_dir=source_dir,
+            docstring_cache=docstring_cache,
+            with_symbols=with_symbols,
+            timer=timer,
+        )
+    except Exception:
+        error = traceback.format_exc()
+    stub_rel_path, _ = stub
+    print(f"❌ Failed to process {stub_rel_path}:\n{error}")
+    return StubResult(
+        module_name=str(stub_rel_path.with_suffix("")).replace("/", "."),
+        stub_rel_path=stub_rel_path,
+        outputs={},
+        defaults_errors=[],
+        timer=timer,
+        error=error,
+    )
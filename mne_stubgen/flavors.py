@@ -0,0 +1,279 @@
+"""The flavors of stubs we can generate.
+
+All flavors share the expensive work – running stubgen, importing MNE, expanding
+the docstrings, and adding default values. They only differ in how the expanded
+docstrings – parsed by ``mne_stubgen.numpydoc`` – are rendered into the final
+stub files:
+
+- ``mne``: plain reST, with the Sphinx-specific roles and directives removed.
+  These are the stubs we ship.
+- ``vscode``: markdown-style headers for nicer rendering of hover tooltips in
+  VS Code / Pylance.
+- ``slim``: no docstrings at all, only the signatures and annotations. Type
+  checkers have much less to parse, which speeds up cold type-checking runs
+  (e.g. in CI).
+"""
+
+import ast
+import copy
+import dataclasses
+import re
+from collections.abc import Callable, Sequence
+
+from .cleaning import Cleaner, Rule, literal
+from .numpydoc import Docstring
+
+
+# Cleaning of the code, i.e. everything but the docstrings, is the same for all
+# flavors: remove imports of the verbose function, which is not needed as the stubs
+# don't contain the @verbose decorator; and remove unhelpful "Incomplete | None"
+# annotations.
+MODULE_CLEANING_RULES = (
+    literal(": Incomplete | None=", "="),
+    literal(", verbose as verbose,", ","),
+    literal(", verbose as verbose", ""),
+    Rule(
+        pattern=r"from \.\.\.?utils import verbose as verbose(?=\n|\Z)",
+        replacement="",
+    ),
+    literal("import verbose as verbose,", "import"),
+)
+
+clean_module = Cleaner(MODULE_CLEANING_RULES).clean
+
+
+# MNE flavor
+# ----------
+# This includes replacing the Sphinx roles and directives, which are not standard
+# reST.
+SPHINX_ROLES = (
+    "attr",
+    "class",
+    "doc",
+    "eq",
+    "exc",
+    "file",
+    "footcite",
+    "footcite:t",
+    "func",
+    "gh",
+    "kbd",
+    "meth",
+    "mod",
+    "newcontrib",
+    "py:mod",
+    "ref",
+    "samp",
+    "term",
+)
+
+SPHINX_DIRECTIVES_REPLACE_MAP = {
+    "warning": "⛔️",
+    "Warning": "⛔️",
+    "note": "💡",
+    "versionadded": "✨ Added in version",
+    "versionchanged": "🎭 Changed in version",
+}
+
+
+MNE_CLEANING_RULES = (
+    # Drop the Sphinx roles; longer roles first, so that e.g. ":footcite:t:" is
+    # not matched as ":footcite:"
+    Rule(
+        pattern=":(?:"
+        + "|".join(re.escape(role) for role in sorted(SPHINX_ROLES, key=len)[::-1])
+        + "):",
+        replacement="",
+    ),
+    # Replace directives
+    *(
+        Rule(
+            pattern=f"\\.\\. {re.escape(directive)}::\\s*",
+            replacement=f"{replacement} ",
+        )
+        for directive, replacement in SPHINX_DIRECTIVES_REPLACE_MAP.items()
+    ),
+    # Replace shortened cross-references
+    # `~foo.bar` -> `bar`
+    Rule(pattern=r"`~[\w.]*\.(\w+)`", replacement=r"`\1`"),
+)
+
+_clean_text_mne = Cleaner(MNE_CLEANING_RULES).clean
+
+
+def render_docstring_mne(
+    docstring: Docstring,
+    *,
+    node: ast.ClassDef | ast.FunctionDef,
+    qualname: str,
+    obj_type: str,
+) -> str:
+    """Render a parsed docstring for the MNE flavor."""
+    return _clean_text_mne(docstring.to_rst())
+
+
+# VS Code flavor
+# --------------
+SECTION_HEADER_REPLACE_MAP = {
+    "Parameters": "🛠️ Parameters",
+    "Attributes": "📊 Attributes",
+    "Returns": "⏎ Returns",
+    "Notes": "📖 Notes",
+    "See Also": "👉 See Also",
+    "Examples": "🖥️ Examples",
+}
+# The sections whose entries are rendered as headers, i.e. those listing names
+# with their types; not e.g. the exceptions listed in "Raises"
+ENTRY_HEADER_SECTIONS = frozenset(
+    (
+        "Parameters",
+        "Other Parameters",
+        "Attributes",
+        "Returns",
+        "Yields",
+        "Receives",
+    )
+)
+
+
+def _replace_bold_vscode(
+    groups: Sequence[str | None], clean: Callable[[str], str]
+) -> str:
+    return f"`{clean(groups[1])}`"
+
+
+VSCODE_CLEANING_RULES = (
+    literal("`~", "`"),
+    *(literal(f":{role}:", "") for role in ("class", "meth", "func", "mod", "ref")),
+    literal(".. warning::", "### ⛔️ Warning"),
+    literal(".. Warning::", "### ⛔️ Warning"),
+    literal(".. note::", "### 💡 Note"),
+    literal(".. versionadded::", "✨ Added in version"),
+    literal(".. versionchanged::", "🎭 Changed in version"),
+    # Change markup of reST bold and italic parameters
+    Rule(pattern=r"\*\*(.+)\*\*", replacement=_replace_bold_vscode),
+    Rule(pattern=r" \*([a-z, ,\,]+)\*([a-z]*)(?=\n|\Z)", replacement=r" `\1` \2"),
+)
+
+_clean_text_vscode = Cleaner(VSCODE_CLEANING_RULES).clean
+
+
+def _clean_lines_vscode(lines: list[str]) -> list[str]:
+    if not lines:
+        return []
+    return _clean_text_vscode("\n".join(lines)).split("\n")
+
+
+def render_docstring_vscode(
+    docstring: Docstring,
+    *,
+    node: ast.ClassDef | ast.FunctionDef,
+    qualname: str,
+    obj_type: str,
+) -> str:
+    """Render a parsed docstring for the VS Code flavor."""
+    # Special handling for docstring manipulation done through
+    # the @deprecated decorator
+    # We need to correct the indentation (add spaces before
+    # the ".. warning::" directive)
+    summary_lines = list(docstring.summary.lines)
+    for line_idx, line in enumerate(summary_lines):
+        if line.startswith(".. warning:: DEPRECATED:"):
+            print(f"🦄 Applying special handling for @deprecated {obj_type} {qualname}")
+            line = line.replace(".. warning:: DEPRECATED:", "## ☠️ DEPRECATED")
+            summary_lines[line_idx] = (node.col_offset + 4) * " " + line
+            break
+
+    # Make first line bold
+    if summary_lines and not summary_lines[0].lstrip().startswith("## ☠️ DEPRECATED"):
+        summary_lines[0] = f"## {summary_lines[0]}"
+
+    lines = _clean_lines_vscode(summary_lines)
+    for section in docstring.sections:
+        # Make the section headers nicer
+        if section.title in SECTION_HEADER_REPLACE_MAP:
+            lines += [
+                f"{section.indent}-----",
+                f"{section.indent}### {SECTION_HEADER_REPLACE_MAP[section.title]}",
+                "",
+            ]
+        else:
+            lines += [
+                f"{section.indent}{section.title}",
+                f"{section.indent}{section.underline}",
+            ]
+
+        lines += _clean_lines_vscode(section.lines)
+
+        # Make the parameter lists nicer
+        for parameter in section.parameters:
+            header = _clean_text_vscode(parameter.header)
+            if section.title in ENTRY_HEADER_SECTIONS:
+                lines.append(f"{parameter.indent}#### `{header}`")
+            else:
+                lines.append(f"{parameter.indent}{header}")
+            lines += _clean_lines_vscode(parameter.description)
+
+    return "\n".join(lines)
+
+
+# Slim flavor
+# -----------
+def strip_docstrings(module_ast: ast.Module) -> ast.Module:
+    """Return a copy of a stub's AST without any docstrings."""
+    module_ast = copy.deepcopy(module_ast)
+    for node in ast.walk(module_ast):
+        if not isinstance(node, (ast.Module, ast.ClassDef, ast.FunctionDef)):
+            continue
+        if (
+            node.body
+            and isinstance(node.body[0], ast.Expr)
+            and isinstance(node.body[0].value, ast.Constant)
+            and isinstance(node.body[0].value.value, str)
+        ):
+            del node.body[0]
+            if not node.body and not isinstance(node, ast.Module):
+                node.body.append(ast.Expr(ast.Constant(...)))
+    return module_ast
+
+
+@dataclasses.dataclass(frozen=True)
+class Flavor:
+    """A flavor of stubs.
+
+    Attributes
+    ----------
+    name
+        The name of the flavor, as used on the command line.
+    default_out_dir
+        The default output directory, relative to the repository root.
+    render_docstring
+        Renders a parsed docstring for insertion into the stub. If ``None``, the
+        stubs don't contain any docstrings.
+    """
+
+    name: str
+    default_out_dir: str
+    render_docstring: Callable[..., str] | None
+
+
+FLAVORS = {
+    flavor.name: flavor
+    for flavor in (
+        Flavor(
+            name="mne",
+            default_out_dir="typings",
+            render_docstring=render_docstring_mne,
+        ),
+        Flavor(
+            name="vscode",
+            default_out_dir="typings-vscode",
+            render_docstring=render_docstring_vscode,
+        ),
+        Flavor(
+            name="slim",
+            default_out_dir="types-mne-slim/typings",
+            render_docstring=None,
+        ),
+    )
+}
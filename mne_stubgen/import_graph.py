@@ -0,0 +1,135 @@
+"""Find the MNE modules each module imports when it is imported.
+
+Docstrings and default values taken from the imported modules (see ``expand``
+and ``defaults``) may have been copied from other modules at import time, e.g.
+via ``@copy_function_doc_to_method_doc``. Such a stub is only outdated if one of
+the modules it (transitively) imports changed, which is what this graph tells.
+
+Only the imports run at import time are followed, i.e. not those inside
+functions. A name imported from a lazily loaded package is attributed to the
+submodule the package's ``__init__.pyi`` imports it from, as ``lazy_loader``
+only imports that submodule; otherwise, depending on a package like ``mne.viz``
+would mean depending on all of its submodules.
+"""
+
+import ast
+from collections import deque
+from pathlib import Path
+
+from .dedupe import get_import_target
+from .manifest import source_to_stub_path
+
+
+def get_module_level_imports(tree: ast.Module) -> list[ast.ImportFrom]:
+    """Get the imports of a module, but not those inside functions or classes."""
+    imports = []
+    stmts = deque(tree.body)
+    while stmts:
+        stmt = stmts.popleft()
+        if isinstance(stmt, ast.ImportFrom):
+            imports.append(stmt)
+        elif not isinstance(stmt, (ast.FunctionDef, ast.ClassDef)):
+            # e.g. "if TYPE_CHECKING:" or "try:" blocks
+            stmts.extend(
+                child
+                for child in ast.iter_child_nodes(stmt)
+                if isinstance(child, ast.stmt)
+            )
+    return imports
+
+
+def _module_to_stub_path(module_name: str, source_root: Path) -> str | None:
+    """Get the stub path of an MNE module, or ``None`` if there is no such module."""
+    if module_name != "mne" and not module_name.startswith("mne."):
+        return None
+    rel_path = Path(*module_name.split("."))
+    if (source_root / rel_path / "__init__.py").exists():
+        return str(rel_path / "__init__.pyi")
+    if (source_root / rel_path.with_suffix(".py")).exists():
+        return str(rel_path.with_suffix(".pyi"))
+    return None
+
+
+def _get_lazy_imports(stub_path: str, source_root: Path) -> dict[str, str]:
+    """Map the names a lazily loaded package provides to their modules."""
+    init_pyi_path = source_root / stub_path
+    if not init_pyi_path.exists():
+        return {}
+    tree = ast.parse(init_pyi_path.read_text(encoding="utf-8"))
+    return {
+        alias.asname or alias.name: get_import_target(Path(stub_path), node)
+        for node in get_module_level_imports(tree)
+        for alias in node.names
+    }
+
+
+def _resolve_import(
+    module_name: str,
+    name: str,
+    *,
+    source_root: Path,
+    lazy_imports: dict[str, dict[str, str]],
+) -> list[str]:
+    """Get the stubs of the modules ``from module_name import name`` depends on."""
+    submodule = _module_to_stub_path(f"{module_name}.{name}", source_root)
+    if submodule is not None:
+        return [submodule]
+    stub_path = _module_to_stub_path(module_name, source_root)
+    if stub_path is None:
+        return []
+    stubs = [stub_path]
+    if stub_path.endswith("__init__.pyi"):
+        if stub_path not in lazy_imports:
+            lazy_imports[stub_path] = _get_lazy_imports(stub_path, source_root)
+        target = lazy_imports[stub_path].get(name)
+        if target is not None and target != module_name:
+            stubs += _resolve_import(
+                target, name, source_root=source_root, lazy_imports=lazy_imports
+            )
+    return stubs
+
+
+def find_imports(
+    source_paths: list[Path], *, source_root: Path
+) -> dict[str, list[str]]:
+    """Find the MNE modules each module imports at import time.
+
+    Parameters
+    ----------
+    source_paths
+        The ``.py`` and ``__init__.pyi`` files of the modules.
+    source_root
+        The directory containing the ``mne`` package.
+
+    Returns
+    -------
+    imports
+        The stubs of the imported modules, keyed by the stub of the importing
+        module. Modules that don't import any other MNE module are left out.
+    """
+    imports = {}
+    lazy_imports: dict[str, dict[str, str]] = {}
+    for path in source_paths:
+        stub_path = source_to_stub_path(str(path.relative_to(source_root)))
+        # For lazily loaded packages, the imports run at import time are those in
+        # the __init__.py, not in the __init__.pyi
+        module_path = source_root / Path(stub_path).with_suffix(".py")
+        if not module_path.exists():
+            continue
+        tree = ast.parse(module_path.read_text(encoding="utf-8"))
+        imported = set()
+        for node in get_module_level_imports(tree):
+            target = get_import_target(Path(stub_path), node)
+            for alias in node.names:
+                imported.update(
+                    _resolve_import(
+                        target,
+                        alias.name,
+                        source_root=source_root,
+                        lazy_imports=lazy_imports,
+                    )
+                )
+        imported.discard(stub_path)
+        if imported:
+            imports[stub_path] = sorted(imported)
+    return imports
@@ -0,0 +1,148 @@
+"""Measure how expensive it is to import each MNE module.
+
+When the stubs are generated, all modules are imported into the same
+interpreter, one after the other. The cost of importing a module there – its
+*marginal* cost – depends on which of its dependencies were already imported by
+the modules before it. To see what a module costs by itself, we additionally
+import it into a fresh interpreter – its *isolated* cost. This is similar to
+``python -X importtime``, but reported per stub.
+
+For each module, we record the wall time and the growth of the resident set size
+(RSS) of the importing process.
+"""
+
+import contextlib
+import dataclasses
+import importlib
+import io
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from .parallel import resolve_jobs
+
+REPO_DIR = Path(__file__).parent.parent
+
+
+@dataclasses.dataclass
+class ImportCost:
+    """The cost of importing a module.
+
+    Attributes
+    ----------
+    module_name
+        The name of the module.
+    stub_path
+        The path of the module's stub, relative to the output directory.
+    marginal
+        The wall time of importing the module after all previous modules, in
+        seconds.
+    marginal_rss
+        The growth of the RSS when importing the module after all previous
+        modules, in bytes.
+    isolated
+        The wall time of importing the module into a fresh interpreter, in
+        seconds.
+    isolated_rss
+        The growth of the RSS when importing the module into a fresh
+        interpreter, in bytes.
+    error
+        The error raised when importing the module, if any.
+    """
+
+    module_name: str
+    stub_path: str
+    marginal: float | None = None
+    marginal_rss: int | None = None
+    isolated: float | None = None
+    isolated_rss: int | None = None
+    error: str | None = None
+
+
+def _get_rss() -> int | None:
+    try:
+        statm = Path("/proc/self/statm").read_text()
+    except OSError:  # not on Linux
+        return None
+    return int(statm.split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def _measure_import(module_name: str) -> tuple[float, int | None]:
+    rss_before = _get_rss()
+    start = time.perf_counter()
+    # Some modules print messages when imported
+    with contextlib.redirect_stdout(io.StringIO()):
+        importlib.import_module(module_name)
+    duration = time.perf_counter() - start
+    rss_after = _get_rss()
+    if rss_before is None or rss_after is None:
+        return duration, None
+    return duration, rss_after - rss_before
+
+
+def measure_marginal(costs: list[ImportCost]) -> None:
+    """Import the modules into the current interpreter, in order."""
+    for cost in costs:
+        print(f"📥 Importing {cost.module_name}")
+        try:
+            cost.marginal, cost.marginal_rss = _measure_import(cost.module_name)
+        except Exception as e:
+            print(f"❌ Importing {cost.module_name} failed: {e!r}")
+            cost.error = repr(e)
+
+
+def _measure_isolated(cost: ImportCost) -> None:
+    process = subprocess.run(
+        [sys.executable, "-m", "mne_stubgen.import_profile", cost.module_name],
+        cwd=REPO_DIR,
+        capture_output=True,
+        text=True,
+    )
+    if process.returncode != 0:
+        # The interpreter may have been killed without writing anything
+        stderr_lines = process.stderr.strip().splitlines()
+        cost.error = cost.error or (
+            stderr_lines[-1]
+            if stderr_lines
+            else f"exited with return code {process.returncode}"
+        )
+        return
+    result = json.loads(process.stdout.strip().splitlines()[-1])
+    cost.isolated = result["duration"]
+    cost.isolated_rss = result["rss"]
+
+
+def measure_isolated(costs: list[ImportCost], *, jobs: int) -> None:
+    """Import each module into a fresh interpreter.
+
+    Parameters
+    ----------
+    costs
+        The modules to import.
+    jobs
+        The number of modules to import concurrently. If 0, one per CPU.
+    """
+    print(f"🧪 Importing {len(costs)} modules into fresh interpreters")
+    with ThreadPoolExecutor(max_workers=resolve_jobs(jobs)) as executor:
+        list(executor.map(_measure_isolated, costs))
+
+
+def print_top(costs: list[ImportCost], *, key: str, n: int, title: str) -> None:
+    """Print the ``n`` most expensive modules according to the attribute ``key``."""
+    measured = [cost for cost in costs if getattr(cost, key) is not None]
+    measured.sort(key=lambda cost: getattr(cost, key), reverse=True)
+    print(f"\n🐌 {title}:")
+    for cost in measured[:n]:
+        rss = getattr(cost, f"{key}_rss")
+        rss_text = "" if rss is None else f", {rss / 1024**2:+7.1f} MB"
+        print(f"   {getattr(cost, key):7.3f} s{rss_text}  {cost.stub_path}")
+
+
+if __name__ == "__main__":
+    # Import a single module into this (fresh) interpreter and report the cost
+    duration, rss = _measure_import(sys.argv[1])
+    print(json.dumps({"duration": duration, "rss": rss}))
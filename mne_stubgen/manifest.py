@@ -0,0 +1,239 @@
+"""Manifest of the inputs that went into a generated stub tree.
+
+The manifest maps every MNE source file that was passed to stubgen to a hash of
+its contents, and additionally records a hash of the generator code, the
+versions of the tools involved, and the options that change the output, as well
+as which stubs depend on which other stubs, which stubs depend on the imported
+modules, and which modules these import. Comparing the manifest of the previous run with the current
+state of the MNE installation tells us which stubs need to be regenerated, and
+whether the existing stubs can be reused at all.
+"""
+
+import hashlib
+import importlib.metadata
+import json
+import platform
+import subprocess
+from collections import deque
+from pathlib import Path
+
+from .output import write_if_changed
+
+MANIFEST_FILENAME = ".stubgen-manifest.json"
+MANIFEST_VERSION = 2
+
+# Changes to these source files may affect the expanded docstrings of *any*
+# module (e.g., through the docdict used by @fill_doc), so they always trigger
+# a full rebuild.
+GLOBAL_SOURCES = ("mne/utils/docs.py",)
+
+
+# Information about individual stubs recorded while processing them and by the
+# passes over all stubs of a flavor (see ``mne_stubgen/expand.py``,
+# ``mne_stubgen/dedupe.py``, and ``mne_stubgen/prune.py``), keyed by the stub
+# path. It is carried over for the stubs an incremental run keeps.
+STUB_RECORDS = ("dependencies", "imports", "pruned_imports", "uses_runtime")
+
+
+def hash_file(path: Path) -> str:
+    """Return the SHA-256 hex digest of a file's contents."""
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def hash_files(paths: list[Path]) -> str:
+    """Return a single SHA-256 hex digest covering several files."""
+    hasher = hashlib.sha256()
+    for path in sorted(paths):
+        hasher.update(path.name.encode("utf-8"))
+        hasher.update(path.read_bytes())
+    return hasher.hexdigest()
+
+
+def hash_sources(sources: dict[str, str]) -> str:
+    """Return a single SHA-256 hex digest covering the source hashes of a manifest."""
+    return hashlib.sha256(
+        json.dumps(sources, sort_keys=True).encode("utf-8")
+    ).hexdigest()
+
+
+def hash_stub_trees(manifests: dict[str, dict]) -> str:
+    """Return a single SHA-256 hex digest identifying the stubs of all flavors.
+
+    Only the inputs the stubs are generated from are covered, not what is recorded
+    about the individual stubs.
+    """
+    inputs = {
+        flavor_name: {
+            key: manifest.get(key)
+            for key in ("generator", "tools", "options", "global_sources", "sources")
+        }
+        for flavor_name, manifest in manifests.items()
+    }
+    return hashlib.sha256(
+        json.dumps(inputs, sort_keys=True).encode("utf-8")
+    ).hexdigest()
+
+
+def get_tool_versions() -> dict[str, str]:
+    """Return the versions of all tools that influence the generated stubs."""
+    versions = {"mypy": importlib.metadata.version("mypy")}
+    versions["ruff"] = subprocess.run(
+        ["ruff", "--version"], capture_output=True, text=True, check=True
+    ).stdout.strip()
+    # stubgen and ast.unparse() output may differ between Python versions
+    versions["python"] = platform.python_version()
+    return versions
+
+
+def source_to_stub_path(source: str) -> str:
+    """Map a source path relative to site-packages to its stub path.
+
+    E.g., ``mne/io/base.py`` -> ``mne/io/base.pyi``, and
+    ``mne/io/__init__.pyi`` stays as-is.
+    """
+    return str(Path(source).with_suffix(".pyi"))
+
+
+def get_importers(imports: dict[str, list[str]], stubs: set[str]) -> set[str]:
+    """Get the stubs of the modules that import any of the given ones.
+
+    Parameters
+    ----------
+    imports
+        The stubs of the modules each module imports, keyed by the stub of the
+        importing module (see ``mne_stubgen/import_graph.py``).
+    stubs
+        The stubs of the imported modules.
+
+    Returns
+    -------
+    importers
+        The given stubs, and those of the modules that import them, directly or
+        via other modules.
+    """
+    imported_by: dict[str, list[str]] = {}
+    for importer, imported in imports.items():
+        for stub in imported:
+            imported_by.setdefault(stub, []).append(importer)
+    importers = set(stubs)
+    queue = deque(stubs)
+    while queue:
+        for importer in imported_by.get(queue.popleft(), ()):
+            if importer not in importers:
+                importers.add(importer)
+                queue.append(importer)
+    return importers
+
+
+def build_manifest(
+    *,
+    source_paths: list[Path],
+    source_root: Path,
+    generator_paths: list[Path],
+    options: dict,
+) -> dict:
+    """Create a manifest for the current state of the inputs.
+
+    Parameters
+    ----------
+    source_paths
+        The ``.py`` and ``__init__.pyi`` files that will be passed to stubgen.
+    source_root
+        The directory the source paths will be stored relative to, i.e. the
+        site-packages directory MNE is installed in.
+    generator_paths
+        The files making up the generator itself.
+    options
+        The command line options that change the generated stubs.
+    """
+    return {
+        "manifest_version": MANIFEST_VERSION,
+        "generator": hash_files(generator_paths),
+        "tools": get_tool_versions(),
+        "options": options,
+        "global_sources": {
+            source: hash_file(source_root / source)
+            for source in GLOBAL_SOURCES
+            if (source_root / source).exists()
+        },
+        "sources": {
+            str(path.relative_to(source_root)): hash_file(path)
+            for path in sorted(source_paths)
+        },
+    }
+
+
+def read_manifest(stubs_out_dir: Path) -> dict | None:
+    """Read the manifest stored alongside existing stubs, if any."""
+    manifest_path = stubs_out_dir / MANIFEST_FILENAME
+    if not manifest_path.exists():
+        return None
+    try:
+        manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    except json.JSONDecodeError:
+        return None
+    if manifest.get("manifest_version") != MANIFEST_VERSION:
+        return None
+    return manifest
+
+
+def write_manifest(stubs_out_dir: Path, manifest: dict) -> None:
+    """Store the manifest alongside the generated stubs, if it changed."""
+    write_if_changed(
+        stubs_out_dir / MANIFEST_FILENAME,
+        json.dumps(manifest, indent=2, sort_keys=True) + "\n",
+    )
+
+
+def get_stale_sources(
+    old_manifest: dict | None, new_manifest: dict, stubs_out_dir: Path
+) -> tuple[set[str], set[str]] | None:
+    """Determine which sources need to be (re-)processed.
+
+    Returns
+    -------
+    stale
+        ``None`` if the existing stubs cannot be reused and a full rebuild is
+        required. Otherwise, a tuple of the sources that are new or have changed,
+        and the sources that no longer exist. Sources whose stub file has gone
+        missing are considered changed, as are those whose stub depends on the
+        stub of a changed or removed source (see ``mne_stubgen/dedupe.py``).
+
+        Sources whose stub took docstrings or default values from the imported
+        module are considered changed if they import a changed or removed module,
+        directly or via other modules: these may have been copied from there at
+        runtime, e.g. via ``@copy_function_doc_to_method_doc``.
+    """
+    if old_manifest is None:
+        return None
+
+    for key in ("generator", "tools", "options", "global_sources", "flavor"):
+        if old_manifest.get(key) != new_manifest.get(key):
+            return None
+
+    old_sources = old_manifest.get("sources", {})
+    new_sources = new_manifest["sources"]
+    changed = {
+        source
+        for source, source_hash in new_sources.items()
+        if old_sources.get(source) != source_hash
+        or not (stubs_out_dir / source_to_stub_path(source)).exists()
+    }
+    removed = set(old_sources) - set(new_sources)
+    importers = get_importers(
+        old_manifest.get("imports", {}),
+        {source_to_stub_path(source) for source in changed | removed},
+    )
+    affected = importers.intersection(old_manifest.get("uses_runtime", {}))
+    changed |= {
+        source for source in new_sources if source_to_stub_path(source) in affected
+    }
+
+    stale_stubs = {source_to_stub_path(source) for source in changed | removed}
+    dependencies = old_manifest.get("dependencies", {})
+    changed |= {
+        source
+        for source in new_sources
+        if stale_stubs.intersection(dependencies.get(source_to_stub_path(source), ()))
+    }
+    return changed, removed
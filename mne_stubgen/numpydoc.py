@@ -0,0 +1,186 @@
+"""A minimal parser for numpydoc-style docstrings.
+
+Each expanded docstring is parsed once into a list of sections, and each flavor
+renders this structure in its own way. The parser is lossless: rendering a parsed
+docstring via ``Docstring.to_rst()`` yields the original docstring.
+"""
+
+import dataclasses
+
+# Sections whose contents are lists of "name : type" entries, each followed by an
+# indented description
+PARAMETER_SECTIONS = frozenset(
+    (
+        "Parameters",
+        "Other Parameters",
+        "Attributes",
+        "Returns",
+        "Yields",
+        "Receives",
+        "Raises",
+        "Warns",
+    )
+)
+
+
+@dataclasses.dataclass
+class Parameter:
+    """An entry of a parameter-like section.
+
+    Attributes
+    ----------
+    indent
+        The indentation of the line containing the name.
+    name
+        The name of the parameter; or, for entries without a type separator
+        (e.g. in a "Raises" section), the entire entry after the indentation.
+    type
+        The type of the parameter, if specified. Like ``name``, it keeps any
+        surrounding whitespace other than that of the separator.
+    description
+        The description lines, with their original indentation.
+    """
+
+    indent: str
+    name: str
+    type: str | None
+    description: list[str]
+
+    @property
+    def header(self) -> str:
+        """The line introducing the entry, without indentation."""
+        if self.type is None:
+            return self.name
+        return f"{self.name} : {self.type}"
+
+
+@dataclasses.dataclass
+class Section:
+    """A section of a docstring.
+
+    Attributes
+    ----------
+    title
+        The title of the section; ``None`` for the summary and extended summary
+        at the beginning of the docstring.
+    indent
+        The indentation of the section header.
+    underline
+        The line underlining the title, without indentation.
+    lines
+        The lines of the section body. For parameter-like sections, only the
+        lines preceding the first entry.
+    parameters
+        The entries of parameter-like sections.
+    """
+
+    title: str | None
+    indent: str = ""
+    underline: str = ""
+    lines: list[str] = dataclasses.field(default_factory=list)
+    parameters: list[Parameter] = dataclasses.field(default_factory=list)
+
+    def to_rst(self) -> list[str]:
+        """Render the section as lines of reST."""
+        rst = []
+        if self.title is not None:
+            rst += [f"{self.indent}{self.title}", f"{self.indent}{self.underline}"]
+        rst += self.lines
+        for parameter in self.parameters:
+            rst.append(f"{parameter.indent}{parameter.header}")
+            rst += parameter.description
+        return rst
+
+
+@dataclasses.dataclass
+class Docstring:
+    """A parsed docstring.
+
+    Attributes
+    ----------
+    summary
+        The summary and extended summary.
+    sections
+        All further sections, in order.
+    """
+
+    summary: Section
+    sections: list[Section]
+
+    def to_rst(self) -> str:
+        """Render the docstring as reST, i.e., reproduce the original docstring."""
+        lines = self.summary.to_rst()
+        for section in self.sections:
+            lines += section.to_rst()
+        return "\n".join(lines)
+
+
+def _get_indent(line: str) -> str:
+    return line[: len(line) - len(line.lstrip())]
+
+
+def _is_section_header(line: str, next_line: str) -> bool:
+    title = line.strip()
+    return (
+        bool(title)
+        and not title.startswith("-")
+        and next_line.strip() == "-" * len(title)
+        and _get_indent(line) == _get_indent(next_line)
+    )
+
+
+def _parse_parameters(section: Section) -> None:
+    lines = section.lines
+    section.lines = []
+    for line in lines:
+        # Unexpanded docdict placeholders, like "%(verbose)s", are not entries
+        is_entry = (
+            line.strip()
+            and not line.strip().startswith("%(")
+            and len(_get_indent(line)) <= len(section.indent)
+        )
+        if is_entry:
+            indent = _get_indent(line)
+            name, sep, type_ = line[len(indent) :].partition(" : ")
+            section.parameters.append(
+                Parameter(
+                    indent=indent,
+                    name=name,
+                    type=type_ if sep else None,
+                    description=[],
+                )
+            )
+        elif section.parameters:
+            section.parameters[-1].description.append(line)
+        else:
+            section.lines.append(line)
+
+
+def parse_docstring(docstring: str) -> Docstring:
+    """Parse a numpydoc-style docstring."""
+    lines = docstring.split("\n")
+    summary = Section(title=None)
+    sections: list[Section] = []
+    current = summary
+
+    line_idx = 0
+    while line_idx < len(lines):
+        line = lines[line_idx]
+        if line_idx + 1 < len(lines) and _is_section_header(line, lines[line_idx + 1]):
+            current = Section(
+                title=line.strip(),
+                indent=_get_indent(line),
+                underline=lines[line_idx + 1].strip(),
+            )
+            sections.append(current)
+            line_idx += 2
+            continue
+
+        current.lines.append(line)
+        line_idx += 1
+
+    for section in sections:
+        if section.title in PARAMETER_SECTIONS:
+            _parse_parameters(section)
+
+    return Docstring(summary=summary, sections=sections)
@@ -0,0 +1,184 @@
+"""Update the output directories in place, only touching files that changed.
+
+Deleting and rewriting the output directory on every run changes the
+modification time of every stub, which invalidates the caches of type checkers,
+language servers, and build tools – even if the stubs themselves didn't change.
+Instead, each flavor is written to a staging directory next to its output
+directory first. Once it's complete (i.e., linted and formatted), only files
+whose contents differ are moved into the output directory, each via an atomic
+rename, and files that are no longer generated are deleted.
+
+Only the stubs and ``py.typed`` files of the ``mne`` package are ever deleted,
+and only from directories that are empty, were written by a previous run, or are
+known to belong to the generator (see ``can_prune``), so pointing an output
+directory at a directory with other contents – e.g. that of a package's metadata
+– cannot wipe it.
+"""
+
+import dataclasses
+import os
+import shutil
+from collections.abc import Collection
+from pathlib import Path
+
+
+@dataclasses.dataclass
+class SyncStats:
+    """What happened when updating an output directory.
+
+    Attributes
+    ----------
+    n_changed
+        The number of files that were new or changed, and thus replaced.
+    n_unchanged
+        The number of files that were identical, and thus left alone.
+    n_removed
+        The number of files that were deleted.
+    """
+
+    n_changed: int = 0
+    n_unchanged: int = 0
+    n_removed: int = 0
+
+
+def get_staging_dir(out_dir: Path) -> Path:
+    """Return the staging directory of an output directory.
+
+    It lives next to the output directory, so files can be moved from one to the
+    other via an atomic rename on the same file system.
+    """
+    return out_dir.with_name(f".{out_dir.name}.staging")
+
+
+def prepare_staging_dir(out_dir: Path) -> Path:
+    """Create an empty staging directory, removing leftovers of failed runs."""
+    staging_dir = get_staging_dir(out_dir)
+    if staging_dir.exists():
+        shutil.rmtree(staging_dir)
+    staging_dir.mkdir(parents=True)
+    return staging_dir
+
+
+def write_if_changed(path: Path, content: str) -> bool:
+    """Atomically write a text file, unless it already has the given content.
+
+    Returns
+    -------
+    changed
+        Whether the file was written.
+    """
+    data = content.encode("utf-8")
+    if path.exists() and path.read_bytes() == data:
+        return False
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
+    return True
+
+
+def get_generated_files(out_dir: Path) -> list[Path]:
+    """Find the stubs and ``py.typed`` files in an output directory.
+
+    Returns
+    -------
+    paths
+        The files, relative to the output directory. Anything else in it – e.g.
+        a README, or a type checker's cache – is not included.
+    """
+    package_dir = out_dir / "mne"
+    if not package_dir.is_dir():
+        return []
+    return sorted(
+        path.relative_to(out_dir)
+        for path in package_dir.rglob("*")
+        if path.is_file() and (path.suffix == ".pyi" or path.name == "py.typed")
+    )
+
+
+def can_prune(out_dir: Path, *, marker: str) -> bool:
+    """Whether stale generated files may be deleted from an output directory.
+
+    That's the case if the directory doesn't exist or is empty, or if it contains
+    the ``marker`` file written by every run, i.e. the manifest. Otherwise, the
+    directory may contain files of others that merely look like stubs.
+    """
+    return (
+        not out_dir.exists()
+        or not any(out_dir.iterdir())
+        or (out_dir / marker).exists()
+    )
+
+
+def _remove_empty_dirs(root: Path) -> None:
+    for dirpath, _, _ in sorted(os.walk(root), reverse=True):
+        if Path(dirpath) != root and not any(Path(dirpath).iterdir()):
+            Path(dirpath).rmdir()
+
+
+def sync_output(
+    staging_dir: Path,
+    out_dir: Path,
+    *,
+    prune: bool,
+    removed: Collection[str] = (),
+    keep: Collection[str] = (),
+    last: str | None = None,
+) -> SyncStats:
+    """Move the changed files from the staging directory to the output directory.
+
+    The staging directory is deleted afterwards.
+
+    Parameters
+    ----------
+    staging_dir
+        The staging directory.
+    out_dir
+        The output directory.
+    prune
+        Whether to delete the stubs and ``py.typed`` files in the output
+        directory (see ``get_generated_files``) that are not in the staging
+        directory, i.e. whether the staging directory contains the complete
+        output. Check ``can_prune`` first.
+    removed
+        Further files to delete from the output directory, relative to it.
+    keep
+        Files to keep in the output directory even if they are not staged,
+        relative to it.
+    last
+        A file to move after all others, relative to the staging directory. For
+        the manifest, this ensures an interrupted run is detected as such by the
+        next incremental run.
+    """
+    stats = SyncStats()
+    staged = sorted(
+        path.relative_to(staging_dir)
+        for path in staging_dir.rglob("*")
+        if path.is_file()
+    )
+    staged.sort(key=lambda path: str(path) == last)
+
+    to_remove = {out_dir / path for path in removed}
+    if prune:
+        to_remove |= {out_dir / path for path in get_generated_files(out_dir)}
+    to_remove -= {out_dir / path for path in staged}
+    to_remove -= {out_dir / path for path in keep}
+    for path in sorted(to_remove):
+        if path.exists():
+            path.unlink()
+            stats.n_removed += 1
+    if out_dir.exists():
+        _remove_empty_dirs(out_dir)
+
+    for rel_path in staged:
+        staged_path = staging_dir / rel_path
+        out_path = out_dir / rel_path
+        if out_path.exists() and out_path.read_bytes() == staged_path.read_bytes():
+            stats.n_unchanged += 1
+            continue
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(staged_path, out_path)
+        stats.n_changed += 1
+
+    shutil.rmtree(staging_dir)
+    return stats
@@ -0,0 +1,166 @@
+"""Run independent pieces of work in a pool of worker processes.
+
+The workers are started via "spawn", so each of them only imports the modules
+needed for the work it is given. Anything a worker prints is captured and
+replayed by the parent process in the original order of the inputs, so the log
+of a parallel run reads exactly like the log of a serial run.
+
+Two dependent stages of work can be pipelined, so the workers start on the second
+stage of some items while others are still in the first stage.
+"""
+
+import contextlib
+import io
+import multiprocessing
+import os
+from collections.abc import Callable, Sequence
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from functools import partial
+from typing import Any
+
+
+def _call_captured(func: Callable[[Any], Any], item: Any) -> tuple[str, Any]:
+    with contextlib.redirect_stdout(io.StringIO()) as stdout:
+        result = func(item)
+    return stdout.getvalue(), result
+
+
+def resolve_jobs(jobs: int) -> int:
+    """Translate the value of the ``--jobs`` option into a number of workers."""
+    if jobs == 0:
+        return os.cpu_count() or 1
+    return jobs
+
+
+def run_parallel(
+    func: Callable[[Any], Any],
+    items: Sequence[Any],
+    *,
+    jobs: int,
+    cost: Callable[[Any], int] | None = None,
+) -> list[Any]:
+    """Call ``func`` on every item, using up to ``jobs`` worker processes.
+
+    Parameters
+    ----------
+    func
+        The function to call. Must be importable by the workers, i.e. be a
+        module-level function (or a ``functools.partial`` thereof).
+    items
+        The items to process.
+    jobs
+        The number of workers. If 1, everything runs in the current process; if
+        0, one worker per CPU is used.
+    cost
+        An estimate of how expensive it is to process an item. The most expensive
+        items are submitted first so they don't end up being processed last while
+        all other workers are already idle.
+
+    Returns
+    -------
+    results
+        The return values of ``func``, in the order of ``items``.
+    """
+    jobs = resolve_jobs(jobs)
+    if jobs == 1:
+        return [func(item) for item in items]
+
+    submission_order = list(range(len(items)))
+    if cost is not None:
+        submission_order.sort(key=lambda idx: cost(items[idx]), reverse=True)
+
+    mp_context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=jobs, mp_context=mp_context) as executor:
+        futures = {
+            idx: executor.submit(partial(_call_captured, func), items[idx])
+            for idx in submission_order
+        }
+        results = []
+        for idx in range(len(items)):
+            output, result = futures[idx].result()
+            print(output, end="")
+            results.append(result)
+    return results
+
+
+def run_pipelined(
+    first: Callable[[Any], list[Any]],
+    second: Callable[[Any], Any],
+    items: Sequence[Any],
+    *,
+    jobs: int,
+    cost: Callable[[Any], int] | None = None,
+    key: Callable[[Any], Any] | None = None,
+) -> list[Any]:
+    """Run two stages of work, starting the second one as early as possible.
+
+    ``first`` is called on every item, and returns a list of intermediate
+    results. ``second`` is called on each of these as soon as the ``first`` call
+    that produced it is done, so the second stage of some items overlaps with the
+    first stage of others, instead of waiting for the first stage of all items.
+
+    Parameters
+    ----------
+    first, second
+        The functions to call. Must be importable by the workers, like for
+        ``run_parallel``.
+    items
+        The items to process.
+    jobs
+        The number of workers; if 0, one worker per CPU is used. Must not be 1,
+        as nothing can overlap in a single process; use ``run_parallel`` for both
+        stages instead.
+    cost
+        An estimate of how expensive it is to process an item in the first stage;
+        the most expensive items are submitted first.
+    key
+        The order of the intermediate results, for the returned results and the
+        replayed output of the second stage. By default, the order in which
+        ``first`` returned them.
+
+    Returns
+    -------
+    results
+        The return values of ``second``.
+    """
+    jobs = resolve_jobs(jobs)
+    submission_order = list(range(len(items)))
+    if cost is not None:
+        submission_order.sort(key=lambda idx: cost(items[idx]), reverse=True)
+
+    mp_context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=jobs, mp_context=mp_context) as executor:
+        first_futures = {
+            executor.submit(partial(_call_captured, first), items[idx]): idx
+            for idx in submission_order
+        }
+        first_outputs = {}
+        intermediates = {}
+        second_futures = {}
+        pending = set(first_futures)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                idx = first_futures[future]
+                first_outputs[idx], intermediates[idx] = future.result()
+                for intermediate in intermediates[idx]:
+                    second_futures[id(intermediate)] = executor.submit(
+                        partial(_call_captured, second), intermediate
+                    )
+
+        # Replay the output as if everything had run serially
+        for idx in range(len(items)):
+            print(first_outputs[idx], end="")
+        ordered = [
+            intermediate
+            for idx in range(len(items))
+            for intermediate in intermediates[idx]
+        ]
+        if key is not None:
+            ordered.sort(key=key)
+        results = []
+        for intermediate in ordered:
+            output, result = second_futures[id(intermediate)].result()
+            print(output, end="")
+            results.append(result)
+    return results
@@ -0,0 +1,324 @@
+"""Drop re-exports of imported names that no one needs.
+
+stubgen turns every import of an MNE module into an explicit re-export, e.g.
+``from ..._fiff.constants import FIFF as FIFF``. A type checker loading a stub
+then has to follow all of these imports, pulling in a large part of MNE's
+internals even if only a single function is used.
+
+An imported name is kept if
+
+- it is used in the stub, e.g. in an annotation or as a base class;
+- it is part of the public API, i.e. it's listed in ``__all__`` or imported in a
+  package's ``__init__.pyi``;
+- another stub imports it from this module, and keeps it.
+
+All other imports are dropped. As this depends on which names the other stubs
+import, it runs on the final stubs of each flavor, once all modules have been
+processed.
+
+In incremental mode, only the regenerated stubs are pruned; the other stubs are
+already pruned. If a regenerated stub now imports a name that was dropped from
+an unchanged stub, the import is restored in the latter. The dropped imports are
+recorded in the manifest for this purpose.
+"""
+
+import ast
+import dataclasses
+from collections import deque
+from collections.abc import Collection
+from pathlib import Path
+
+from .dedupe import get_import_target
+from .defaults import stub_path_to_module_name
+
+# A removed import: the module it imports from (as written in the stub, i.e.
+# with leading dots for relative imports), the imported name, and its alias
+PrunedImport = tuple[str, str, str | None]
+
+
+@dataclasses.dataclass
+class _Import:
+    node: ast.ImportFrom
+    alias: ast.alias
+    target: str
+
+    @property
+    def bound_name(self) -> str:
+        return self.alias.asname or self.alias.name
+
+    def to_pruned(self) -> PrunedImport:
+        module = "." * self.node.level + (self.node.module or "")
+        return module, self.alias.name, self.alias.asname
+
+    @classmethod
+    def from_pruned(cls, stub_rel_path: Path, pruned: PrunedImport) -> "_Import":
+        module, name, asname = pruned
+        node = ast.ImportFrom(
+            module=module.lstrip(".") or None,
+            names=[ast.alias(name=name, asname=asname)],
+            level=len(module) - len(module.lstrip(".")),
+        )
+        return cls(node, node.names[0], get_import_target(stub_rel_path, node))
+
+
+@dataclasses.dataclass
+class _Stub:
+    rel_path: Path
+    text: str
+    tree: ast.Module
+    # Whether the stub is pruned in this run
+    prune: bool
+    imports: list[_Import] = dataclasses.field(default_factory=list)
+    restored: list[_Import] = dataclasses.field(default_factory=list)
+
+    def get_imports(self, name: str) -> list[_Import]:
+        return [imp for imp in self.imports if imp.bound_name == name]
+
+
+def _get_used_names(tree: ast.Module) -> set[str]:
+    """Get all names a stub refers to outside of its imports."""
+    names = set()
+    for stmt in tree.body:
+        if isinstance(stmt, (ast.Import, ast.ImportFrom)):
+            continue
+        annotations = []
+        for node in ast.walk(stmt):
+            if isinstance(node, ast.Name):
+                names.add(node.id)
+            elif isinstance(node, ast.arg) and node.annotation is not None:
+                annotations.append(node.annotation)
+            elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                annotations.append(node.returns)
+            elif isinstance(node, ast.AnnAssign):
+                annotations.append(node.annotation)
+        # Forward references
+        for annotation in filter(None, annotations):
+            for node in ast.walk(annotation):
+                if isinstance(node, ast.Constant) and isinstance(node.value, str):
+                    try:
+                        parsed = ast.parse(node.value, mode="eval")
+                    except SyntaxError:
+                        continue
+                    names |= {n.id for n in ast.walk(parsed) if isinstance(n, ast.Name)}
+    return names
+
+
+def _get_all(tree: ast.Module) -> set[str]:
+    """Get the names listed in a stub's ``__all__``."""
+    names = set()
+    for stmt in tree.body:
+        if isinstance(stmt, (ast.Assign, ast.AugAssign, ast.AnnAssign)):
+            targets = stmt.targets if isinstance(stmt, ast.Assign) else [stmt.target]
+            if stmt.value is not None and any(
+                isinstance(t, ast.Name) and t.id == "__all__" for t in targets
+            ):
+                try:
+                    names |= set(ast.literal_eval(stmt.value))
+                except ValueError:
+                    pass
+    return names
+
+
+def _get_fan_out(stubs: dict[str, _Stub], imports: set[int]) -> dict[str, int]:
+    """Count the stubs each stub transitively imports via the given imports."""
+    graph = {}
+    for module_name, stub in stubs.items():
+        edges = set()
+        for stmt in stub.tree.body:
+            if isinstance(stmt, ast.Import):
+                edges |= {alias.name for alias in stmt.names}
+        for imp in stub.imports:
+            if id(imp) in imports:
+                edges |= {imp.target, f"{imp.target}.{imp.alias.name}"}
+        graph[module_name] = edges & stubs.keys()
+
+    fan_out = {}
+    for module_name in stubs:
+        seen = {module_name}
+        queue = deque([module_name])
+        while queue:
+            for other in graph[queue.popleft()] - seen:
+                seen.add(other)
+                queue.append(other)
+        fan_out[module_name] = len(seen) - 1
+    return fan_out
+
+
+def _rewrite_imports(stub: _Stub, kept: set[int]) -> str:
+    """Remove the imports that were not kept from the source code of a stub."""
+    lines = stub.text.splitlines(keepends=True)
+    by_node: dict[int, list[_Import]] = {}
+    for imp in stub.imports:
+        by_node.setdefault(id(imp.node), []).append(imp)
+    replacements = []
+    for imports in by_node.values():
+        node = imports[0].node
+        if all(id(imp) in kept for imp in imports):
+            continue
+        node.names = [imp.alias for imp in imports if id(imp) in kept]
+        replacement = [ast.unparse(node) + "\n"] if node.names else []
+        replacements.append((node.lineno - 1, node.end_lineno, replacement))
+
+    # Restored imports go after the last one
+    if stub.restored:
+        last_import = max(
+            (
+                stmt.end_lineno
+                for stmt in stub.tree.body
+                if isinstance(stmt, (ast.Import, ast.ImportFrom))
+            ),
+            default=0,
+        )
+        restored_lines = [ast.unparse(imp.node) + "\n" for imp in stub.restored]
+        replacements.append((last_import, last_import, restored_lines))
+
+    for start, end, replacement in sorted(
+        replacements, key=lambda r: r[:2], reverse=True
+    ):
+        lines[start:end] = replacement
+    return "".join(lines)
+
+
+@dataclasses.dataclass
+class PruneResult:
+    """The outcome of pruning the re-exports of some stubs.
+
+    Attributes
+    ----------
+    n_removed
+        The number of imports that were removed.
+    n_restored
+        The number of previously removed imports that were restored.
+    fan_out_before, fan_out_after
+        For each stub, the number of other stubs it transitively imports, before
+        and after pruning.
+    pruned
+        For each stub that was modified, all imports removed from it, relative to
+        the stubs directory.
+    """
+
+    n_removed: int = 0
+    n_restored: int = 0
+    fan_out_before: dict[str, int] = dataclasses.field(default_factory=dict)
+    fan_out_after: dict[str, int] = dataclasses.field(default_factory=dict)
+    pruned: dict[str, list[PrunedImport]] = dataclasses.field(default_factory=dict)
+
+
+def prune_reexports(
+    stubs: dict[Path, str],
+    *,
+    fallback_dir: Path | None = None,
+    removed: Collection[str] = (),
+    pruned: dict[str, list[PrunedImport]] | None = None,
+) -> PruneResult:
+    """Remove the imports that are neither used nor part of the public API.
+
+    Parameters
+    ----------
+    stubs
+        The contents of the stubs to prune, keyed by their path relative to the
+        stubs directory. They are modified in place.
+    fallback_dir
+        Where to find all other stubs, i.e. the existing output in incremental
+        mode. Those that need an import restored are added to ``stubs``.
+    removed
+        The stubs in ``fallback_dir`` that are about to be deleted.
+    pruned
+        The imports previously removed from the stubs in ``fallback_dir``.
+    """
+    # Tuples are stored as lists in the manifest
+    pruned = {
+        stub: [tuple(pruned_import) for pruned_import in pruned_imports]
+        for stub, pruned_imports in (pruned or {}).items()
+    }
+    all_texts = dict(stubs)
+    if fallback_dir is not None:
+        for path in fallback_dir.rglob("*.pyi"):
+            rel_path = path.relative_to(fallback_dir)
+            if rel_path not in all_texts and str(rel_path) not in removed:
+                all_texts[rel_path] = path.read_text(encoding="utf-8")
+
+    by_module: dict[str, _Stub] = {}
+    for rel_path, text in sorted(all_texts.items()):
+        stub = _Stub(
+            rel_path=rel_path,
+            text=text,
+            tree=ast.parse(text),
+            prune=rel_path in stubs,
+        )
+        for node in stub.tree.body:
+            if isinstance(node, ast.ImportFrom):
+                target = get_import_target(rel_path, node)
+                stub.imports += [_Import(node, alias, target) for alias in node.names]
+        by_module[stub_path_to_module_name(rel_path, Path())] = stub
+
+    kept: set[int] = set()
+    queue: deque[_Import] = deque()
+
+    def keep(imp: _Import) -> None:
+        if id(imp) not in kept:
+            kept.add(id(imp))
+            queue.append(imp)
+
+    for stub in by_module.values():
+        public = _get_used_names(stub.tree) | _get_all(stub.tree)
+        for imp in stub.imports:
+            if (
+                not stub.prune
+                or stub.rel_path.name == "__init__.pyi"
+                or imp.bound_name in public
+                or imp.alias.name == "*"
+            ):
+                keep(imp)
+
+    result = PruneResult()
+    while queue:
+        imp = queue.popleft()
+        stub = by_module.get(imp.target)
+        if stub is None:
+            continue
+        if imp.alias.name == "*":
+            for other in stub.imports:
+                keep(other)
+            continue
+        for other in stub.get_imports(imp.alias.name):
+            keep(other)
+        # Restore the import if it was removed from an unchanged stub
+        if stub.prune or stub.get_imports(imp.alias.name):
+            continue
+        for pruned_import in pruned.get(str(stub.rel_path), []):
+            restored = _Import.from_pruned(stub.rel_path, pruned_import)
+            if restored.bound_name != imp.alias.name:
+                continue
+            print(
+                f"♻️  Restoring the import of {restored.alias.name} in "
+                f"{stub.rel_path}, another stub imports it from there"
+            )
+            stub.imports.append(restored)
+            stub.restored.append(restored)
+            result.n_restored += 1
+            keep(restored)
+
+    restored = {id(imp) for stub in by_module.values() for imp in stub.restored}
+    result.fan_out_before = _get_fan_out(
+        by_module,
+        {id(imp) for stub in by_module.values() for imp in stub.imports} - restored,
+    )
+    result.fan_out_after = _get_fan_out(by_module, kept)
+
+    for stub in by_module.values():
+        dropped = [imp for imp in stub.imports if id(imp) not in kept]
+        if not dropped and not stub.restored:
+            continue
+        result.n_removed += len(dropped)
+        if stub.prune:
+            result.pruned[str(stub.rel_path)] = [imp.to_pruned() for imp in dropped]
+        else:
+            result.pruned[str(stub.rel_path)] = [
+                pruned_import
+                for pruned_import in pruned.get(str(stub.rel_path), [])
+                if pruned_import not in [imp.to_pruned() for imp in stub.restored]
+            ]
+        stubs[stub.rel_path] = _rewrite_imports(stub, kept)
+
+    return result
@@ -0,0 +1,66 @@
+"""Find the modules that make up MNE's public API.
+
+MNE's packages declare their public API in their ``__init__`` files: most of them
+ship an ``__init__.pyi`` for lazy loading, which lists what ``lazy_loader``
+imports on attribute access; the others import their public names in their
+``__init__.py``. Starting from ``mne/__init__.pyi``, the imports in these files
+are followed to all packages and modules users can reach without importing a
+private module themselves.
+
+All other modules are private helpers. As the stubs are marked as partial (see
+``py.typed``), type checkers fall back to MNE's own sources for them, e.g. when
+resolving a base class or an annotation that refers to one of them.
+"""
+
+import ast
+from collections import deque
+from pathlib import Path
+
+from .dedupe import get_import_target
+from .import_graph import get_module_level_imports
+from .manifest import source_to_stub_path
+
+
+def find_public_modules(source_paths: list[Path], *, source_root: Path) -> set[Path]:
+    """Select the modules reachable from the public API.
+
+    Parameters
+    ----------
+    source_paths
+        The ``.py`` and ``__init__.pyi`` files of all modules.
+    source_root
+        The directory containing the ``mne`` package.
+
+    Returns
+    -------
+    public_paths
+        The subset of ``source_paths`` reachable from ``mne/__init__.pyi``.
+    """
+    by_module = {}
+    for path in source_paths:
+        stub_rel_path = Path(source_to_stub_path(str(path.relative_to(source_root))))
+        module_name = ".".join(stub_rel_path.with_suffix("").parts)
+        by_module[module_name.removesuffix(".__init__")] = (path, stub_rel_path)
+
+    reachable = {"mne"}
+    queue = deque(["mne"])
+    while queue:
+        path, stub_rel_path = by_module[queue.popleft()]
+        # Only packages re-export names; plain modules are leaves
+        if stub_rel_path.name != "__init__.pyi":
+            continue
+        tree = ast.parse(path.read_text(encoding="utf-8"))
+        for node in get_module_level_imports(tree):
+            target = get_import_target(stub_rel_path, node)
+            # Either a module, or a submodule imported from a package
+            candidates = [target, *(f"{target}.{alias.name}" for alias in node.names)]
+            for module_name in candidates:
+                # Importing a submodule also imports the packages above it
+                parts = module_name.split(".")
+                for idx in range(1, len(parts) + 1):
+                    name = ".".join(parts[:idx])
+                    if name in by_module and name not in reachable:
+                        reachable.add(name)
+                        queue.append(name)
+
+    return {by_module[name][0] for name in reachable}
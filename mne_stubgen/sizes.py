@@ -0,0 +1,261 @@
+"""Measure the size and import fan-out of the generated stubs.
+
+Every editor and type checker using the stubs has to read and parse them, and to
+follow their imports, so the size of a stub and the number of other stubs it
+pulls in are latency costs for our users. For each stub of each flavor, the size
+report records
+
+- its size in bytes, and how much of that are docstrings;
+- the number of classes, functions, and methods it defines;
+- the number of names it imports, i.e. re-exports;
+- the number of other stubs it transitively imports (see ``prune``).
+
+Additionally, the largest docstrings of each flavor are listed. Reports of two
+runs – e.g. of the current and the previous release – can be compared via
+``check_sizes.py``, which also enforces a size budget per stub.
+"""
+
+import ast
+import dataclasses
+import heapq
+import json
+from pathlib import Path
+
+from .defaults import stub_path_to_module_name
+
+# Bump this whenever the structure of the report changes
+REPORT_VERSION = 1
+
+# The number of largest docstrings to list per flavor
+N_LARGEST_DOCSTRINGS = 20
+
+
+@dataclasses.dataclass
+class StubSize:
+    """The size of a stub.
+
+    Attributes
+    ----------
+    bytes
+        The size of the stub file.
+    docstring_bytes
+        The size of all docstrings in the stub.
+    symbols
+        The number of classes, functions, and methods; overloads are counted
+        separately.
+    imports
+        The number of imported names.
+    fan_out
+        The number of other stubs the stub transitively imports, if known.
+    """
+
+    bytes: int
+    docstring_bytes: int
+    symbols: int
+    imports: int
+    fan_out: int | None = None
+
+
+def measure_stub(text: str, module_name: str) -> tuple[StubSize, list[tuple[int, str]]]:
+    """Measure a stub.
+
+    Parameters
+    ----------
+    text
+        The contents of the stub.
+    module_name
+        The name of the module.
+
+    Returns
+    -------
+    size
+        The size of the stub; ``fan_out`` is not set.
+    docstrings
+        The size in bytes and the qualified name of each docstring.
+    """
+    tree = ast.parse(text)
+    docstrings = []
+    n_symbols = 0
+    n_imports = 0
+    nodes = [(tree, module_name)]
+    while nodes:
+        node, qualname = nodes.pop()
+        docstring = ast.get_docstring(node, clean=False)
+        if docstring is not None:
+            docstrings.append((len(docstring.encode("utf-8")), qualname))
+        for child in node.body:
+            if isinstance(child, (ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)):
+                n_symbols += 1
+                nodes.append((child, f"{qualname}.{child.name}"))
+            elif isinstance(child, (ast.Import, ast.ImportFrom)):
+                n_imports += len(child.names)
+    size = StubSize(
+        bytes=len(text.encode("utf-8")),
+        docstring_bytes=sum(n_bytes for n_bytes, _ in docstrings),
+        symbols=n_symbols,
+        imports=n_imports,
+    )
+    return size, docstrings
+
+
+def build_size_report(
+    stubs_dirs: dict[str, Path],
+    *,
+    fan_out: dict[str, dict[str, int]],
+    metadata: dict,
+) -> dict:
+    """Create a report of the sizes of all stubs.
+
+    Parameters
+    ----------
+    stubs_dirs
+        The directory containing the stubs of each flavor, keyed by flavor name.
+    fan_out
+        The number of other stubs each stub transitively imports, by module name,
+        for each flavor.
+    metadata
+        Information about the run, e.g. the MNE version.
+    """
+    flavors = {}
+    for flavor_name, stubs_dir in stubs_dirs.items():
+        modules = {}
+        largest: list[tuple[int, str]] = []
+        for path in sorted(stubs_dir.rglob("*.pyi")):
+            rel_path = path.relative_to(stubs_dir)
+            module_name = stub_path_to_module_name(rel_path, Path())
+            size, docstrings = measure_stub(
+                path.read_text(encoding="utf-8"), module_name
+            )
+            size.fan_out = fan_out.get(flavor_name, {}).get(module_name)
+            modules[str(rel_path)] = dataclasses.asdict(size)
+            largest = heapq.nlargest(N_LARGEST_DOCSTRINGS, [*largest, *docstrings])
+        flavors[flavor_name] = {
+            "bytes": sum(module["bytes"] for module in modules.values()),
+            "docstring_bytes": sum(
+                module["docstring_bytes"] for module in modules.values()
+            ),
+            "modules": modules,
+            "largest_docstrings": [
+                {"qualname": qualname, "bytes": n_bytes}
+                for n_bytes, qualname in largest
+            ],
+        }
+    return {"report_version": REPORT_VERSION, **metadata, "flavors": flavors}
+
+
+def write_size_report(path: Path, report: dict) -> None:
+    """Write a report created by ``build_size_report`` to a JSON file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+
+
+def read_size_report(path: Path) -> dict:
+    """Read a JSON report written by ``write_size_report``."""
+    report = json.loads(path.read_text(encoding="utf-8"))
+    if report.get("report_version") != REPORT_VERSION:
+        raise ValueError(f"Unsupported size report version in {path}")
+    return report
+
+
+@dataclasses.dataclass
+class SizeChange:
+    """A stub whose size or fan-out changed between two runs.
+
+    Attributes
+    ----------
+    name
+        The flavor and path of the stub.
+    metric
+        What changed: ``"bytes"``, ``"docstring_bytes"``, ``"symbols"``,
+        ``"imports"``, or ``"fan_out"``.
+    baseline
+        The value in the baseline run, or None for new stubs.
+    current
+        The value in the current run, or None for removed stubs.
+    """
+
+    name: str
+    metric: str
+    baseline: int | None
+    current: int | None
+
+
+def compare_size_reports(baseline: dict, current: dict) -> list[SizeChange]:
+    """Find the stubs whose size or fan-out changed.
+
+    Returns
+    -------
+    changes
+        The changes, the largest growth in bytes first.
+    """
+    changes = []
+    for flavor_name, flavor in current["flavors"].items():
+        baseline_modules = baseline["flavors"].get(flavor_name, {}).get("modules")
+        if baseline_modules is None:
+            continue
+        for rel_path in sorted(baseline_modules.keys() | flavor["modules"].keys()):
+            before = baseline_modules.get(rel_path)
+            after = flavor["modules"].get(rel_path)
+            name = f"{flavor_name}: {rel_path}"
+            if before is None or after is None:
+                changes.append(
+                    SizeChange(
+                        name,
+                        "bytes",
+                        None if before is None else before["bytes"],
+                        None if after is None else after["bytes"],
+                    )
+                )
+                continue
+            for metric, value in after.items():
+                if before.get(metric) != value:
+                    changes.append(SizeChange(name, metric, before.get(metric), value))
+
+    def growth(change: SizeChange) -> int:
+        if change.metric != "bytes":
+            return 0
+        return (change.current or 0) - (change.baseline or 0)
+
+    return sorted(changes, key=growth, reverse=True)
+
+
+def find_size_regressions(
+    changes: list[SizeChange], *, threshold: float, min_bytes: int
+) -> list[SizeChange]:
+    """Find the stubs that grew too much.
+
+    A stub regressed if it grew by more than ``threshold`` (e.g. 0.1 for 10 %) and
+    by more than ``min_bytes``, or if its fan-out grew at all. New stubs are not
+    regressions.
+    """
+    regressions = []
+    for change in changes:
+        if change.baseline is None or change.current is None:
+            continue
+        if change.metric == "fan_out" and change.current > change.baseline:
+            regressions.append(change)
+        elif (
+            change.metric == "bytes"
+            and change.current - change.baseline > min_bytes
+            and change.current > change.baseline * (1 + threshold)
+        ):
+            regressions.append(change)
+    return regressions
+
+
+def find_over_budget(report: dict, *, budget: int) -> list[tuple[str, int]]:
+    """Find the stubs larger than ``budget`` bytes.
+
+    Returns
+    -------
+    over_budget
+        The flavor and path, and the size of each stub over budget, the largest
+        first.
+    """
+    over_budget = [
+        (f"{flavor_name}: {rel_path}", module["bytes"])
+        for flavor_name, flavor in report["flavors"].items()
+        for rel_path, module in flavor["modules"].items()
+        if module["bytes"] > budget
+    ]
+    return sorted(over_budget, key=lambda item: item[1], reverse=True)
@@ -0,0 +1,232 @@
+"""Expand docstrings statically, without importing the MNE modules.
+
+Most of MNE's docstrings are only templates, which are filled with the entries
+of ``mne.utils.docs.docdict`` by the ``@fill_doc`` and ``@verbose`` decorators
+when the module is imported. Instead of importing every module – which pulls in
+matplotlib, scipy, scikit-learn, 3D backends etc. – we read the docstrings from
+the module's source code and fill them with the docdict ourselves, just like
+``fill_doc`` would.
+
+Docstrings that are modified in other ways at runtime (e.g., by ``@copy_doc`` or
+by assigning to ``__doc__``) cannot be expanded statically. For those, we fall
+back to importing the module.
+"""
+
+import ast
+import dataclasses
+import functools
+import importlib
+from pathlib import Path
+
+# Decorators that fill the docstring with docdict entries
+FILL_DOC_DECORATORS = frozenset(("fill_doc", "verbose"))
+
+# Decorators that leave the docstring untouched
+DOC_PRESERVING_DECORATORS = frozenset(
+    (
+        "abstractclassmethod",
+        "abstractmethod",
+        "classmethod",
+        "contextlib.contextmanager",
+        "contextmanager",
+        "dataclass",
+        "dataclasses.dataclass",
+        "functools.lru_cache",
+        "lru_cache",
+        "overload",
+        "property",
+        "staticmethod",
+    )
+)
+
+# Decorators that turn a method into part of an existing property; at runtime,
+# the property keeps the docstring of its getter
+PROPERTY_ACCESSOR_SUFFIXES = (".setter", ".getter", ".deleter")
+
+
+@dataclasses.dataclass
+class StaticDocstring:
+    """The docstring of a class, function, or method, as found in the source.
+
+    Attributes
+    ----------
+    docstring
+        The docstring, with the docdict entries filled in if the object is
+        decorated with ``@fill_doc`` or ``@verbose``.
+    dynamic
+        Whether the docstring may be modified at runtime in ways we cannot
+        reproduce statically; if so, ``docstring`` must not be used.
+    is_dataclass
+        Whether the object is a dataclass.
+    node
+        The definition of the object in the source. Also used to read the
+        default values of function parameters (see ``defaults``).
+    """
+
+    docstring: str | None
+    dynamic: bool = False
+    is_dataclass: bool = False
+    node: ast.ClassDef | ast.FunctionDef | None = None
+
+
+@functools.cache
+def _get_indented_docdict(indent: int) -> dict[str, str]:
+    # This mirrors mne.utils.docs.fill_doc
+    docdict = importlib.import_module("mne.utils.docs").docdict
+    indented = {}
+    for name, dstr in docdict.items():
+        lines = dstr.splitlines()
+        if lines:
+            indented[name] = "\n".join(
+                [lines[0], *(" " * indent + line for line in lines[1:])]
+            )
+        else:
+            indented[name] = dstr
+    return indented
+
+
+def _indentcount_lines(lines: list[str]) -> int:
+    return min(
+        (len(line) - len(line.lstrip()) for line in lines if line.strip()),
+        default=0,
+    )
+
+
+def fill_docstring(docstring: str) -> str:
+    """Fill a docstring with docdict entries, like ``@fill_doc`` does.
+
+    Raises
+    ------
+    KeyError, TypeError, ValueError
+        If the docstring cannot be filled.
+    """
+    lines = docstring.splitlines()
+    indent = 0 if len(lines) < 2 else _indentcount_lines(lines[1:])
+    return docstring % _get_indented_docdict(indent)
+
+
+def _get_decorator_names(node: ast.ClassDef | ast.FunctionDef) -> list[str]:
+    return [
+        ast.unparse(decorator.func if isinstance(decorator, ast.Call) else decorator)
+        for decorator in node.decorator_list
+    ]
+
+
+def _get_static_docstring(
+    node: ast.ClassDef | ast.FunctionDef, *, dynamic: bool
+) -> StaticDocstring:
+    decorators = _get_decorator_names(node)
+    docstring = ast.get_docstring(node, clean=False)
+    dynamic = dynamic or any(
+        decorator not in FILL_DOC_DECORATORS | DOC_PRESERVING_DECORATORS
+        for decorator in decorators
+    )
+    is_dataclass = any(decorator.endswith("dataclass") for decorator in decorators)
+
+    if (
+        not dynamic
+        and docstring
+        and any(decorator in FILL_DOC_DECORATORS for decorator in decorators)
+    ):
+        try:
+            docstring = fill_docstring(docstring)
+        except (KeyError, TypeError, ValueError):
+            dynamic = True
+
+    return StaticDocstring(
+        docstring=docstring, dynamic=dynamic, is_dataclass=is_dataclass, node=node
+    )
+
+
+def _is_property_accessor(node: ast.FunctionDef) -> bool:
+    return any(
+        decorator.endswith(PROPERTY_ACCESSOR_SUFFIXES)
+        for decorator in _get_decorator_names(node)
+    )
+
+
+def _get_assigned_names(body: list[ast.stmt]) -> tuple[set[str], set[str]]:
+    """Find names that are re-bound, and names whose __doc__ is assigned to."""
+    rebound = set()
+    doc_assigned = set()
+    for stmt in body:
+        if isinstance(stmt, ast.Assign):
+            targets = stmt.targets
+        elif isinstance(stmt, (ast.AnnAssign, ast.AugAssign)):
+            targets = [stmt.target]
+        else:
+            continue
+        for target in targets:
+            for node in ast.walk(target):
+                if isinstance(node, ast.Name):
+                    rebound.add(node.id)
+                elif (
+                    isinstance(node, ast.Attribute)
+                    and node.attr == "__doc__"
+                    and isinstance(node.value, ast.Name)
+                ):
+                    doc_assigned.add(node.value.id)
+    return rebound, doc_assigned
+
+
+def _get_namespace_docstrings(
+    body: list[ast.stmt], *, prefix: str, dynamic: bool
+) -> dict[str, StaticDocstring]:
+    rebound, doc_assigned = _get_assigned_names(body)
+    docstrings: dict[str, StaticDocstring] = {}
+    for node in body:
+        if not isinstance(node, (ast.ClassDef, ast.FunctionDef)):
+            continue
+        qualname = f"{prefix}{node.name}"
+        node_dynamic = dynamic or node.name in rebound or node.name in doc_assigned
+        if isinstance(node, ast.FunctionDef) and _is_property_accessor(node):
+            if qualname not in docstrings:
+                docstrings[qualname] = StaticDocstring(docstring=None, dynamic=True)
+            elif node_dynamic:
+                docstrings[qualname].dynamic = True
+            continue
+
+        # Like at runtime, later definitions take precedence over earlier ones
+        static_docstring = _get_static_docstring(node, dynamic=node_dynamic)
+        docstrings[qualname] = static_docstring
+        if isinstance(node, ast.ClassDef):
+            # Methods of classes with decorators that may alter them are dynamic,
+            # e.g. @copy_base_doc_to_subclass_doc
+            docstrings.update(
+                _get_namespace_docstrings(
+                    node.body,
+                    prefix=f"{qualname}.",
+                    dynamic=static_docstring.dynamic,
+                )
+            )
+    return docstrings
+
+
+# Both the docstring expansion and the default values need this for the same
+# module, one after the other
+@functools.lru_cache(maxsize=1)
+def get_static_docstrings(source_path: Path) -> dict[str, StaticDocstring]:
+    """Get the expanded docstrings of all classes, functions, and methods.
+
+    Parameters
+    ----------
+    source_path
+        The source file of the module.
+
+    Returns
+    -------
+    docstrings
+        The docstrings, keyed by the qualified names of the objects relative to
+        the module (e.g., ``"Epochs.plot"``).
+    """
+    module_ast = ast.parse(source_path.read_text(encoding="utf-8"))
+    return _get_namespace_docstrings(module_ast.body, prefix="", dynamic=False)
+
+
+def clear_caches() -> None:
+    """Forget the sources and docdict entries read so far.
+
+    Needed if MNE's sources change while the generator is running (see ``watch``).
+    """
+    _get_indented_docdict.cache_clear()
+    get_static_docstrings.cache_clear()
@@ -0,0 +1,201 @@
+"""Run mypy's stubgen on shards of the MNE source tree in parallel.
+
+stubgen processes all modules it is given in a single process. Since the stub
+generated for a module does not depend on which other modules are processed
+alongside it, we can split the list of modules into shards and run stubgen on
+the shards concurrently.
+
+Most of stubgen's time isn't spent on MNE's modules, though, but on analyzing the
+stubs of the third-party packages they import (NumPy, Matplotlib, VTK, …), and
+each shard has to analyze them anew. The shard containing ``mne.viz.backends``
+alone takes about 70% of the time of a serial run, so no split can be more than
+about 1.4x faster, and each additional shard mostly adds CPU time. Hence, the
+sources are split into at most ``MAX_SHARDS`` shards of similar size.
+
+stubgen is driven through its Python API rather than its command line, so the
+generated stubs are kept in memory instead of being written to disk, only to be
+read back right away. When run in parallel, the stubs of a shard can be processed
+further while stubgen is still running on the other shard (see
+``generate_and_process_stubs``).
+"""
+
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+from mypy import stubgen
+
+from .parallel import resolve_jobs, run_parallel, run_pipelined
+
+# More shards mostly add CPU time, see above
+MAX_SHARDS = 2
+
+
+def get_shard_name(source_path: Path, site_packages_dir: Path) -> str:
+    """Return the name of the shard a source file belongs to.
+
+    E.g., ``mne/io/fiff/raw.py`` and ``mne/io/__init__.pyi`` belong to the
+    ``mne.io`` shard, while ``mne/epochs.py`` belongs to the ``mne`` shard.
+    """
+    package_parts = source_path.relative_to(site_packages_dir).parent.parts
+    return ".".join(package_parts[:2])
+
+
+def shard_sources(
+    source_paths: list[Path], site_packages_dir: Path
+) -> dict[str, list[Path]]:
+    """Split the source paths into shards by subpackage."""
+    shards: dict[str, list[Path]] = {}
+    for source_path in source_paths:
+        shard_name = get_shard_name(source_path, site_packages_dir)
+        shards.setdefault(shard_name, []).append(source_path)
+    return dict(sorted(shards.items()))
+
+
+def balance_shards(
+    source_paths: list[Path], site_packages_dir: Path, n_shards: int
+) -> dict[str, list[Path]]:
+    """Split the source paths into shards of similar size.
+
+    Each shard is a run of consecutive modules, so modules of the same subpackage
+    mostly end up in the same shard and share the dependencies stubgen analyzes
+    for them. Shards are named after their first and last module, e.g.
+    ``mne.io.array.__init__…mne.viz.utils``.
+    """
+    source_paths = sorted(
+        source_paths, key=lambda path: path.relative_to(site_packages_dir)
+    )
+    sizes = [path.stat().st_size for path in source_paths]
+    total_size = sum(sizes)
+    shard_paths: list[list[Path]] = [[]] if source_paths else []
+    cumulative_size = 0
+    for path, size in zip(source_paths, sizes):
+        if shard_paths[-1] and cumulative_size >= (
+            total_size * len(shard_paths) / n_shards
+        ):
+            shard_paths.append([])
+        shard_paths[-1].append(path)
+        cumulative_size += size
+
+    def get_module_name(path: Path) -> str:
+        return ".".join(path.relative_to(site_packages_dir).with_suffix("").parts)
+
+    return {
+        f"{get_module_name(paths[0])}…{get_module_name(paths[-1])}": paths
+        for paths in shard_paths
+    }
+
+
+def _run_stubgen(source_paths: list[Path]) -> dict[Path, str]:
+    options = stubgen.parse_options(
+        ["--include-docstring", *[str(p) for p in source_paths]]
+    )
+    mypy_options = stubgen.mypy_options(options)
+    py_modules, _, _ = stubgen.collect_build_targets(options, mypy_options)
+    stubgen.generate_asts_for_modules(
+        py_modules, options.parse_only, mypy_options, options.verbose
+    )
+
+    stubs = {}
+    for module in py_modules:
+        # Unlike the stubgen command line, which turns mne/__init__.pyi into
+        # mne.pyi, put the stubs of all packages into their __init__.pyi
+        stub_rel_path = Path(*module.module.split("."))
+        if Path(module.path).stem == "__init__":
+            stub_rel_path /= "__init__.pyi"
+        else:
+            stub_rel_path = stub_rel_path.with_suffix(".pyi")
+        generator = stubgen.ASTStubGenerator(
+            module.runtime_all,
+            include_private=options.include_private,
+            analyzed=not options.parse_only,
+            export_less=options.export_less,
+            include_docstrings=options.include_docstrings,
+        )
+        with stubgen.generate_guarded(
+            module.module, str(stub_rel_path), options.ignore_errors, options.verbose
+        ):
+            module.ast.accept(generator)
+            stubs[stub_rel_path] = generator.output()
+    print(f"Processed {len(py_modules)} modules")
+    return stubs
+
+
+def generate_stubs(
+    source_paths: list[Path],
+    *,
+    site_packages_dir: Path,
+    jobs: int,
+) -> dict[Path, str]:
+    """Generate stubs for the given source files, possibly in parallel.
+
+    Returns
+    -------
+    stubs
+        The contents of the stubs, keyed by their path relative to the stubs
+        directory, e.g. ``mne/io/base.pyi`` or ``mne/io/__init__.pyi``.
+    """
+    jobs = resolve_jobs(jobs)
+    if jobs == 1:
+        return _run_stubgen(source_paths)
+
+    shards = balance_shards(source_paths, site_packages_dir, min(jobs, MAX_SHARDS))
+    print(f"🔪 Running stubgen on {len(shards)} shards: {', '.join(shards)}")
+    stubs = {}
+    for shard_stubs in run_parallel(
+        _run_stubgen,
+        list(shards.values()),
+        jobs=jobs,
+        cost=lambda paths: sum(p.stat().st_size for p in paths),
+    ):
+        stubs.update(shard_stubs)
+    return stubs
+
+
+def _run_stubgen_items(source_paths: list[Path]) -> list[tuple[Path, str]]:
+    return list(_run_stubgen(source_paths).items())
+
+
+def generate_and_process_stubs(
+    source_paths: list[Path],
+    process: Callable[[tuple[Path, str]], Any],
+    *,
+    site_packages_dir: Path,
+    jobs: int,
+    order: list[Path],
+) -> list[Any]:
+    """Generate stubs in parallel, and process each shard's stubs once it's done.
+
+    Parameters
+    ----------
+    source_paths
+        The source files to generate stubs for.
+    process
+        The function to call on each stub, with the stub's path relative to the
+        stubs directory and its contents. Must be importable by the workers.
+    site_packages_dir
+        The directory containing the ``mne`` package.
+    jobs
+        The number of workers; must not be 1.
+    order
+        The paths of all stubs relative to the stubs directory, in the order the
+        results should be returned in.
+
+    Returns
+    -------
+    results
+        The return values of ``process``.
+    """
+    shards = balance_shards(
+        source_paths, site_packages_dir, min(resolve_jobs(jobs), MAX_SHARDS)
+    )
+    print(f"🔪 Running stubgen on {len(shards)} shards: {', '.join(shards)}")
+    positions = {stub_rel_path: idx for idx, stub_rel_path in enumerate(order)}
+    return run_pipelined(
+        _run_stubgen_items,
+        process,
+        list(shards.values()),
+        jobs=jobs,
+        cost=lambda paths: sum(p.stat().st_size for p in paths),
+        key=lambda stub: positions[stub[0]],
+    )
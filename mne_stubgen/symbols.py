@@ -0,0 +1,397 @@
+"""An indexed database of all classes, functions, and methods in the stubs.
+
+Tools that need the signature or docstring of a single object – doc search, editor
+integrations, chat helpers – would otherwise have to parse the entire stubs
+directory. Instead, the generator can additionally write an SQLite database with
+one row per object, keyed by its qualified name:
+
+- ``symbols``: the kind of object, its signature as in the stubs (including
+  default values and decorators), the file and line it is defined in, and the
+  base classes of classes;
+- ``docstrings``: the rendered docstring in each flavor that has docstrings;
+- ``aliases``: the names objects are re-exported under, e.g. ``mne.Epochs`` for
+  ``mne.epochs.Epochs``;
+- ``metadata``: which stubs the database was written for, as a hash of their
+  manifests (see ``hash_stub_trees``).
+
+The rows are collected while processing each stub, before inherited methods are
+dropped from the stubs, so methods that are only present via inheritance in the
+stubs can still be looked up on the subclass. In incremental mode, only the rows
+of the regenerated modules are replaced, which requires the database to match the
+previous stubs.
+"""
+
+import ast
+import copy
+import dataclasses
+import os
+import sqlite3
+from collections.abc import Collection
+from pathlib import Path
+
+from .dedupe import get_import_target
+from .flavors import clean_module
+from .static_docs import get_static_docstrings
+
+# Bump this whenever the schema changes
+SCHEMA_VERSION = 2
+
+SCHEMA = """
+CREATE TABLE symbols (
+    qualname TEXT PRIMARY KEY,
+    module TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    signature TEXT NOT NULL,
+    source_path TEXT NOT NULL,
+    lineno INTEGER,
+    bases TEXT NOT NULL
+);
+CREATE INDEX symbols_module ON symbols (module);
+CREATE TABLE docstrings (
+    qualname TEXT NOT NULL,
+    flavor TEXT NOT NULL,
+    docstring TEXT NOT NULL,
+    PRIMARY KEY (qualname, flavor)
+);
+CREATE TABLE aliases (
+    alias TEXT PRIMARY KEY,
+    module TEXT NOT NULL,
+    target TEXT NOT NULL
+);
+CREATE INDEX aliases_module ON aliases (module);
+CREATE TABLE metadata (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+@dataclasses.dataclass
+class Symbol:
+    """A class, function, or method.
+
+    Attributes
+    ----------
+    qualname
+        The fully qualified name, e.g. ``mne.epochs.Epochs.plot_image``.
+    module
+        The name of the module the object is defined in.
+    kind
+        ``"class"``, ``"function"``, or ``"method"``.
+    signature
+        The definition in the stubs without the body, including decorators.
+        Overloads are separated by blank lines.
+    source_path
+        The source file of the module, relative to site-packages.
+    lineno
+        The line the object is defined on in the source file, if known.
+    bases
+        The qualified names of the base classes of a class, as far as they can
+        be determined from the stub. They may be re-exported names.
+    docstrings
+        The rendered docstring in each flavor, keyed by flavor name.
+    """
+
+    qualname: str
+    module: str
+    kind: str
+    signature: str
+    source_path: str
+    lineno: int | None = None
+    bases: list[str] = dataclasses.field(default_factory=list)
+    docstrings: dict[str, str] = dataclasses.field(default_factory=dict)
+
+
+def _get_signature(node: ast.ClassDef | ast.FunctionDef) -> str:
+    header = copy.copy(node)
+    header.body = [ast.Expr(ast.Constant(...))]
+    return clean_module(ast.unparse(header)).removesuffix("\n    ...")
+
+
+def _get_bases(node: ast.ClassDef, module_name: str) -> list[str]:
+    bases = []
+    for base in node.bases:
+        # e.g. Generic[T]
+        if isinstance(base, ast.Subscript):
+            base = base.value
+        if isinstance(base, ast.Name):
+            bases.append(f"{module_name}.{base.id}")
+        elif isinstance(base, ast.Attribute):
+            bases.append(ast.unparse(base))
+    return bases
+
+
+def collect_symbols(
+    module_ast: ast.Module,
+    module_name: str,
+    *,
+    stub_rel_path: Path,
+    source_path: Path | None = None,
+) -> tuple[dict[int, Symbol], dict[str, str]]:
+    """Collect the objects defined in a stub, and the names it re-exports.
+
+    Parameters
+    ----------
+    module_ast
+        The stub, with the default values already added.
+    module_name
+        The name of the module.
+    stub_rel_path
+        The path of the stub relative to the stubs directory.
+    source_path
+        The module's source file. If given, the line numbers of the objects are
+        looked up there.
+
+    Returns
+    -------
+    symbols
+        The objects, keyed by the ``id()`` of their node in ``module_ast``; the
+        docstrings are not filled in yet. Overloads share a single object.
+    aliases
+        The targets of the names imported from other MNE modules, keyed by the
+        name they are bound to in this module.
+    """
+    static_docstrings = {}
+    if source_path is not None and source_path.suffix == ".py":
+        static_docstrings = get_static_docstrings(source_path)
+    source_rel_path = str(stub_rel_path.with_suffix(".py"))
+
+    nodes = []
+    aliases = {}
+    for obj in module_ast.body:
+        if isinstance(obj, ast.ClassDef):
+            nodes.append((obj, obj.name, "class"))
+            nodes += [
+                (method, f"{obj.name}.{method.name}", "method")
+                for method in obj.body
+                if isinstance(method, ast.FunctionDef)
+            ]
+        elif isinstance(obj, ast.FunctionDef):
+            nodes.append((obj, obj.name, "function"))
+        elif isinstance(obj, ast.ImportFrom):
+            target = get_import_target(stub_rel_path, obj)
+            if target.split(".")[0] != "mne":
+                continue
+            for alias in obj.names:
+                if alias.name != "*":
+                    bound_name = alias.asname or alias.name
+                    aliases[f"{module_name}.{bound_name}"] = f"{target}.{alias.name}"
+
+    symbols: dict[int, Symbol] = {}
+    by_qualname: dict[str, Symbol] = {}
+    for node, qualname, kind in nodes:
+        signature = _get_signature(node)
+        if qualname in by_qualname:
+            symbol = by_qualname[qualname]
+            # Overloads and property setters
+            symbol.signature += "\n\n" + signature
+        else:
+            static_docstring = static_docstrings.get(qualname)
+            symbol = by_qualname[qualname] = Symbol(
+                qualname=f"{module_name}.{qualname}",
+                module=module_name,
+                kind=kind,
+                signature=signature,
+                source_path=source_rel_path,
+                lineno=(
+                    None
+                    if static_docstring is None or static_docstring.node is None
+                    else static_docstring.node.lineno
+                ),
+                bases=(
+                    _get_bases(node, module_name)
+                    if isinstance(node, ast.ClassDef)
+                    else []
+                ),
+            )
+        symbols[id(node)] = symbol
+    return symbols, aliases
+
+
+def write_symbols(
+    path: Path,
+    symbols: list[Symbol],
+    aliases: dict[str, str],
+    *,
+    flavors: Collection[str],
+    stubs_hash: str,
+    update: Collection[str] | None = None,
+) -> None:
+    """Write the objects of some modules to the database.
+
+    Parameters
+    ----------
+    path
+        The SQLite database file.
+    symbols
+        The objects.
+    aliases
+        The targets of re-exported names, keyed by the re-exported name.
+    flavors
+        The flavors whose docstrings to replace. The docstrings of other flavors
+        are kept, unless their object was removed.
+    stubs_hash
+        Identifies the stubs the database is written for (see ``is_up_to_date``).
+    update
+        The modules whose rows to replace in the existing database, including
+        modules that were removed. If None, the database is created from scratch.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Nobody should ever see a half-written database
+    if update is None:
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        tmp_path.unlink(missing_ok=True)
+        connection = sqlite3.connect(tmp_path)
+    else:
+        tmp_path = None
+        connection = sqlite3.connect(path)
+
+    alias_modules = {alias: alias.rsplit(".", 1)[0] for alias in aliases}
+    try:
+        with connection:
+            if update is None:
+                connection.executescript(SCHEMA)
+                connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            else:
+                modules = [(module,) for module in update]
+                placeholders = ", ".join("?" * len(flavors))
+                connection.executemany(
+                    f"DELETE FROM docstrings WHERE flavor IN ({placeholders}) "
+                    f"AND qualname IN (SELECT qualname FROM symbols WHERE module = ?)",
+                    [(*flavors, module) for (module,) in modules],
+                )
+                connection.executemany("DELETE FROM symbols WHERE module = ?", modules)
+                connection.executemany("DELETE FROM aliases WHERE module = ?", modules)
+            connection.executemany(
+                "INSERT OR REPLACE INTO symbols VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        symbol.qualname,
+                        symbol.module,
+                        symbol.kind,
+                        symbol.signature,
+                        symbol.source_path,
+                        symbol.lineno,
+                        "\n".join(symbol.bases),
+                    )
+                    for symbol in symbols
+                ],
+            )
+            connection.executemany(
+                "INSERT OR REPLACE INTO docstrings VALUES (?, ?, ?)",
+                [
+                    (symbol.qualname, flavor_name, docstring)
+                    for symbol in symbols
+                    for flavor_name, docstring in symbol.docstrings.items()
+                ],
+            )
+            connection.executemany(
+                "INSERT OR REPLACE INTO aliases VALUES (?, ?, ?)",
+                [
+                    (alias, alias_modules[alias], target)
+                    for alias, target in aliases.items()
+                ],
+            )
+            if update is not None:
+                # The docstrings of other flavors of objects that no longer exist
+                connection.execute(
+                    "DELETE FROM docstrings "
+                    "WHERE qualname NOT IN (SELECT qualname FROM symbols)"
+                )
+            connection.execute(
+                "INSERT OR REPLACE INTO metadata VALUES ('stubs_hash', ?)",
+                (stubs_hash,),
+            )
+    finally:
+        connection.close()
+    if tmp_path is not None:
+        os.replace(tmp_path, path)
+
+
+def is_up_to_date(path: Path, stubs_hash: str) -> bool:
+    """Whether a database exists and was written for the given stubs.
+
+    Only such a database can be updated incrementally, or kept as it is if no
+    stubs changed.
+    """
+    if not path.exists():
+        return False
+    connection = sqlite3.connect(path)
+    try:
+        (user_version,) = connection.execute("PRAGMA user_version").fetchone()
+        if user_version != SCHEMA_VERSION:
+            return False
+        row = connection.execute(
+            "SELECT value FROM metadata WHERE key = 'stubs_hash'"
+        ).fetchone()
+    finally:
+        connection.close()
+    return row is not None and row[0] == stubs_hash
+
+
+def _load_symbol(connection: sqlite3.Connection, qualname: str) -> Symbol | None:
+    row = connection.execute(
+        "SELECT * FROM symbols WHERE qualname = ?", (qualname,)
+    ).fetchone()
+    if row is None:
+        return None
+    _, module, kind, signature, source_path, lineno, bases = row
+    docstrings = connection.execute(
+        "SELECT flavor, docstring FROM docstrings WHERE qualname = ?", (qualname,)
+    ).fetchall()
+    return Symbol(
+        qualname=qualname,
+        module=module,
+        kind=kind,
+        signature=signature,
+        source_path=source_path,
+        lineno=lineno,
+        bases=bases.split("\n") if bases else [],
+        docstrings=dict(docstrings),
+    )
+
+
+def lookup_symbol(
+    connection: sqlite3.Connection, name: str, *, _seen: set[str] | None = None
+) -> Symbol | None:
+    """Look up an object by any name it is available under.
+
+    Re-exports and inheritance are followed, so e.g. ``mne.Epochs.plot_image``
+    finds ``mne.epochs.BaseEpochs.plot_image``.
+
+    Parameters
+    ----------
+    connection
+        A connection to the database.
+    name
+        The qualified name of the object.
+    """
+    seen = set() if _seen is None else _seen
+    while name not in seen:
+        seen.add(name)
+        symbol = _load_symbol(connection, name)
+        if symbol is not None:
+            return symbol
+        # Replace the longest re-exported prefix of the name by its target
+        parts = name.split(".")
+        for idx in range(len(parts), 0, -1):
+            row = connection.execute(
+                "SELECT target FROM aliases WHERE alias = ?",
+                (".".join(parts[:idx]),),
+            ).fetchone()
+            if row is not None:
+                name = ".".join([row[0], *parts[idx:]])
+                break
+        else:
+            break
+
+    # An inherited method, which is only defined in one of the base classes
+    class_name, _, member = name.rpartition(".")
+    cls = lookup_symbol(connection, class_name, _seen=seen) if class_name else None
+    if cls is None or cls.kind != "class":
+        return None
+    for base in cls.bases:
+        symbol = lookup_symbol(connection, f"{base}.{member}", _seen=seen)
+        if symbol is not None:
+            return symbol
+    return None
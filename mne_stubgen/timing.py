@@ -0,0 +1,303 @@
+"""Measure how long each phase of the stub generation takes.
+
+Every phase records its wall time, CPU time, and how much the resident set size
+(RSS) of the process doing the work grew. The CPU time includes that of finished
+child processes (e.g. the stubgen workers and Ruff); the RSS growth doesn't, but
+the phases run in worker processes are recorded there. Unlike the peak RSS the
+operating system tracks, which is the high-water mark over the lifetime of a
+process, the growth of a phase can be compared between phases, modules, and
+runs. The peak RSS of the entire run is reported separately (see
+``get_peak_rss``).
+
+Phases can be nested; the time of a nested phase is not counted towards the
+enclosing phase. This way, e.g. importing a module is reported separately from
+the docstring expansion that triggered the import.
+
+The timings of a run can be written to a JSON report, and two reports can be
+compared to spot regressions (see ``compare_timings.py``). For a closer look, the
+top-level phases can additionally be run under cProfile.
+"""
+
+import cProfile
+import contextlib
+import dataclasses
+import json
+import os
+import sys
+import time
+from collections.abc import Iterator
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+REPORT_VERSION = 2
+
+
+@dataclasses.dataclass
+class PhaseTiming:
+    """The resources used by a phase.
+
+    Attributes
+    ----------
+    wall
+        The wall time in seconds.
+    cpu
+        The CPU time in seconds, including finished child processes.
+    rss_growth
+        How much the resident set size of the process grew, in bytes; negative
+        if memory was freed. Only available on Linux.
+    peak_rss
+        The peak resident set size in bytes of a process that ran just this
+        phase, if measured (see ``mne_stubgen/benchmark.py``).
+    """
+
+    wall: float = 0.0
+    cpu: float = 0.0
+    rss_growth: int | None = None
+    peak_rss: int | None = None
+
+    def add(self, other: "PhaseTiming") -> None:
+        """Add the resources used by another (run of the) phase."""
+        self.wall += other.wall
+        self.cpu += other.cpu
+        if other.rss_growth is not None:
+            self.rss_growth = (self.rss_growth or 0) + other.rss_growth
+        if other.peak_rss is not None:
+            self.peak_rss = max(self.peak_rss or 0, other.peak_rss)
+
+
+def _get_cpu_time() -> float:
+    if resource is None:
+        return time.process_time()
+    usage = [
+        resource.getrusage(who)
+        for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN)
+    ]
+    return sum(u.ru_utime + u.ru_stime for u in usage)
+
+
+def _get_rss() -> int | None:
+    # The current RSS, unlike getrusage(), which only reports the peak
+    try:
+        with open("/proc/self/statm", encoding="ascii") as statm:
+            n_pages = int(statm.read().split()[1])
+    except OSError:
+        return None
+    return n_pages * os.sysconf("SC_PAGE_SIZE")
+
+
+def get_peak_rss() -> int | None:
+    """Return the peak RSS of this process, or of its largest finished child.
+
+    This is the high-water mark over the entire lifetime of the processes, in
+    bytes; ``None`` on Windows.
+    """
+    if resource is None:
+        return None
+    peak_rss = max(
+        resource.getrusage(who).ru_maxrss
+        for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN)
+    )
+    # macOS reports bytes, Linux kilobytes
+    return peak_rss if sys.platform == "darwin" else peak_rss * 1024
+
+
+class Timer:
+    """Record the resources used by the phases of a run.
+
+    Parameters
+    ----------
+    profile_dir
+        If given, each top-level phase is run under cProfile, and the profile is
+        written to ``<profile_dir>/<phase>.prof``. Work done in worker processes
+        is not included.
+    """
+
+    def __init__(self, profile_dir: Path | None = None) -> None:
+        self.phases: dict[str, PhaseTiming] = {}
+        self.profile_dir = profile_dir
+        self._child_timings: list[PhaseTiming] = []
+        self._profilers: dict[str, cProfile.Profile] = {}
+
+    def __getstate__(self) -> dict:
+        # Only finished phases are sent back from worker processes
+        return {
+            "phases": self.phases,
+            "profile_dir": None,
+            "_child_timings": [],
+            "_profilers": {},
+        }
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Measure a phase. Phases of the same name are accumulated."""
+        profiler = None
+        if self.profile_dir is not None and not self._child_timings:
+            profiler = self._profilers.setdefault(name, cProfile.Profile())
+        start_wall = time.perf_counter()
+        start_cpu = _get_cpu_time()
+        start_rss = _get_rss()
+        children = PhaseTiming()
+        self._child_timings.append(children)
+        if profiler is not None:
+            profiler.enable()
+        try:
+            yield
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                self.profile_dir.mkdir(parents=True, exist_ok=True)
+                profiler.dump_stats(self.profile_dir / f"{name.replace(' ', '_')}.prof")
+            self._child_timings.pop()
+            end_rss = _get_rss()
+            total = PhaseTiming(
+                wall=time.perf_counter() - start_wall,
+                cpu=_get_cpu_time() - start_cpu,
+                rss_growth=(
+                    None
+                    if start_rss is None or end_rss is None
+                    else end_rss - start_rss
+                ),
+            )
+            if self._child_timings:
+                self._child_timings[-1].add(total)
+            self.phases.setdefault(name, PhaseTiming()).add(
+                PhaseTiming(
+                    wall=total.wall - children.wall,
+                    cpu=total.cpu - children.cpu,
+                    rss_growth=(
+                        None
+                        if total.rss_growth is None
+                        else total.rss_growth - (children.rss_growth or 0)
+                    ),
+                )
+            )
+
+    def add(self, other: "Timer") -> None:
+        """Add the phases recorded by another timer, e.g. of a worker process."""
+        for name, timing in other.phases.items():
+            self.phases.setdefault(name, PhaseTiming()).add(timing)
+
+    def print_summary(self) -> None:
+        """Print the wall and CPU time of each phase."""
+        for name, timing in self.phases.items():
+            print(
+                f"⏱️  {name + ':':<20} {timing.wall:8.2f} s wall, "
+                f"{timing.cpu:8.2f} s CPU"
+            )
+
+
+def _timings_to_json(phases: dict[str, PhaseTiming]) -> dict[str, dict]:
+    return {name: dataclasses.asdict(timing) for name, timing in phases.items()}
+
+
+def build_report(
+    *,
+    phases: Timer,
+    module_phases: Timer,
+    modules: dict[str, Timer],
+    metadata: dict,
+) -> dict:
+    """Create a report of the timings of a run.
+
+    Parameters
+    ----------
+    phases
+        The timings of the phases of the entire run.
+    module_phases
+        The timings of the per-module phases, summed over all modules. With
+        several worker processes, their wall times add up to more than the wall
+        time of the phase processing the modules.
+    modules
+        The timings of the per-module phases, by module name.
+    metadata
+        Information about the run, e.g. the MNE version and number of jobs.
+    """
+    return {
+        "report_version": REPORT_VERSION,
+        **metadata,
+        "phases": _timings_to_json(phases.phases),
+        "module_phases": _timings_to_json(module_phases.phases),
+        "modules": {
+            module_name: _timings_to_json(timer.phases)
+            for module_name, timer in sorted(modules.items())
+        },
+    }
+
+
+def write_report(path: Path, report: dict) -> None:
+    """Write a report created by ``build_report`` to a JSON file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+
+
+def read_report(path: Path) -> dict:
+    """Read a JSON report written by ``write_report``."""
+    report = json.loads(path.read_text(encoding="utf-8"))
+    if report.get("report_version") != REPORT_VERSION:
+        raise ValueError(f"Unsupported timing report version in {path}")
+    return report
+
+
+@dataclasses.dataclass
+class Regression:
+    """A phase that got slower between two runs.
+
+    Attributes
+    ----------
+    name
+        The name of the phase, prefixed by the module name for per-module phases.
+    baseline
+        The wall time in the baseline run, in seconds.
+    current
+        The wall time in the current run, in seconds.
+    """
+
+    name: str
+    baseline: float
+    current: float
+
+    @property
+    def ratio(self) -> float:
+        return self.current / self.baseline if self.baseline else float("inf")
+
+
+def compare_reports(
+    baseline: dict,
+    current: dict,
+    *,
+    threshold: float,
+    min_seconds: float,
+) -> list[Regression]:
+    """Find the phases that got slower.
+
+    A phase regressed if its wall time grew by more than ``threshold`` (e.g. 0.1
+    for 10 %) and by more than ``min_seconds``, to ignore noise in short phases.
+    Phases that only exist in one of the reports are ignored.
+
+    Returns
+    -------
+    regressions
+        The regressed phases, the largest absolute slowdown first.
+    """
+    pairs = []
+    for section, prefix in (("phases", ""), ("module_phases", "all modules: ")):
+        for name, timing in current[section].items():
+            if name in baseline[section]:
+                pairs.append((f"{prefix}{name}", baseline[section][name], timing))
+    for module_name, phases in current["modules"].items():
+        baseline_phases = baseline["modules"].get(module_name, {})
+        for name, timing in phases.items():
+            if name in baseline_phases:
+                pairs.append((f"{module_name}: {name}", baseline_phases[name], timing))
+
+    regressions = [
+        Regression(name=name, baseline=before["wall"], current=after["wall"])
+        for name, before, after in pairs
+        if after["wall"] - before["wall"] > min_seconds
+        and after["wall"] > before["wall"] * (1 + threshold)
+    ]
+    return sorted(regressions, key=lambda r: r.current - r.baseline, reverse=True)
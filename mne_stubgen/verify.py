@@ -0,0 +1,479 @@
+"""Check that the generated stubs match MNE's runtime signatures.
+
+The stubs go through several transformations after stubgen – docstring expansion,
+cleaning, default values, deduplication – any of which could break a signature.
+Like mypy's stubtest, but much cheaper, we import each module and compare every
+class, function, and method in its stub to the runtime object:
+
+- the object must exist at runtime, and classes must be classes;
+- ``@staticmethod`` and ``@classmethod`` must match;
+- the parameters must match ``inspect.signature()`` of the runtime object: their
+  names, order, and kinds, whether they have a default value, and the default
+  value itself if the stub has one.
+
+Overloads and properties are only checked for existence, and functions whose
+runtime signature is just ``(*args, **kwargs)`` – i.e., hidden by a decorator –
+are skipped, as are the few objects listed in ``KNOWN_MISMATCHES``. The modules
+are verified in one shard per MNE subpackage (see ``stubgen_shards``), so each
+worker only imports the subpackages it verifies.
+
+The errors found in each stub are cached, keyed by a hash of the stub and of the
+module's source, so only modules that changed are imported and verified again.
+"""
+
+import ast
+import dataclasses
+import hashlib
+import importlib
+import inspect
+import json
+import platform
+import traceback
+from pathlib import Path
+from typing import Any
+
+from .defaults import stub_path_to_module_name
+from .manifest import hash_file, source_to_stub_path
+from .output import write_if_changed
+from .parallel import run_parallel
+from .stubgen_shards import shard_sources
+
+# Bump this whenever the structure of the cache changes
+CACHE_VERSION = 1
+
+_Parameter = inspect.Parameter
+_POSITIONAL_KINDS = (_Parameter.POSITIONAL_ONLY, _Parameter.POSITIONAL_OR_KEYWORD)
+# Methods that are turned into static or class methods without a decorator
+_IMPLICIT_METHOD_TYPES = {
+    "__new__": staticmethod,
+    "__init_subclass__": classmethod,
+    "__class_getitem__": classmethod,
+}
+# Objects whose stub deliberately differs from their runtime signature
+KNOWN_MISMATCHES = {
+    # Decorated with the ``decorator`` package's ``@decorator``, which turns it into
+    # a decorator with the runtime signature ``(fun)``. The stub keeps the
+    # signature it is defined with, i.e., that of the calls of the decorated
+    # functions.
+    "mne.viz.utils.safe_event",
+}
+
+
+@dataclasses.dataclass
+class VerificationResult:
+    """The outcome of verifying the stubs.
+
+    Attributes
+    ----------
+    errors
+        The mismatches found in each stub with any, keyed by module name.
+    n_verified
+        The number of stubs that were verified.
+    n_cached
+        The number of stubs whose result was taken from the cache.
+    """
+
+    errors: dict[str, list[str]]
+    n_verified: int = 0
+    n_cached: int = 0
+
+
+@dataclasses.dataclass
+class _StubParam:
+    name: str
+    kind: inspect._ParameterKind
+    default: ast.expr | None
+
+
+def _get_stub_params(func: ast.FunctionDef) -> list[_StubParam]:
+    args = func.args
+    positional = args.posonlyargs + args.args
+    defaults: list[ast.expr | None] = [None] * (len(positional) - len(args.defaults))
+    defaults += args.defaults
+    params = []
+    for param, default in zip(positional, defaults):
+        # Positional-only parameters may be prefixed with "__" in stubs
+        kind = (
+            _Parameter.POSITIONAL_ONLY
+            if param in args.posonlyargs
+            or (param.arg.startswith("__") and not param.arg.endswith("__"))
+            else _Parameter.POSITIONAL_OR_KEYWORD
+        )
+        params.append(_StubParam(param.arg, kind, default))
+    if args.vararg is not None:
+        params.append(_StubParam(args.vararg.arg, _Parameter.VAR_POSITIONAL, None))
+    params += [
+        _StubParam(param.arg, _Parameter.KEYWORD_ONLY, default)
+        for param, default in zip(args.kwonlyargs, args.kw_defaults)
+    ]
+    if args.kwarg is not None:
+        params.append(_StubParam(args.kwarg.arg, _Parameter.VAR_KEYWORD, None))
+    return params
+
+
+def _compare_defaults(
+    stub_param: _StubParam, runtime_param: inspect.Parameter
+) -> str | None:
+    has_runtime_default = runtime_param.default is not runtime_param.empty
+    if stub_param.default is None:
+        if has_runtime_default:
+            return "has a default value at runtime, but not in the stub"
+        return None
+    if not has_runtime_default:
+        return "has a default value in the stub, but not at runtime"
+    try:
+        stub_value = ast.literal_eval(stub_param.default)
+    except (ValueError, TypeError, SyntaxError, MemoryError, RecursionError):
+        return None
+    if stub_value is ...:
+        return None
+    runtime_value = runtime_param.default
+    try:
+        equal = bool(stub_value == runtime_value)
+    except Exception:  # e.g. arrays
+        equal = False
+    if not equal or type(stub_value) is not type(runtime_value):
+        return f"stub default {stub_value!r} != runtime default {runtime_value!r}"
+    return None
+
+
+def compare_signature(
+    func: ast.FunctionDef, signature: inspect.Signature, *, qualname: str
+) -> list[str]:
+    """Compare the parameters of a function in a stub to its runtime signature.
+
+    Parameters
+    ----------
+    func
+        The function in the stub.
+    signature
+        The signature of the runtime object.
+    qualname
+        The qualified name of the function, for the error messages.
+
+    Returns
+    -------
+    errors
+        The mismatches.
+    """
+    runtime_params = list(signature.parameters.values())
+    # A decorator that doesn't preserve the signature
+    if [p.kind for p in runtime_params] == [
+        _Parameter.VAR_POSITIONAL,
+        _Parameter.VAR_KEYWORD,
+    ]:
+        return []
+    stub_params = _get_stub_params(func)
+    stub_kinds = {param.kind for param in stub_params}
+    runtime_kinds = {param.kind for param in runtime_params}
+
+    errors = []
+    for kind, label in (
+        (_Parameter.VAR_POSITIONAL, "*args"),
+        (_Parameter.VAR_KEYWORD, "**kwargs"),
+    ):
+        if kind in stub_kinds and kind not in runtime_kinds:
+            errors.append(f"{qualname}: {label} is not accepted at runtime")
+        elif kind in runtime_kinds and kind not in stub_kinds:
+            errors.append(f"{qualname}: {label} is missing from the stub")
+
+    # Positional parameters are matched by position, the others by name
+    stub_positional = [p for p in stub_params if p.kind in _POSITIONAL_KINDS]
+    runtime_positional = [p for p in runtime_params if p.kind in _POSITIONAL_KINDS]
+    matched = list(zip(stub_positional, runtime_positional))
+    for stub_param, runtime_param in matched:
+        if stub_param.kind is _Parameter.POSITIONAL_OR_KEYWORD:
+            if runtime_param.kind is _Parameter.POSITIONAL_ONLY:
+                errors.append(
+                    f"{qualname}: parameter {stub_param.name} is positional-only "
+                    f"at runtime"
+                )
+            elif stub_param.name != runtime_param.name:
+                errors.append(
+                    f"{qualname}: parameter {stub_param.name} is named "
+                    f"{runtime_param.name} at runtime"
+                )
+
+    runtime_rest: dict[str, inspect.Parameter] = {
+        param.name: param
+        for param in runtime_positional[len(stub_positional) :]
+        + [p for p in runtime_params if p.kind is _Parameter.KEYWORD_ONLY]
+    }
+    stub_rest = stub_positional[len(runtime_positional) :] + [
+        p for p in stub_params if p.kind is _Parameter.KEYWORD_ONLY
+    ]
+    for stub_param in stub_rest:
+        if stub_param.name in runtime_rest:
+            runtime_param = runtime_rest.pop(stub_param.name)
+            if (stub_param.kind is _Parameter.KEYWORD_ONLY) != (
+                runtime_param.kind is _Parameter.KEYWORD_ONLY
+            ):
+                errors.append(
+                    f"{qualname}: parameter {stub_param.name} is "
+                    f"{runtime_param.kind.description} at runtime"
+                )
+            matched.append((stub_param, runtime_param))
+        elif not (
+            _Parameter.VAR_KEYWORD in runtime_kinds
+            if stub_param.kind is _Parameter.KEYWORD_ONLY
+            else _Parameter.VAR_POSITIONAL in runtime_kinds
+        ):
+            errors.append(
+                f"{qualname}: parameter {stub_param.name} is not accepted at runtime"
+            )
+    for runtime_param in runtime_rest.values():
+        if not (
+            _Parameter.VAR_KEYWORD in stub_kinds
+            if runtime_param.kind is _Parameter.KEYWORD_ONLY
+            else _Parameter.VAR_POSITIONAL in stub_kinds
+        ):
+            errors.append(
+                f"{qualname}: parameter {runtime_param.name} is missing from the stub"
+            )
+
+    for stub_param, runtime_param in matched:
+        error = _compare_defaults(stub_param, runtime_param)
+        if error is not None:
+            errors.append(f"{qualname}: parameter {stub_param.name}: {error}")
+    return errors
+
+
+def _get_decorator_names(func: ast.FunctionDef) -> set[str]:
+    names = set()
+    for decorator in func.decorator_list:
+        if isinstance(decorator, ast.Call):
+            decorator = decorator.func
+        if isinstance(decorator, ast.Name):
+            names.add(decorator.id)
+        elif isinstance(decorator, ast.Attribute):
+            names.add(decorator.attr)
+    return names
+
+
+def _lookup(parent: Any, name: str, *, in_class: bool) -> Any:
+    if not in_class:
+        return getattr(parent, name)
+    # Private names of class members are mangled
+    if name.startswith("__") and not name.endswith("__"):
+        name = f"_{parent.__name__.lstrip('_')}{name}"
+    # Without binding, so static and class methods can be told apart
+    return inspect.getattr_static(parent, name)
+
+
+def _verify_function(
+    funcs: list[ast.FunctionDef], runtime_obj: Any, *, qualname: str, in_class: bool
+) -> list[str]:
+    decorators = set().union(*(_get_decorator_names(func) for func in funcs))
+    # Properties (including their setters), and functools.cached_property
+    if decorators & {"property", "cached_property", "setter", "deleter"}:
+        return []
+
+    errors = []
+    if in_class:
+        for method_type in (staticmethod, classmethod):
+            in_stub = (
+                method_type.__name__ in decorators
+                or _IMPLICIT_METHOD_TYPES.get(funcs[0].name) is method_type
+            )
+            if in_stub != isinstance(runtime_obj, method_type):
+                errors.append(
+                    f"{qualname}: is {'' if in_stub else 'not '}a "
+                    f"{method_type.__name__} in the stub, but "
+                    f"{'not ' if in_stub else ''}at runtime"
+                )
+        if isinstance(runtime_obj, (staticmethod, classmethod)):
+            runtime_obj = runtime_obj.__func__
+    if errors or "overload" in decorators:
+        return errors
+
+    if not callable(runtime_obj):
+        return [f"{qualname}: is not callable at runtime"]
+    try:
+        signature = inspect.signature(runtime_obj)
+    except (ValueError, TypeError):
+        return []
+    return compare_signature(funcs[0], signature, qualname=qualname)
+
+
+def _verify_body(
+    body: list[ast.stmt], runtime_parent: Any, *, prefix: str, in_class: bool
+) -> list[str]:
+    # Group the overloads of each function
+    definitions: dict[str, list[ast.ClassDef | ast.FunctionDef]] = {}
+    for node in body:
+        if isinstance(node, (ast.ClassDef, ast.FunctionDef)):
+            definitions.setdefault(node.name, []).append(node)
+
+    errors = []
+    for name, nodes in definitions.items():
+        qualname = f"{prefix}.{name}"
+        if qualname in KNOWN_MISMATCHES:
+            continue
+        try:
+            runtime_obj = _lookup(runtime_parent, name, in_class=in_class)
+        except AttributeError:
+            errors.append(f"{qualname}: is not present at runtime")
+            continue
+        if isinstance(nodes[0], ast.ClassDef):
+            if not inspect.isclass(runtime_obj):
+                errors.append(f"{qualname}: is not a class at runtime")
+                continue
+            errors += _verify_body(
+                nodes[0].body, runtime_obj, prefix=qualname, in_class=True
+            )
+        else:
+            errors += _verify_function(
+                [node for node in nodes if isinstance(node, ast.FunctionDef)],
+                runtime_obj,
+                qualname=qualname,
+                in_class=in_class,
+            )
+    return errors
+
+
+def verify_stub(stub: str, module_name: str) -> list[str]:
+    """Compare a stub to the runtime objects of its module.
+
+    Parameters
+    ----------
+    stub
+        The contents of the stub.
+    module_name
+        The name of the module.
+
+    Returns
+    -------
+    errors
+        The mismatches.
+    """
+    try:
+        module = importlib.import_module(module_name)
+    except Exception:
+        return [f"{module_name}: cannot be imported:\n{traceback.format_exc()}"]
+    return _verify_body(
+        ast.parse(stub).body, module, prefix=module_name, in_class=False
+    )
+
+
+def _verify_shard(stubs: list[tuple[str, str]]) -> list[list[str]]:
+    return [verify_stub(stub, module_name) for module_name, stub in stubs]
+
+
+def _get_cache_key(stub: str, source_hash: str) -> str:
+    hasher = hashlib.sha256()
+    for part in (
+        hash_file(Path(__file__)),
+        platform.python_version(),
+        source_hash,
+        stub,
+    ):
+        hasher.update(part.encode("utf-8"))
+        hasher.update(b"\0")
+    return hasher.hexdigest()
+
+
+def _read_cache(cache_path: Path, mne_version: str) -> dict[str, dict]:
+    if not cache_path.exists():
+        return {}
+    try:
+        cache = json.loads(cache_path.read_text(encoding="utf-8"))
+    except json.JSONDecodeError:
+        return {}
+    if (
+        cache.get("cache_version") != CACHE_VERSION
+        or cache.get("mne_version") != mne_version
+    ):
+        return {}
+    return cache["stubs"]
+
+
+def verify_stubs(
+    stubs_dir: Path,
+    *,
+    sources: dict[str, str],
+    mne_version: str,
+    cache_path: Path | None,
+    jobs: int,
+) -> VerificationResult:
+    """Compare the stubs in a directory to MNE's runtime objects.
+
+    Parameters
+    ----------
+    stubs_dir
+        The directory containing the stubs.
+    sources
+        The hashes of MNE's sources, keyed by their path relative to
+        site-packages, as recorded in the manifest. Only the stubs of these
+        sources are verified; any other files in ``stubs_dir`` are ignored.
+    mne_version
+        The installed MNE version.
+    cache_path
+        The JSON file caching the results, if any. Results of stubs that are no
+        longer present are dropped from it.
+    jobs
+        The number of worker processes; if 0, one per CPU.
+    """
+    source_hashes = {
+        source_to_stub_path(source): source_hash
+        for source, source_hash in sources.items()
+    }
+    cache = {} if cache_path is None else _read_cache(cache_path, mne_version)
+
+    result = VerificationResult(errors={})
+    new_cache = {}
+    to_verify = {}
+    for rel_path_str, source_hash in sorted(source_hashes.items()):
+        path = stubs_dir / rel_path_str
+        if not path.exists():
+            continue
+        rel_path = Path(rel_path_str)
+        module_name = stub_path_to_module_name(rel_path, Path())
+        stub = path.read_text(encoding="utf-8")
+        key = _get_cache_key(stub, source_hash)
+        cached = cache.get(rel_path_str)
+        if cached is not None and cached["key"] == key:
+            result.n_cached += 1
+            new_cache[str(rel_path)] = cached
+            if cached["errors"]:
+                result.errors[module_name] = cached["errors"]
+        else:
+            to_verify[path] = (module_name, stub, key)
+
+    shards = shard_sources(list(to_verify), stubs_dir)
+    if shards:
+        print(
+            f"🔬 Verifying {len(to_verify)} stubs in {len(shards)} shards: "
+            f"{', '.join(shards)}"
+        )
+    shard_results = run_parallel(
+        _verify_shard,
+        [[to_verify[path][:2] for path in paths] for paths in shards.values()],
+        jobs=jobs,
+        cost=len,
+    )
+    for paths, errors_per_stub in zip(shards.values(), shard_results):
+        for path, errors in zip(paths, errors_per_stub):
+            module_name, _, key = to_verify[path]
+            result.n_verified += 1
+            if errors:
+                result.errors[module_name] = errors
+            new_cache[str(path.relative_to(stubs_dir))] = {
+                "key": key,
+                "errors": errors,
+            }
+
+    if cache_path is not None:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        write_if_changed(
+            cache_path,
+            json.dumps(
+                {
+                    "cache_version": CACHE_VERSION,
+                    "mne_version": mne_version,
+                    "stubs": dict(sorted(new_cache.items())),
+                },
+                indent=2,
+            )
+            + "\n",
+        )
+    return result
@@ -0,0 +1,110 @@
+"""Regenerate the stubs whenever MNE's sources change.
+
+When working on an editable MNE checkout, re-running the generator after each
+edit means paying for starting Python, importing MNE and mypy, and setting up the
+pipeline every time. In watch mode, the generator process keeps running instead:
+MNE's sources are polled for changes, and each change triggers an incremental run
+in the same process, which only regenerates the affected stubs.
+
+Before such a run, the changed modules are removed from ``sys.modules``, so they
+are imported afresh if docstrings or default values need to be taken from the
+imported objects. As MNE copies docstrings between modules at import time, so
+are the modules importing them (see ``mne_stubgen/import_graph.py``). All other
+modules stay imported.
+"""
+
+import sys
+import time
+from pathlib import Path
+
+from .defaults import stub_path_to_module_name
+from .manifest import get_importers
+from .static_docs import clear_caches
+
+# The state of the sources: the modification time of each file
+Snapshot = dict[Path, int]
+
+
+def take_snapshot(source_dir: Path) -> Snapshot:
+    """Record the modification times of all sources in a directory."""
+    snapshot = {}
+    for pattern in ("*.py", "*.pyi"):
+        for path in source_dir.rglob(pattern):
+            try:
+                snapshot[path] = path.stat().st_mtime_ns
+            except FileNotFoundError:  # deleted in the meantime
+                pass
+    return snapshot
+
+
+def get_changed_paths(old: Snapshot, new: Snapshot) -> list[Path]:
+    """Get the sources that were added, modified, or removed."""
+    return sorted(
+        path for path in old.keys() | new.keys() if old.get(path) != new.get(path)
+    )
+
+
+def wait_for_changes(
+    source_dir: Path, snapshot: Snapshot, *, interval: float
+) -> tuple[Snapshot, list[Path]]:
+    """Poll a directory until any of its sources change.
+
+    As editors and version control tools often touch several files in a row, this
+    only returns once no more changes were seen for one polling interval.
+
+    Parameters
+    ----------
+    source_dir
+        The directory to watch.
+    snapshot
+        The state of the sources to compare to.
+    interval
+        The time between two polls, in seconds.
+
+    Returns
+    -------
+    snapshot
+        The new state of the sources.
+    changed_paths
+        The sources that changed compared to the old state.
+    """
+    new_snapshot = snapshot
+    while new_snapshot == snapshot:
+        time.sleep(interval)
+        new_snapshot = take_snapshot(source_dir)
+    while True:
+        time.sleep(interval)
+        settled_snapshot = take_snapshot(source_dir)
+        if settled_snapshot == new_snapshot:
+            break
+        new_snapshot = settled_snapshot
+    return new_snapshot, get_changed_paths(snapshot, new_snapshot)
+
+
+def forget_modules(stubs: set[str], *, imports: dict[str, list[str]] | None) -> None:
+    """Make sure changed modules are read and imported afresh.
+
+    Parameters
+    ----------
+    stubs
+        The stubs of the changed modules.
+    imports
+        The stubs of the modules each module imports, as recorded in the manifest.
+        If not known, all of MNE is forgotten.
+    """
+    clear_caches()
+    forgotten: set[str] | None = None
+    if imports is not None:
+        forgotten = set()
+        for stub in get_importers(imports, stubs):
+            parts = stub_path_to_module_name(Path(stub), Path()).split(".")
+            # The parent packages hold the names they import from their
+            # submodules, which lazy_loader caches, too
+            forgotten.update(".".join(parts[:idx]) for idx in range(1, len(parts) + 1))
+    for module_name in list(sys.modules):
+        if module_name != "mne" and not module_name.startswith("mne."):
+            continue
+        # The stubs of packages are processed with their ``__init__`` modules
+        # (see ``expand``), which are imported separately
+        if forgotten is None or module_name.removesuffix(".__init__") in forgotten:
+            del sys.modules[module_name]
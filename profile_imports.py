@@ -0,0 +1,106 @@
+"""Profile how expensive it is to import the MNE modules we generate stubs for.
+
+For each module, the marginal import cost – when imported after all previous
+modules into the same interpreter, in the order the stubs are processed – and
+the isolated import cost – when imported into a fresh interpreter – are
+measured, and the most expensive modules are listed. This helps deciding which
+modules to exclude, defer, or handle statically.
+"""
+
+import argparse
+import dataclasses
+import json
+import sys
+from pathlib import Path
+
+import mne
+
+from gen_type_stubs import SITE_PACKAGES_DIR, discover_sources
+from mne_stubgen.defaults import stub_path_to_module_name
+from mne_stubgen.import_profile import (
+    ImportCost,
+    measure_isolated,
+    measure_marginal,
+    print_top,
+)
+from mne_stubgen.manifest import source_to_stub_path
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Profile the import time of the MNE modules."
+    )
+    parser.add_argument(
+        "--top",
+        type=int,
+        default=20,
+        metavar="N",
+        help="The number of most expensive modules to list. Default: %(default)s",
+    )
+    parser.add_argument(
+        "--no-isolated",
+        action="store_true",
+        help="Do not import each module into a fresh interpreter.",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help=(
+            "Number of modules to import into fresh interpreters concurrently. "
+            "Use 0 to run one per CPU. Concurrent imports compete for CPU and disk, "
+            "which affects the measured times."
+        ),
+    )
+    parser.add_argument(
+        "--report",
+        type=Path,
+        metavar="PATH",
+        help="Write the import costs of all modules to this JSON file.",
+    )
+    args = parser.parse_args(argv)
+
+    print(f"🔍 Found MNE-Python {mne.__version__} installation")
+    module_py_paths, init_pyi_paths = discover_sources()
+    costs = [
+        ImportCost(
+            module_name=stub_path_to_module_name(path, SITE_PACKAGES_DIR),
+            stub_path=source_to_stub_path(str(path.relative_to(SITE_PACKAGES_DIR))),
+        )
+        for path in module_py_paths + init_pyi_paths
+    ]
+
+    if not args.no_isolated:
+        measure_isolated(costs, jobs=args.jobs)
+    measure_marginal(costs)
+
+    print_top(costs, key="marginal", n=args.top, title="Highest marginal import cost")
+    if not args.no_isolated:
+        print_top(
+            costs, key="isolated", n=args.top, title="Highest isolated import cost"
+        )
+    failed = [cost for cost in costs if cost.error is not None]
+    if failed:
+        print(f"\n❌ {len(failed)} modules could not be imported:")
+        for cost in failed:
+            print(f"   {cost.stub_path}: {cost.error}")
+
+    if args.report is not None:
+        print(f"\n💾 Writing import cost report to: {args.report}")
+        args.report.write_text(
+            json.dumps(
+                {
+                    "mne_version": mne.__version__,
+                    "python": sys.version.split()[0],
+                    "modules": [dataclasses.asdict(cost) for cost in costs],
+                },
+                indent=2,
+            )
+            + "\n",
+            encoding="utf-8",
+        )
+
+
+if __name__ == "__main__":
+    main()